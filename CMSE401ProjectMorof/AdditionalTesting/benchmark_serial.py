@@ -40,9 +40,12 @@ def value_portfolio_serial(portfolio):
         total_value += price * amount
     return total_value
 
-def create_random_portfolio(num_assets, available_symbols):
-    symbols = random.sample(available_symbols, num_assets)
-    portfolio = {symbol: random.uniform(0.5, 5.0) for symbol in symbols}
+SEED = 0
+portfolio_rng = random.Random(SEED)
+
+def create_random_portfolio(num_assets, available_symbols, rng=portfolio_rng):
+    symbols = rng.sample(available_symbols, num_assets)
+    portfolio = {symbol: rng.uniform(0.5, 5.0) for symbol in symbols}
     return portfolio
 
 def benchmark_serial(num_assets_list, available_symbols):
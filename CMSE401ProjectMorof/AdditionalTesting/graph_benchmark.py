@@ -4,9 +4,14 @@ import requests
 import os
 import time
 import random
+import sys
 import matplotlib.pyplot as plt
 from dotenv import load_dotenv
 
+# The symbol registry lives with the main project
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Part2Project'))
+from symbol_registry import SymbolRegistry
+
 # Load API key
 load_dotenv()
 API_KEY = os.getenv('CMC_API_KEY')
@@ -23,18 +28,14 @@ crypto_symbols = [
     'AVAX', 'XLM', 'HBAR', 'SHIB', 'LEO', 'TON', 'BCH', 'DOT', 'LTC', 'HYPE'
 ]
 
-# --- Validate symbols with API ---
+# --- Validate symbols against the cached symbol -> id map ---
+# One bulk /v1/cryptocurrency/map load (reused from symbol_map.json for a day)
+# instead of a quote request per symbol
 def validate_symbols(symbol_list):
-    valid_symbols = []
-    for symbol in symbol_list:
-        params = {'symbol': symbol, 'convert': 'USD'}
-        response = requests.get(url, headers=headers, params=params)
-        data = response.json()
-
-        if 'data' in data and symbol in data['data']:
-            valid_symbols.append(symbol)
-        else:
-            print(f"Symbol {symbol} is not valid or not returned by API. Skipping.")
+    registry = SymbolRegistry(api_key=API_KEY).ensure()
+    valid_symbols, invalid_symbols = registry.validate(symbol_list)
+    for symbol in invalid_symbols:
+        print(f"Symbol {symbol} is not valid or not returned by API. Skipping.")
     return valid_symbols
 
 # --- Serial Functions ---
@@ -77,9 +78,12 @@ async def value_portfolio_parallel(portfolio):
     return total_value
 
 # --- Benchmarking and Plotting ---
-def create_random_portfolio(num_assets, available_symbols):
-    symbols = random.sample(available_symbols, num_assets)
-    portfolio = {symbol: random.uniform(0.5, 5.0) for symbol in symbols}
+SEED = 0
+portfolio_rng = random.Random(SEED)
+
+def create_random_portfolio(num_assets, available_symbols, rng=portfolio_rng):
+    symbols = rng.sample(available_symbols, num_assets)
+    portfolio = {symbol: rng.uniform(0.5, 5.0) for symbol in symbols}
     return portfolio
 
 def benchmark(num_assets_list, available_symbols):
@@ -0,0 +1,258 @@
+import argparse
+import time
+
+import numpy as np
+
+MINUTES_PER_YEAR = 365 * 24 * 60
+DEFAULT_WINDOW = 60
+DEFAULT_CHUNK_BYTES = 32 * 1024 * 1024
+
+
+def holdings_matrix(book, columns):
+    # Dense (portfolio x symbol) amounts aligned to a price matrix's columns
+    # ({symbol: column}); returns (matrix, symbols the prices do not cover)
+    column_of = np.array([columns.get(symbol, -1) for symbol in book.symbols.symbols], dtype=np.int64)
+    matrix = np.zeros((book.num_portfolios, max(1, len(columns))), dtype=np.float64)
+    holding_columns = column_of[book.symbol_ids] if len(column_of) else np.zeros(0, dtype=np.int64)
+    covered = holding_columns >= 0
+    np.add.at(matrix, (book.portfolio_ids[covered], holding_columns[covered]), book.amounts[covered])
+    missing = sorted({book.symbols.symbols[s] for s in np.unique(book.symbol_ids[~covered])})
+    return matrix[:, :len(columns)], missing
+
+
+def fill_forward(prices, last_row=None):
+    # Carries each symbol's last known price over NaN gaps (NaN before the first
+    # quote becomes 0.0, i.e. the holding is worth nothing until it is priced)
+    prices = np.asarray(prices, dtype=np.float64)
+    gaps = np.isnan(prices)
+    if not gaps.any():
+        return prices
+    rows = np.where(gaps, -1, np.arange(len(prices))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    filled = prices[np.maximum(rows, 0), np.arange(prices.shape[1])]
+    start = np.zeros(prices.shape[1]) if last_row is None else np.nan_to_num(last_row)
+    return np.where(rows < 0, start, filled)
+
+
+def value_paths(holdings, prices):
+    # (portfolio x symbol) @ (symbol x time): the broadcast
+    # (holdings[:, None, :] * prices[None, :, :]).sum(-1) contracted by BLAS,
+    # without materializing the portfolio x time x symbol intermediate. Paths
+    # are laid out portfolio-major so every scan over time runs along
+    # contiguous memory.
+    return holdings @ prices.T
+
+
+def simple_returns(values, previous=None, out=None):
+    # Per-bar returns of (portfolio x time) values; `previous` is the value
+    # column just before `values` (without it the first bar has no return)
+    if previous is None:
+        base, current = values[:, :-1], values[:, 1:]
+    else:
+        base = np.empty_like(values)
+        base[:, 0] = previous
+        base[:, 1:] = values[:, :-1]
+        current = values
+    if out is None:
+        out = np.empty_like(current)
+    if base.size and base.min() > 0:
+        np.divide(current, base, out=out)
+    else:
+        out[...] = 1.0
+        np.divide(current, base, out=out, where=base != 0)
+    out -= 1.0
+    return out
+
+
+def _window_sums(series, window):
+    # Sum of each trailing `window` along time (axis 1), from one running sum
+    sums = np.cumsum(series, axis=1, out=series)
+    windows = np.empty((sums.shape[0], sums.shape[1] - window + 1))
+    windows[:, 0] = sums[:, window - 1]
+    np.subtract(sums[:, window:], sums[:, :-window], out=windows[:, 1:])
+    return windows, sums
+
+
+def rolling_variance(returns, window, overwrite=False):
+    # Sample variance of each trailing `window` of returns (portfolio x time);
+    # returns (variances, running sum of returns, running sum of squares).
+    # overwrite=True lets the running sum replace `returns` in place.
+    if returns.shape[1] < window:
+        empty = np.zeros((returns.shape[0], 0))
+        return empty, np.cumsum(returns, axis=1), np.cumsum(returns * returns, axis=1)
+    squares = returns * returns
+    window_sum, sums = _window_sums(returns if overwrite else returns.copy(), window)
+    window_squares, square_sums = _window_sums(squares, window)
+    window_sum *= window_sum
+    window_sum /= window
+    window_squares -= window_sum
+    window_squares /= max(1, window - 1)
+    np.maximum(window_squares, 0.0, out=window_squares)
+    return window_squares, sums, square_sums
+
+
+def rolling_volatility(returns, window):
+    return np.sqrt(rolling_variance(returns, window)[0])
+
+
+def max_drawdown(values, peak=None):
+    # Returns (worst peak-to-trough fall as a negative fraction, running peak)
+    running = np.maximum.accumulate(values, axis=1)
+    if peak is not None:
+        np.maximum(running, peak[:, None], out=running)
+    last_peak = running[:, -1].copy()
+    if running.size and running.min() > 0:
+        np.divide(values, running, out=running)
+    else:
+        running = np.divide(values, running, out=np.ones_like(running), where=running > 0)
+    return running.min(axis=1) - 1.0, last_peak
+
+
+class BacktestResult:
+    def __init__(self, timestamps, start_values, final_values, total_return, volatility, max_drawdown,
+                 rolling_volatility_last, rolling_volatility_max, missing_symbols, elapsed,
+                 values=None, returns=None, rolling=None):
+        self.timestamps = timestamps
+        self.start_values = start_values
+        self.final_values = final_values
+        self.total_return = total_return
+        self.volatility = volatility
+        self.max_drawdown = max_drawdown
+        self.rolling_volatility_last = rolling_volatility_last
+        self.rolling_volatility_max = rolling_volatility_max
+        self.missing_symbols = missing_symbols
+        self.elapsed = elapsed
+        # Full (portfolio x time) paths, only kept when asked for
+        self.values = values
+        self.returns = returns
+        self.rolling = rolling
+
+
+def backtest(timestamps, prices, holdings, window=DEFAULT_WINDOW, periods_per_year=MINUTES_PER_YEAR,
+             chunk_rows=None, keep_paths=False, missing_symbols=()):
+    # Value paths, returns, rolling volatility and drawdown for every portfolio
+    # at once from a (time x symbol) price matrix and (portfolio x symbol)
+    # holdings. Time is processed in chunks with carried state, so a
+    # memory-mapped history of years of minute bars is never loaded whole and
+    # each chunk's working set stays near DEFAULT_CHUNK_BYTES.
+    started = time.perf_counter()
+    num_rows = len(timestamps)
+    num_portfolios = holdings.shape[0]
+    window = max(2, window)
+    if chunk_rows is None:
+        chunk_rows = max(window + 1, DEFAULT_CHUNK_BYTES // (8 * max(1, num_portfolios)))
+
+    last_prices = None
+    previous = None
+    peak = None
+    first_values = None
+    tail = np.zeros((num_portfolios, 0))
+    worst = np.zeros(num_portfolios)
+    count = 0
+    total = np.zeros(num_portfolios)
+    total_squares = np.zeros(num_portfolios)
+    variance_last = np.zeros(num_portfolios)
+    variance_max = np.zeros(num_portfolios)
+    paths = ([], [], []) if keep_paths else None
+
+    for start in range(0, num_rows, chunk_rows):
+        chunk = fill_forward(prices[start:start + chunk_rows], last_prices)
+        last_prices = chunk[-1]
+        values = value_paths(holdings, chunk)
+        if first_values is None:
+            first_values = values[:, 0].copy()
+
+        # Returns are written after the carried tail of the previous chunk, so
+        # rolling windows straddling the boundary need no extra copy
+        carried = tail.shape[1]
+        returns_width = values.shape[1] - (previous is None)
+        extended = np.empty((num_portfolios, carried + returns_width))
+        extended[:, :carried] = tail
+        returns = simple_returns(values, previous, out=extended[:, carried:])
+        if keep_paths:
+            paths[1].append(returns.copy())
+        tail = extended[:, -(window - 1):].copy()
+        previous = values[:, -1].copy()
+
+        variances, sums, square_sums = rolling_variance(extended, window, overwrite=True)
+        count += returns_width
+        if returns_width:
+            before = carried - 1
+            total += sums[:, -1] - (sums[:, before] if before >= 0 else 0.0)
+            total_squares += square_sums[:, -1] - (square_sums[:, before] if before >= 0 else 0.0)
+        if variances.shape[1]:
+            variance_last = variances[:, -1]
+            np.maximum(variance_max, variances.max(axis=1), out=variance_max)
+
+        if keep_paths:
+            paths[0].append(values.copy())
+            paths[2].append(np.sqrt(variances))
+        chunk_worst, peak = max_drawdown(values, peak)
+        np.minimum(worst, chunk_worst, out=worst)
+
+    if first_values is None:
+        first_values = np.zeros(num_portfolios)
+        previous = first_values
+    mean = total / max(1, count)
+    variance = (total_squares - count * mean * mean) / max(1, count - 1)
+    annualize = np.sqrt(periods_per_year)
+    total_return = np.divide(previous - first_values, first_values, out=np.zeros(num_portfolios),
+                             where=first_values != 0)
+
+    result = BacktestResult(
+        np.asarray(timestamps), first_values, previous, total_return, np.sqrt(np.maximum(variance, 0.0)) * annualize,
+        worst, np.sqrt(variance_last) * annualize, np.sqrt(variance_max) * annualize, list(missing_symbols),
+        time.perf_counter() - started)
+    if keep_paths:
+        result.values = np.hstack(paths[0])
+        result.returns = np.hstack(paths[1])
+        result.rolling = np.hstack(paths[2]) * annualize
+    return result
+
+
+def backtest_book(book, history, start=None, end=None, **options):
+    # Backtest a PortfolioBook over a PriceHistory window
+    timestamps, prices = history.window(start, end)
+    holdings, missing = holdings_matrix(book, history.columns)
+    return backtest(timestamps, prices, holdings, missing_symbols=missing, **options)
+
+
+def load_holdings(path):
+    # A portfolio text file (every '#' section is one portfolio) or a saved .pfbook
+    from portfolio_store import load_book, read_book
+    return load_book(path) if path.endswith('.pfbook') else read_book(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Value paths, returns, volatility and drawdown over a price history.')
+    parser.add_argument('book', help='portfolio text file or .pfbook')
+    parser.add_argument('history', help='price_history.py store directory')
+    parser.add_argument('--days', type=float, default=90.0, help='window ending at the last snapshot')
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help='rolling volatility window, in bars')
+    args = parser.parse_args()
+
+    from price_history import PriceHistory
+
+    book = load_holdings(args.book)
+    history = PriceHistory(args.history)
+    if not len(history):
+        print(f"'{args.history}' has no snapshots yet.")
+        return
+    end = history.timestamps[-1]
+    timestamps, _ = history.window(end - args.days * 86400, None)
+    periods_per_year = (365 * 86400) / np.median(np.diff(timestamps)) if len(timestamps) > 1 else MINUTES_PER_YEAR
+    result = backtest_book(book, history, end - args.days * 86400, None, window=args.window,
+                           periods_per_year=periods_per_year)
+
+    print(f"{len(result.timestamps)} bars x {len(book)} portfolios in {result.elapsed:.3f} s")
+    names = [str(name) for name in book.names] if book.names else [str(i) for i in range(len(book))]
+    width = max([12] + [len(name) + 2 for name in names])
+    print(f"{'portfolio':>{width}}{'start $':>20}{'end $':>20}{'return':>10}{'vol (ann.)':>12}{'max DD':>10}")
+    for i, name in enumerate(names):
+        print(f"{name:>{width}}{result.start_values[i]:>20,.2f}{result.final_values[i]:>20,.2f}"
+              f"{result.total_return[i]:>10.2%}{result.volatility[i]:>12.2%}{result.max_drawdown[i]:>10.2%}")
+    if result.missing_symbols:
+        print(f"No history for: {', '.join(result.missing_symbols)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import asyncio
+import time
+from urllib.parse import quote, urlencode
+
+from dotenv import load_dotenv
+from price_client import PriceClient, cached_prices, id_quote_params, parse_prices, quote_params
+
+# Request limits for /v1/cryptocurrency/quotes/latest
+MAX_SYMBOLS_PER_REQUEST = 100
+MAX_URL_LENGTH = 2000
+
+
+def symbol_union(portfolios):
+    # Ordered, de-duplicated union of every symbol held across the run
+    seen = {}
+    for portfolio in portfolios:
+        for symbol in portfolio:
+            seen.setdefault(symbol.upper(), None)
+    return list(seen)
+
+
+def request_url_length(url, symbols, params=quote_params):
+    return len(url) + 1 + len(urlencode(params(symbols)))
+
+
+def plan_batches(symbols, url, max_symbols=MAX_SYMBOLS_PER_REQUEST, max_url_length=MAX_URL_LENGTH,
+                 params=quote_params):
+    base_length = request_url_length(url, [], params)
+    comma_length = len(quote(',', safe=''))
+    batches = []
+    current = []
+    current_length = base_length
+
+    for symbol in symbols:
+        symbol_length = len(quote(symbol, safe=''))
+        added_length = symbol_length + (comma_length if current else 0)
+        if current and (len(current) >= max_symbols
+                        or current_length + added_length > max_url_length):
+            batches.append(current)
+            current = []
+            current_length = base_length
+            added_length = symbol_length
+        current.append(symbol)
+        current_length += added_length
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def plan_id_batches(ids, url, max_ids=MAX_SYMBOLS_PER_REQUEST, max_url_length=MAX_URL_LENGTH):
+    # The same caps for id queries (quotes/latest?id=1,1027,...)
+    batches = plan_batches([str(coin_id) for coin_id in ids], url, max_ids, max_url_length, id_quote_params)
+    return [[int(coin_id) for coin_id in batch] for batch in batches]
+
+
+def fan_out(prices, portfolios):
+    # Per-portfolio price dicts built from the shared price table, which is
+    # keyed by upper-case symbol like symbol_union
+    return [{symbol: prices.get(symbol.upper(), 0.0) for symbol in portfolio} for portfolio in portfolios]
+
+
+async def fetch_batched_prices(client, portfolios, max_symbols=MAX_SYMBOLS_PER_REQUEST,
+                               max_url_length=MAX_URL_LENGTH):
+    prices, missing = cached_prices(client.cache, symbol_union(portfolios))
+    batches = plan_batches(missing, client.url, max_symbols, max_url_length)
+    # The cache was checked once above; fetch_batch would check it again
+    results = await asyncio.gather(*(client.fetch_missing(batch) for batch in batches))
+
+    for batch_prices in results:
+        prices.update(batch_prices)
+    return prices
+
+
+def fetch_batched_prices_serial(client, portfolios, max_symbols=MAX_SYMBOLS_PER_REQUEST,
+                                max_url_length=MAX_URL_LENGTH):
+    prices, missing = cached_prices(client.cache, symbol_union(portfolios))
+    for batch in plan_batches(missing, client.url, max_symbols, max_url_length):
+        prices.update(parse_prices(client.fetch_quotes(batch), batch))
+    return prices
+
+
+def value_portfolios(portfolios, prices):
+    # Holdings keep the caller's spelling; fan_out looks each one up upper-cased
+    totals = []
+    for portfolio_prices, portfolio in zip(fan_out(prices, portfolios), portfolios):
+        totals.append(sum(portfolio_prices[symbol] * amount for symbol, amount in portfolio.items()))
+    return totals
+
+
+async def value_portfolios_batched(portfolios, client=None, max_symbols=MAX_SYMBOLS_PER_REQUEST):
+    portfolios = list(portfolios)
+    if client is None:
+        async with PriceClient() as client:
+            return await value_portfolios_batched(portfolios, client, max_symbols)
+
+    prices = await fetch_batched_prices(client, portfolios, max_symbols)
+    return value_portfolios(portfolios, prices)
+
+
+def main():
+    from portfolio_store import sized_portfolios
+
+    load_dotenv()
+    portfolios = sized_portfolios('portfolios.txt')
+    holdings = sum(num_assets for num_assets, _ in portfolios)
+
+    async def run():
+        async with PriceClient() as client:
+            totals = await value_portfolios_batched((portfolio for _, portfolio in portfolios), client)
+            return totals, client.request_count
+
+    start_time = time.perf_counter()
+    totals, request_count = asyncio.run(run())
+    end_time = time.perf_counter()
+
+    for (num_assets, _), total_value in zip(portfolios, totals):
+        print(f"Portfolio with {num_assets} assets: ${total_value:.2f}")
+    print(f"\nHoldings valued: {holdings}")
+    print(f"Requests sent (batched): {request_count}")
+    print(f"Time Taken (Batched): {end_time - start_time:.2f} seconds")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from backtest import backtest, backtest_book, holdings_matrix
+from benchmark_incremental import make_book
+from price_history import PriceHistory, ingest_synthetic
+
+PORTFOLIO_COUNTS = (100, 1000, 5000)
+DAY_COUNTS = (1, 30, 365)
+DEFAULT_UNIVERSE = 100
+DEFAULT_MEAN_ASSETS = 10
+LOOP_BARS = 200
+
+
+# The per-day, per-holding loop this replaces, as value_portfolio would do it
+def backtest_with_loops(prices, holdings_dicts, columns):
+    paths = []
+    for portfolio in holdings_dicts:
+        path = []
+        for row in prices:
+            total_value = 0.0
+            for symbol, amount in portfolio.items():
+                total_value += row[columns[symbol]] * amount
+            path.append(total_value)
+        returns = [(b - a) / a if a else 0.0 for a, b in zip(path, path[1:])]
+        peak = path[0]
+        worst = 0.0
+        for value in path:
+            peak = max(peak, value)
+            worst = min(worst, value / peak - 1.0 if peak else 0.0)
+        paths.append((path, returns, worst))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vectorized backtest throughput over memory-mapped minute bars.')
+    parser.add_argument('--universe', type=int, default=DEFAULT_UNIVERSE)
+    parser.add_argument('--mean-assets', type=int, default=DEFAULT_MEAN_ASSETS)
+    parser.add_argument('--portfolios', type=int, nargs='+', default=list(PORTFOLIO_COUNTS))
+    parser.add_argument('--days', type=int, nargs='+', default=list(DAY_COUNTS))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='backtest_bench_')
+    try:
+        # One memory-mapped history long enough for the largest window
+        history = PriceHistory.create(directory, [f"SYM{i}" for i in range(args.universe)])
+        bars = max(args.days) * 24 * 60
+        start = time.perf_counter()
+        ingest_synthetic(history, 0.0, 60.0, bars, args.seed)
+        print(f"History: {bars} minute bars x {args.universe} symbols "
+              f"({bars * args.universe * 8 / 1e6:.0f} MB) written in {time.perf_counter() - start:.1f} s")
+
+        # Baseline: Python loops on a short slice, extrapolated per bar x portfolio
+        book, _ = make_book(100, args.universe, args.mean_assets, args.seed)
+        holdings_dicts = [book.holdings(pid) for pid in range(len(book))]
+        _, loop_prices = history.window(None, LOOP_BARS * 60.0)
+        start = time.perf_counter()
+        backtest_with_loops(np.asarray(loop_prices), holdings_dicts, history.columns)
+        loop_cell = (time.perf_counter() - start) / (LOOP_BARS * len(book))
+        holdings, _ = holdings_matrix(book, history.columns)
+        check = backtest(np.arange(LOOP_BARS), np.asarray(loop_prices), holdings, keep_paths=True)
+        assert np.allclose(check.values[0], backtest_with_loops(np.asarray(loop_prices), holdings_dicts[:1],
+                                                                   history.columns)[0][0])
+        print(f"Python loop baseline: {loop_cell * 1e6:.2f} us per bar x portfolio")
+
+        print(f"{'portfolios':>11}{'days':>6}{'bars':>9}{'seconds':>10}{'M cells/s':>11}{'loop est. s':>13}"
+              f"{'speedup':>9}")
+        for num_portfolios in args.portfolios:
+            book, _ = make_book(num_portfolios, args.universe, args.mean_assets, args.seed)
+            for days in args.days:
+                end = days * 86400.0
+                result = backtest_book(book, history, None, end)
+                cells = len(result.timestamps) * num_portfolios
+                loop_estimate = loop_cell * cells
+                print(f"{num_portfolios:>11}{days:>6}{len(result.timestamps):>9}{result.elapsed:>10.2f}"
+                      f"{cells / result.elapsed / 1e6:>11.1f}{loop_estimate:>13.0f}"
+                      f"{loop_estimate / result.elapsed:>8.0f}x")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+
+from mock_cmc_server import MockCMC, MockConfig
+from price_client import found_prices
+from quote_decoder import JsonDecoder, LeanQuoteDecoder, orjson
+
+BATCH_SIZES = (1, 10, 100)
+DEFAULT_REPEATS = 200
+# Live entries carry far more than the mock's: tag lists and token platforms
+LIVE_TAGS = ['mineable', 'pow', 'sha-256', 'store-of-value', 'state-channel', 'coinbase-ventures-portfolio',
+             'three-arrows-capital-portfolio', 'polychain-capital-portfolio', 'binance-labs-portfolio',
+             'blockchain-capital-portfolio', 'boostvc-portfolio', 'cms-holdings-portfolio', 'dcg-portfolio']
+
+
+def make_payload(num_symbols, seed=0):
+    mock = MockCMC(MockConfig(universe_size=max(num_symbols, 20), seed=seed))
+    now = '2025-01-01T00:00:00.000Z'
+    symbols = list(mock.universe)[:num_symbols]
+    data = {}
+    for i, symbol in enumerate(symbols):
+        entry = mock.quote_entry(symbol, now)
+        entry['tags'] = LIVE_TAGS
+        if i % 2:
+            entry['platform'] = {'id': 1027, 'name': 'Ethereum', 'symbol': 'ETH', 'slug': 'ethereum',
+                                 'token_address': '0x' + '0' * 40}
+        data[symbol] = entry
+    body = json.dumps({'status': mock.status_block(), 'data': data}, separators=(',', ':')).encode()
+    return symbols, body
+
+
+def time_decoder(decoder, body, symbols, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        decoder.decode(body, symbols)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    decoder.decode(body, symbols)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Quote response decode time and allocation by decoder.')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    args = parser.parse_args()
+
+    decoders = [('json', lambda: JsonDecoder('json'))]
+    if orjson is not None:
+        decoders.append(('orjson', lambda: JsonDecoder('orjson')))
+    decoders.append(('lean', LeanQuoteDecoder))
+
+    print(f"{'symbols':>8}{'bytes':>9}{'decoder':>9}{'median us':>12}{'peak alloc KB':>15}{'vs json':>9}")
+    for num_symbols in BATCH_SIZES:
+        symbols, body = make_payload(num_symbols)
+        reference = found_prices(json.loads(body))
+        baseline = None
+        for name, factory in decoders:
+            decoder = factory()
+            assert found_prices(decoder.decode(body, symbols)) == reference
+            median, peak = time_decoder(decoder, body, symbols, args.repeats)
+            baseline = baseline or median
+            print(f"{num_symbols:>8}{len(body):>9}{name:>9}{median * 1e6:>12.1f}{peak / 1024:>15.1f}"
+                  f"{baseline / median:>8.1f}x")
+
+if __name__ == '__main__':
+    main()
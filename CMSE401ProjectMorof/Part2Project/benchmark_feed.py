@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+
+from benchmark_incremental import make_book
+from incremental_valuation import IncrementalValuationStore
+from price_feed import FeedValuator, SyntheticTickSource
+
+SYMBOL_COUNTS = (100, 1000, 10000)
+PORTFOLIO_COUNTS = (1000, 10000, 100000)
+DEFAULT_TICKS = 50000
+
+
+def run_case(num_symbols, num_portfolios, num_ticks, rate, seed):
+    book, prices = make_book(num_portfolios, num_symbols, min(10, num_symbols), seed)
+    store = IncrementalValuationStore(book, prices)
+    source = SyntheticTickSource(book.symbols.symbols, num_ticks, rate=rate, seed=seed, start_prices=prices)
+    valuator = FeedValuator(store)
+    return asyncio.run(valuator.run(source))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Feed-mode throughput and update lag at increasing scale.')
+    parser.add_argument('--ticks', type=int, default=DEFAULT_TICKS)
+    parser.add_argument('--rate', type=float, default=None,
+                        help='paced ticks/second (default: as fast as possible, i.e. max throughput)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'symbols':>8}{'portfolios':>12}{'ticks/s':>12}{'batches':>9}{'lag p50 ms':>12}"
+          f"{'lag p99 ms':>12}{'lag max ms':>12}")
+    for num_symbols in SYMBOL_COUNTS:
+        for num_portfolios in PORTFOLIO_COUNTS:
+            stats = run_case(num_symbols, num_portfolios, args.ticks, args.rate, args.seed)
+            print(f"{num_symbols:>8}{num_portfolios:>12}{stats['ticks_per_second']:>12.0f}{stats['batches']:>9}"
+                  f"{stats['lag_p50_ms']:>12.3f}{stats['lag_p99_ms']:>12.3f}{stats['lag_max_ms']:>12.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import aiohttp
+from benchmark_runner import percentile
+from mock_cmc_server import build_universe
+from results_db import DEFAULT_DB, ResultsStore, basic_summary, environment_metadata
+
+DEFAULT_CLIENTS = [1, 10, 50, 200]
+DEFAULT_DURATION = 10.0
+DEFAULT_BOOKS = 200
+DEFAULT_UNIVERSE = 500
+DEFAULT_QUOTES_SHARE = 0.2
+# Short enough that quotes expire and go upstream again during each level
+DEFAULT_TTL = 5.0
+RESULTS_FILE = 'gateway_load_results.json'
+STARTUP_TIMEOUT = 15.0
+ENDPOINTS = ('value', 'quotes')
+
+
+def make_books(count, universe_size, seed=0):
+    # Overlapping books: sizes 2-40, symbols drawn by 1/rank popularity
+    rng = random.Random(seed)
+    symbols = list(build_universe(universe_size, seed))
+    weights = [1.0 / rank for rank in range(1, len(symbols) + 1)]
+    books = []
+    for _ in range(count):
+        held = dict.fromkeys(rng.choices(symbols, weights, k=rng.randint(2, 40)))
+        books.append({symbol: round(rng.lognormvariate(0.0, 2.0), 6) for symbol in held})
+    return books
+
+
+# --- Gateway process ---
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gateway(port, ttl, mock_latency, extra_args=()):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'price_gateway.py')
+    command = [sys.executable, script, '--mock', '--port', str(port), '--ttl', str(ttl),
+               '--mock-latency', str(mock_latency), *extra_args]
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+
+async def wait_ready(session, base_url, timeout=STARTUP_TIMEOUT):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            async with session.get(base_url + '/health') as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"gateway at {base_url} did not come up within {timeout:.0f} s")
+        await asyncio.sleep(0.1)
+
+
+async def gateway_stats(session, base_url):
+    async with session.get(base_url + '/stats') as response:
+        return await response.json()
+
+
+# --- Closed-loop load: each client sends its next request when the last one returns ---
+async def client_loop(session, base_url, books, quotes_share, deadline, rng, latencies, errors):
+    while time.perf_counter() < deadline:
+        book = rng.choice(books)
+        if rng.random() < quotes_share:
+            endpoint = 'quotes'
+            request = session.get(base_url + '/quotes', params={'symbol': ','.join(book)})
+        else:
+            endpoint = 'value'
+            request = session.post(base_url + '/value', json={'holdings': book})
+        start = time.perf_counter()
+        try:
+            async with request as response:
+                await response.read()
+                ok = response.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            ok = False
+        if ok:
+            latencies[endpoint].append(time.perf_counter() - start)
+        else:
+            errors[endpoint] += 1
+
+
+async def run_level(base_url, books, clients, duration, quotes_share, seed):
+    latencies = {endpoint: [] for endpoint in ENDPOINTS}
+    errors = dict.fromkeys(ENDPOINTS, 0)
+    connector = aiohttp.TCPConnector(limit=clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        before = await gateway_stats(session, base_url)
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(client_loop(session, base_url, books, quotes_share, deadline,
+                                           random.Random(seed * 10007 + index), latencies, errors)
+                               for index in range(clients)))
+        elapsed = time.perf_counter() - start
+        after = await gateway_stats(session, base_url)
+    upstream = after['upstream_requests'] - before['upstream_requests']
+    return latencies, errors, elapsed, upstream, after
+
+
+def summarize_latencies(samples, elapsed):
+    summary = basic_summary(samples)
+    summary.update({
+        'p90': percentile(samples, 90),
+        'p99': percentile(samples, 99),
+        'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'requests_per_second': len(samples) / elapsed,
+    })
+    return summary
+
+
+def print_level(clients, latencies, errors, elapsed, upstream):
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"\n{clients} clients, {elapsed:.1f} s: {total / elapsed:.0f} req/s, "
+          f"{upstream} upstream requests ({upstream / total * 1000 if total else 0.0:.1f} per 1000)")
+    print(f"  {'endpoint':<10}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}"
+          f"{'p99 ms':>9}{'max ms':>9}")
+    for endpoint in ENDPOINTS:
+        samples = latencies[endpoint]
+        if not samples:
+            continue
+        s = summarize_latencies(samples, elapsed)
+        print(f"  {endpoint:<10}{len(samples):>9}{errors[endpoint]:>8}{s['requests_per_second']:>9.0f}"
+              f"{s['median'] * 1e3:>9.2f}{s['p90'] * 1e3:>9.2f}{s['p99'] * 1e3:>9.2f}{s['max'] * 1e3:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test for price_gateway.py: requests/second and latency '
+                                                 'percentiles at increasing client concurrency.')
+    parser.add_argument('--gateway', help='URL of a running gateway (default: start one against the mock)')
+    parser.add_argument('--clients', type=int, nargs='+', default=DEFAULT_CLIENTS,
+                        help='concurrent clients per level')
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='seconds per level')
+    parser.add_argument('--books', type=int, default=DEFAULT_BOOKS, help='distinct portfolios the clients share')
+    parser.add_argument('--universe', type=int, default=DEFAULT_UNIVERSE, help='symbols the books draw from')
+    parser.add_argument('--quotes-share', type=float, default=DEFAULT_QUOTES_SHARE,
+                        help='fraction of requests that are GET /quotes (the rest POST /value)')
+    parser.add_argument('--ttl', type=float, default=DEFAULT_TTL, help='quote TTL of the started gateway')
+    parser.add_argument('--batch-window', type=float, default=None, help='batch window of the started gateway')
+    parser.add_argument('--mock-latency', type=float, default=0.05, help='upstream mock latency (seconds)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=RESULTS_FILE)
+    parser.add_argument('--db', default=DEFAULT_DB, help='append the run to this results database')
+    parser.add_argument('--no-db', dest='db', action='store_const', const=None, help='do not store the run')
+    args = parser.parse_args()
+    if len(set(args.clients)) != len(args.clients):
+        # Each level is stored under its client count
+        parser.error('--clients values must be distinct')
+
+    books = make_books(args.books, args.universe, args.seed)
+    process = None
+    base_url = args.gateway.rstrip('/') if args.gateway else None
+    if base_url is None:
+        port = free_port()
+        extra = ('--batch-window', str(args.batch_window)) if args.batch_window is not None else ()
+        process = start_gateway(port, args.ttl, args.mock_latency, extra)
+        base_url = f"http://127.0.0.1:{port}"
+
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            await wait_ready(session, base_url)
+        levels = []
+        for clients in args.clients:
+            level = await run_level(base_url, books, clients, args.duration, args.quotes_share, args.seed)
+            print_level(clients, *level[:4])
+            levels.append((clients, *level))
+        return levels
+
+    print(f"Load testing {base_url} with {args.books} books over {args.universe} symbols, "
+          f"{args.duration:.0f} s per level...")
+    try:
+        levels = asyncio.run(run())
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    results = []
+    level_rows = []
+    for clients, latencies, errors, elapsed, upstream_requests, stats in levels:
+        total = sum(len(samples) for samples in latencies.values())
+        level_rows.append({'clients': clients, 'requests': total, 'errors': sum(errors.values()),
+                         'requests_per_second': total / elapsed, 'upstream_requests': upstream_requests,
+                         'gateway_stats': stats})
+        for endpoint in ENDPOINTS:
+            if latencies[endpoint]:
+                results.append({'mode': f'gateway-{endpoint}', 'num_assets': clients,
+                                'samples': latencies[endpoint],
+                                'summary': summarize_latencies(latencies[endpoint], elapsed)})
+
+    # num_assets holds the client count for these cases
+    metadata = {
+        **environment_metadata(),
+        'base_url': base_url,
+        'modes': [f'gateway-{endpoint}' for endpoint in ENDPOINTS],
+        'clients': args.clients,
+        'duration': args.duration,
+        'books': args.books,
+        'universe': args.universe,
+        'quotes_share': args.quotes_share,
+        'ttl': args.ttl if process is not None else None,
+        'batch_window': args.batch_window,
+        'mock_latency': args.mock_latency if process is not None else None,
+        'seed': args.seed,
+        'mock': process is not None,
+        'timer': 'time.perf_counter',
+    }
+    with open(args.output, 'w') as f:
+        json.dump({'meta': metadata, 'levels': level_rows, 'results': results}, f, indent=2)
+    print(f"\nResults saved to '{args.output}'.")
+    if args.db:
+        with ResultsStore(args.db) as store:
+            run_id = store.record_run(metadata, results, 'benchmark_gateway.py')
+        print(f"Stored as run {run_id} in '{args.db}'.")
+
+if __name__ == '__main__':
+    main()
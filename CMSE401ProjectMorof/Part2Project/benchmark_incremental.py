@@ -0,0 +1,89 @@
+import argparse
+import statistics
+import time
+
+import numpy as np
+from incremental_valuation import IncrementalValuationStore
+from valuation_engine import PortfolioBook, SymbolTable
+from workload import load_workload
+
+DEFAULT_PORTFOLIOS = 200000
+DEFAULT_UNIVERSE = 5000
+DEFAULT_MEAN_ASSETS = 10
+DEFAULT_UPDATES = 200
+POPULARITY_EXPONENT = 1.1
+
+
+def make_book(num_portfolios, universe_size, mean_assets, seed=0):
+    # Portfolio sizes ~ Poisson, symbols drawn with Zipf-like popularity so a
+    # few symbols have many holders and most have few
+    rng = np.random.default_rng(seed)
+    sizes = np.maximum(1, rng.poisson(mean_assets, size=num_portfolios))
+    popularity = 1.0 / np.arange(1, universe_size + 1) ** POPULARITY_EXPONENT
+    popularity /= popularity.sum()
+
+    portfolio_ids = np.repeat(np.arange(num_portfolios, dtype=np.int32), sizes)
+    symbol_ids = rng.choice(universe_size, size=len(portfolio_ids), p=popularity).astype(np.int32)
+    amounts = rng.uniform(0.1, 1000.0, size=len(portfolio_ids))
+    symbols = SymbolTable(f"SYM{i}" for i in range(universe_size))
+    prices = 10 ** rng.uniform(-4, 4, size=universe_size)
+    return PortfolioBook(portfolio_ids, symbol_ids, amounts, symbols, num_portfolios), prices
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental revaluation vs full recompute.')
+    parser.add_argument('--portfolios', type=int, default=DEFAULT_PORTFOLIOS)
+    parser.add_argument('--universe', type=int, default=DEFAULT_UNIVERSE)
+    parser.add_argument('--mean-assets', type=int, default=DEFAULT_MEAN_ASSETS)
+    parser.add_argument('--updates', type=int, default=DEFAULT_UPDATES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workload', help="'10x', '100x', '1000x' or a .pfbook/text file (see workload.py) "
+                                           "instead of --portfolios/--universe/--mean-assets")
+    args = parser.parse_args()
+
+    if args.workload:
+        book, prices = load_workload(args.workload, args.seed)
+    else:
+        book, prices = make_book(args.portfolios, args.universe, args.mean_assets, args.seed)
+    print(f"{len(book)} portfolios, {book.num_holdings} holdings, {len(book.symbols)} symbols")
+
+    start = time.perf_counter()
+    store = IncrementalValuationStore(book, prices, resync_every=0)
+    print(f"Store build (totals + inverted index): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rng = np.random.default_rng(args.seed + 1)
+    columns = rng.integers(0, len(book.symbols), size=args.updates)
+    # Always include the most widely held symbol: the worst case for incremental
+    columns[0] = 0
+    moves = rng.normal(1.0, 0.01, size=args.updates)
+
+    full_prices = prices.copy()
+    incremental_times = []
+    full_times = []
+    changed_counts = []
+    for column, move in zip(columns, moves):
+        symbol = book.symbols.symbols[column]
+        new_price = full_prices[column] * move
+
+        start = time.perf_counter()
+        changed = store.apply(symbol, new_price)
+        incremental_times.append(time.perf_counter() - start)
+        changed_counts.append(len(changed))
+
+        start = time.perf_counter()
+        full_prices[column] = new_price
+        full_totals = book.totals(full_prices)
+        full_times.append(time.perf_counter() - start)
+
+    assert np.allclose(store.totals, full_totals, rtol=1e-9)
+
+    inc_median = statistics.median(incremental_times)
+    full_median = statistics.median(full_times)
+    print(f"Updates applied: {args.updates}, portfolios changed per update: "
+          f"median {statistics.median(changed_counts):.0f}, max {max(changed_counts)}")
+    print(f"Incremental:     median {inc_median * 1e6:10.1f} us   max {max(incremental_times) * 1e6:10.1f} us")
+    print(f"Full recompute:  median {full_median * 1e6:10.1f} us   max {max(full_times) * 1e6:10.1f} us")
+    print(f"Speedup (median): {full_median / inc_median:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -1,80 +1,39 @@
 import asyncio
-import aiohttp
-import os
 import time
-import matplotlib.pyplot as plt
 from dotenv import load_dotenv
-
-# Load API key
-load_dotenv()
-API_KEY = os.getenv('CMC_API_KEY')
-
-# API URL and headers
-url = 'https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest'
-headers = {
-    'X-CMC_PRO_API_KEY': API_KEY
-}
-
-def load_portfolios_from_txt(filename):
-    portfolios = {}
-    current_portfolio = {}
-    current_size = None
-
-    with open(filename, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith('#'):
-                if current_portfolio and current_size:
-                    portfolios[current_size] = current_portfolio
-                    current_portfolio = {}
-                current_size = int(line.split()[3])
-            else:
-                symbol, amount = line.split()
-                current_portfolio[symbol.upper()] = float(amount)
-
-        if current_portfolio and current_size:
-            portfolios[current_size] = current_portfolio
-
-    return portfolios
-
-async def fetch_price_parallel(session, symbol):
-    params = {'symbol': symbol, 'convert': 'USD'}
-    async with session.get(url, headers=headers, params=params) as response:
-        data = await response.json()
-
-        if 'data' in data and symbol in data['data']:
-            return symbol, data['data'][symbol]['quote']['USD']['price']
-        else:
-            print(f"Price for {symbol} not found. Skipping.")
-            return symbol, 0.0
-
-async def value_portfolio_parallel(portfolio):
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch_price_parallel(session, symbol) for symbol in portfolio.keys()]
-        results = await asyncio.gather(*tasks)
-
+from plotting import pyplot, save_figure
+from portfolio_store import sized_portfolios
+from price_client import PriceClient
+from quote_cache import QuoteCache
+from rate_limit import FetchController
+from resilience import Resilience
+from results_db import ResultsStore
+from streaming_valuation import ValuationSummary, stream_valuation
+
+async def value_portfolio_parallel(portfolio, client=None):
+    if client is None:
+        async with PriceClient() as client:
+            return await value_portfolio_parallel(portfolio, client)
+
+    # Holdings print as their quotes arrive instead of after the slowest one
     total_value = 0.0
-    prices = dict(results)
-
     print("\nHoldings breakdown:")
-    for symbol, amount in portfolio.items():
-        price = prices.get(symbol, 0.0)
-        holding_value = price * amount
-        print(f"{amount:.4f} {symbol} @ ${price:.2f} each = ${holding_value:.2f}")
-        total_value += holding_value
+    async for update in stream_valuation(portfolio, client):
+        if isinstance(update, ValuationSummary):
+            total_value = update.total_value
+            continue
+        print(f"{update.amount:.4f} {update.symbol} @ ${update.price:.2f} each = ${update.value:.2f}")
     return total_value
 
-def benchmark_parallel(portfolios):
+async def benchmark_parallel_async(portfolios, client):
     parallel_times = []
 
-    for num_assets, portfolio in portfolios.items():
+    for num_assets, portfolio in portfolios:
         print(f"\nPortfolio with {num_assets} assets: {portfolio}")
 
-        start_time = time.time()
-        total_value = asyncio.run(value_portfolio_parallel(portfolio))
-        end_time = time.time()
+        start_time = time.perf_counter()
+        total_value = await value_portfolio_parallel(portfolio, client)
+        end_time = time.perf_counter()
 
         elapsed_time = end_time - start_time
         parallel_times.append(elapsed_time)
@@ -85,7 +44,18 @@ def benchmark_parallel(portfolios):
 
     return parallel_times
 
+def benchmark_parallel(portfolios, client=None):
+    # One event loop and one pooled client for every portfolio in the run
+    async def run():
+        if client is not None:
+            return await benchmark_parallel_async(portfolios, client)
+        async with PriceClient() as shared_client:
+            return await benchmark_parallel_async(portfolios, shared_client)
+
+    return asyncio.run(run())
+
 def plot_results(num_assets_list, parallel_times):
+    plt = pyplot()
     plt.figure(figsize=(10, 6))
     plt.plot(num_assets_list, parallel_times, label='Parallel', marker='o')
     plt.title('Parallel Portfolio Valuation Timing')
@@ -94,8 +64,7 @@ def plot_results(num_assets_list, parallel_times):
     plt.legend()
     plt.grid(True)
     plt.tight_layout()
-    plt.savefig('benchmark_parallel_results.png')
-    plt.show()
+    save_figure(plt, 'benchmark_parallel_results.png')
 
 def save_results_csv(filename, num_assets_list, times):
     with open(filename, 'w') as f:
@@ -104,14 +73,26 @@ def save_results_csv(filename, num_assets_list, times):
             f.write(f"{num_assets},{time_taken:.4f}\n")
 
 def main():
-    portfolios = load_portfolios_from_txt('portfolios.txt')
+    load_dotenv()
+    portfolios = sized_portfolios('portfolios.txt')
+    num_assets_list = [num_assets for num_assets, _ in portfolios]
 
     print("Starting parallel benchmarking...")
-    parallel_times = benchmark_parallel(portfolios)
-    plot_results(list(portfolios.keys()), parallel_times)
-    save_results_csv('parallel_benchmark_results.csv', list(portfolios.keys()), parallel_times)
+    cache = QuoteCache()
+    controller = FetchController()
+    resilience = Resilience(hedge=True)
+    client = PriceClient(cache=cache, controller=controller, resilience=resilience)
+    parallel_times = benchmark_parallel(portfolios, client)
+    print(f"Quote cache: {cache.stats()}")
+    print(f"Fetch controller: {controller.stats()}")
+    print(f"Retries/hedges: {resilience.stats()}")
+    plot_results(num_assets_list, parallel_times)
+    save_results_csv('parallel_benchmark_results.csv', num_assets_list, parallel_times)
+    with ResultsStore() as store:
+        run_id = store.record_timings('parallel', num_assets_list, parallel_times, 'benchmark_parallel.py')
     print("Parallel benchmarking completed. Graph saved as 'benchmark_parallel_results.png'.")
     print("Parallel benchmark timing saved to 'parallel_benchmark_results.csv'.")
+    print(f"Stored as run {run_id} in the results database.")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,268 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+from batch_planner import value_portfolios_batched
+from portfolio_store import sized_portfolios
+from price_client import PriceClient, SerialPriceClient, resolve_base_url
+from quote_decoder import DECODERS, make_decoder
+from request_trace import TRACE_FILE, PhaseTracer, print_phase_summary
+from results_db import DEFAULT_DB, ResultsStore, environment_metadata
+from threaded_client import DEFAULT_WORKERS, ThreadedPriceClient
+
+MODES = ('serial', 'async', 'batched', 'threaded')
+DEFAULT_REPEATS = 20
+DEFAULT_WARMUP = 2
+BOOTSTRAP_RESAMPLES = 2000
+CONFIDENCE = 0.95
+RESULTS_FILE = 'benchmark_results.json'
+
+
+# --- Statistics ---
+def percentile(samples, pct):
+    # Linear interpolation between closest ranks (same as numpy's default)
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = pct / 100.0 * (len(ordered) - 1)
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def bootstrap_ci(samples, stat=statistics.median, resamples=BOOTSTRAP_RESAMPLES, confidence=CONFIDENCE, seed=0):
+    rng = random.Random(seed)
+    n = len(samples)
+    estimates = sorted(stat([samples[rng.randrange(n)] for _ in range(n)]) for _ in range(resamples))
+    alpha = (1.0 - confidence) / 2.0
+    return percentile(estimates, alpha * 100), percentile(estimates, (1.0 - alpha) * 100)
+
+
+def summarize(samples, seed=0):
+    ci_low, ci_high = bootstrap_ci(samples, seed=seed)
+    return {
+        'n': len(samples),
+        'mean': statistics.fmean(samples),
+        'median': statistics.median(samples),
+        'p90': percentile(samples, 90),
+        'p99': percentile(samples, 99),
+        'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'min': min(samples),
+        'max': max(samples),
+        'median_ci_low': ci_low,
+        'median_ci_high': ci_high,
+        'confidence': CONFIDENCE,
+    }
+
+
+# --- Valuation modes (quiet: printing would be timed too) ---
+class ModeRunner:
+    # Clients, the event loop and the thread pool live for the whole run so
+    # every mode is measured with warm connections.
+
+    def __init__(self, base_url=None, workers=DEFAULT_WORKERS, decoder='auto', tracer=None):
+        self.loop = asyncio.new_event_loop()
+        self.tracer = tracer
+        self.async_client = PriceClient(base_url=base_url, decoder=make_decoder(decoder), tracer=tracer)
+        self.serial_client = SerialPriceClient(base_url=base_url, decoder=make_decoder(decoder), tracer=tracer)
+        self.threaded_client = ThreadedPriceClient(base_url=base_url, workers=workers, decoder=make_decoder(decoder),
+                                                   tracer=tracer)
+
+    def decode_stats(self):
+        # Network vs decode time per client (async covers async and batched)
+        return {name: client.decoder.stats.as_dict() for name, client in
+                (('async', self.async_client), ('serial', self.serial_client), ('threaded', self.threaded_client))}
+
+    def value_serial(self, portfolio):
+        return sum(self.serial_client.fetch_price(symbol) * amount for symbol, amount in portfolio.items())
+
+    def value_threaded(self, portfolio):
+        return self.threaded_client.value_portfolio(portfolio)
+
+    async def _value_async(self, portfolio):
+        prices = await self.async_client.fetch_prices(portfolio.keys())
+        return sum(prices[symbol] * amount for symbol, amount in portfolio.items())
+
+    def value_async(self, portfolio):
+        return self.loop.run_until_complete(self._value_async(portfolio))
+
+    def value_batched(self, portfolio):
+        totals = self.loop.run_until_complete(value_portfolios_batched([portfolio], self.async_client))
+        return totals[0]
+
+    def run(self, mode, portfolio):
+        if self.tracer is not None:
+            self.tracer.label = mode
+        start = time.perf_counter()
+        total = getattr(self, f"value_{mode}")(portfolio)
+        return time.perf_counter() - start, total
+
+    def close(self):
+        self.threaded_client.close()
+        self.serial_client.close()
+        self.loop.run_until_complete(self.async_client.close())
+        self.loop.close()
+
+
+def run_benchmark(portfolios, modes=MODES, repeats=DEFAULT_REPEATS, warmup=DEFAULT_WARMUP,
+                  workers=DEFAULT_WORKERS, base_url=None, seed=0, decoder='auto', tracer=None):
+    runner = ModeRunner(base_url, workers, decoder, tracer)
+    # Keyed by position: portfolios of the same size are timed separately
+    samples = {(mode, index): [] for mode in modes for index in range(len(portfolios))}
+    rng = random.Random(seed)
+
+    try:
+        for _, portfolio in portfolios:
+            for _ in range(warmup):
+                for mode in modes:
+                    runner.run(mode, portfolio)
+        if tracer is not None:
+            # Phase traces cover the timed runs only, like the samples
+            tracer.clear()
+
+        # Interleave: every repeat visits each (mode, portfolio) pair in a fresh
+        # random order, so slow drift in the network affects all modes alike.
+        pairs = list(samples)
+        for repeat in range(repeats):
+            rng.shuffle(pairs)
+            for mode, index in pairs:
+                elapsed, _ = runner.run(mode, portfolios[index][1])
+                samples[(mode, index)].append(elapsed)
+            print(f"Repeat {repeat + 1}/{repeats} done.")
+    finally:
+        runner.close()
+    print_decode_stats(runner.decode_stats())
+
+    # ...and reported per (mode, size), pooling the samples of same-size portfolios
+    by_case = {}
+    for (mode, index), times in samples.items():
+        by_case.setdefault((mode, portfolios[index][0]), []).extend(times)
+    results = []
+    for (mode, size), times in by_case.items():
+        results.append({
+            'mode': mode,
+            'num_assets': size,
+            'samples': times,
+            'summary': summarize(times, seed),
+        })
+    results.sort(key=lambda r: (r['num_assets'], modes.index(r['mode'])))
+    return results
+
+
+def run_metadata(args, base_url):
+    return {
+        **environment_metadata(),
+        'base_url': base_url,
+        'portfolio_file': args.portfolios,
+        'modes': list(args.modes),
+        'repeats': args.repeats,
+        'warmup': args.warmup,
+        'workers': args.workers,
+        'decoder': args.decoder,
+        'seed': args.seed,
+        'mock': args.mock,
+        'timer': 'time.perf_counter',
+    }
+
+
+def save_results(filename, metadata, results):
+    with open(filename, 'w') as f:
+        json.dump({'meta': metadata, 'results': results}, f, indent=2)
+
+
+def print_summary(results):
+    print(f"\n{'mode':<10}{'assets':>7}{'median':>10}{'p90':>10}{'p99':>10}{'stddev':>10}{'assets/s':>10}"
+          f"   95% CI (median)")
+    for result in results:
+        s = result['summary']
+        throughput = result['num_assets'] / s['median'] if s['median'] else 0.0
+        print(f"{result['mode']:<10}{result['num_assets']:>7}{s['median']:>10.4f}{s['p90']:>10.4f}"
+              f"{s['p99']:>10.4f}{s['stddev']:>10.4f}{throughput:>10.1f}"
+              f"   [{s['median_ci_low']:.4f}, {s['median_ci_high']:.4f}]")
+
+
+def print_decode_stats(stats):
+    print(f"\n{'client':<10}{'responses':>10}{'mean bytes':>12}{'network s':>11}{'decode s':>10}{'decode %':>10}")
+    for name, s in stats.items():
+        if not s['responses']:
+            continue
+        busy = s['network_seconds'] + s['decode_seconds']
+        share = s['decode_seconds'] / busy * 100 if busy else 0.0
+        print(f"{name:<10}{s['responses']:>10}{s['mean_bytes']:>12.0f}{s['network_seconds']:>11.3f}"
+              f"{s['decode_seconds']:>10.4f}{share:>9.1f}%")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Repeated, interleaved portfolio valuation benchmark.')
+    parser.add_argument('--portfolios', default='portfolios.txt')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='threads for the threaded mode')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--decoder', choices=DECODERS, default='auto',
+                        help='response decoder: json, orjson, lean (price/timestamp only) or auto')
+    parser.add_argument('--output', default=RESULTS_FILE)
+    parser.add_argument('--db', default=DEFAULT_DB, help='append the run to this results database')
+    parser.add_argument('--no-db', dest='db', action='store_const', const=None, help='do not store the run')
+    parser.add_argument('--check', nargs='?', const='previous', default=None, metavar='BASELINE',
+                        help="after storing, exit 1 on a significant slowdown vs BASELINE (run id; default: previous)")
+    parser.add_argument('--trace', nargs='?', const=TRACE_FILE, default=None, metavar='PREFIX',
+                        help=f'record per-request phase timings to PREFIX.csv/.json (default {TRACE_FILE})')
+    parser.add_argument('--mock', action='store_true', help='run against a local mock server')
+    parser.add_argument('--mock-latency', type=float, default=0.05, help='median mock latency (seconds)')
+    parser.add_argument('--mock-jitter', type=float, default=0.3, help='lognormal sigma of mock latency')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    load_dotenv()
+    args = parse_args(argv)
+    portfolios = sized_portfolios(args.portfolios)
+    modes = tuple(args.modes)
+
+    tracer = PhaseTracer() if args.trace else None
+    server = None
+    base_url = resolve_base_url()
+    if args.mock:
+        from mock_cmc_server import MockConfig, MockServerThread
+        config = MockConfig(latency_dist='lognormal', latency_mean=args.mock_latency,
+                            latency_jitter=args.mock_jitter, seed=args.seed)
+        server = MockServerThread(config).start()
+        base_url = server.base_url
+
+    try:
+        print(f"Benchmarking {', '.join(modes)} against {base_url} "
+              f"({args.warmup} warmup + {args.repeats} timed runs per configuration)...")
+        results = run_benchmark(portfolios, modes, args.repeats, args.warmup, args.workers, base_url, args.seed,
+                                args.decoder, tracer)
+    finally:
+        if server is not None:
+            server.stop()
+
+    print_summary(results)
+    metadata = run_metadata(args, base_url)
+    save_results(args.output, metadata, results)
+    print(f"\nResults saved to '{args.output}'.")
+    if args.db:
+        with ResultsStore(args.db) as store:
+            run_id = store.record_run(metadata, results)
+        print(f"Stored as run {run_id} in '{args.db}'.")
+    if tracer is not None:
+        print_phase_summary(tracer.summary())
+        csv_file, json_file = tracer.save(args.trace, metadata)
+        print(f"Request phase traces saved to '{csv_file}' and '{json_file}'.")
+    if args.db and args.check:
+        import results_db
+        status = results_db.main(['--db', args.db, 'check', '--baseline', args.check, '--candidate', str(run_id)])
+        if status:
+            sys.exit(status)
+
+if __name__ == '__main__':
+    main()
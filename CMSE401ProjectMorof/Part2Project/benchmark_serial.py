@@ -1,94 +1,74 @@
-import requests
-import os
+import argparse
 import time
-import matplotlib.pyplot as plt
 from dotenv import load_dotenv
-
-# Load API key
-load_dotenv()
-API_KEY = os.getenv('CMC_API_KEY')
-
-# API URL and headers
-url = 'https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest'
-headers = {
-    'X-CMC_PRO_API_KEY': API_KEY
-}
-
-def load_portfolios_from_txt(filename):
-    portfolios = {}
-    current_portfolio = {}
-    current_size = None
-
-    with open(filename, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith('#'):
-                if current_portfolio and current_size:
-                    portfolios[current_size] = current_portfolio
-                    current_portfolio = {}
-                current_size = int(line.split()[3])
-            else:
-                symbol, amount = line.split()
-                current_portfolio[symbol.upper()] = float(amount)
-
-        if current_portfolio and current_size:
-            portfolios[current_size] = current_portfolio
-
-    return portfolios
-
-def fetch_price_serial(symbol):
-    params = {'symbol': symbol, 'convert': 'USD'}
-    response = requests.get(url, headers=headers, params=params)
-    data = response.json()
-
-    if 'data' in data and symbol in data['data']:
-        return data['data'][symbol]['quote']['USD']['price']
-    else:
-        print(f"Price for {symbol} not found. Skipping.")
-        return 0.0
-
-def value_portfolio_serial(portfolio):
+from plotting import pyplot, save_figure
+from portfolio_store import sized_portfolios
+from price_client import SerialPriceClient
+from quote_cache import QuoteCache
+from resilience import Resilience
+from results_db import ResultsStore
+from threaded_client import ThreadedPriceClient
+
+def fetch_price_serial(client, symbol):
+    return client.fetch_price(symbol)
+
+def value_portfolio_serial(portfolio, client=None):
+    if client is None:
+        with SerialPriceClient() as client:
+            return value_portfolio_serial(portfolio, client)
+
+    # A ThreadedPriceClient fetches the whole portfolio at once on its pool;
+    # the serial client goes one symbol at a time
+    prices = client.fetch_prices(portfolio) if isinstance(client, ThreadedPriceClient) else None
     total_value = 0.0
     print("\nHoldings breakdown:")
     for symbol, amount in portfolio.items():
-        price = fetch_price_serial(symbol)
+        price = prices[symbol] if prices is not None else fetch_price_serial(client, symbol)
         holding_value = price * amount
         print(f"{amount:.4f} {symbol} @ ${price:.2f} each = ${holding_value:.2f}")
         total_value += holding_value
     return total_value
 
-def benchmark_serial(portfolios):
+def mode_label(client):
+    if isinstance(client, ThreadedPriceClient):
+        return f"Threaded, {client.workers} workers"
+    return 'Serial'
+
+def benchmark_serial(portfolios, client=None):
+    if client is None:
+        # One pooled Session for every portfolio in the run
+        with SerialPriceClient() as client:
+            return benchmark_serial(portfolios, client)
+
     serial_times = []
 
-    for num_assets, portfolio in portfolios.items():
+    for num_assets, portfolio in portfolios:
         print(f"\nPortfolio with {num_assets} assets: {portfolio}")
 
-        start_time = time.time()
-        total_value = value_portfolio_serial(portfolio)
-        end_time = time.time()
+        start_time = time.perf_counter()
+        total_value = value_portfolio_serial(portfolio, client)
+        end_time = time.perf_counter()
 
         elapsed_time = end_time - start_time
         serial_times.append(elapsed_time)
 
         print(f"\nTotal Portfolio Value: ${total_value:.2f}")
-        print(f"Time Taken (Serial): {elapsed_time:.2f} seconds")
+        print(f"Time Taken ({mode_label(client)}): {elapsed_time:.2f} seconds")
         print("-" * 50)
 
     return serial_times
 
-def plot_results(num_assets_list, serial_times):
+def plot_results(num_assets_list, serial_times, label='Serial', filename='benchmark_serial_results.png'):
+    plt = pyplot()
     plt.figure(figsize=(10, 6))
-    plt.plot(num_assets_list, serial_times, label='Serial', marker='o')
-    plt.title('Serial Portfolio Valuation Timing')
+    plt.plot(num_assets_list, serial_times, label=label, marker='o')
+    plt.title(f"Portfolio Valuation Timing ({label})")
     plt.xlabel('Number of Assets in Portfolio')
     plt.ylabel('Time Taken (seconds)')
     plt.legend()
     plt.grid(True)
     plt.tight_layout()
-    plt.savefig('benchmark_serial_results.png')
-    plt.show()
+    save_figure(plt, filename)
 
 def save_results_csv(filename, num_assets_list, times):
     with open(filename, 'w') as f:
@@ -97,14 +77,39 @@ def save_results_csv(filename, num_assets_list, times):
             f.write(f"{num_assets},{time_taken:.4f}\n")
 
 def main():
-    portfolios = load_portfolios_from_txt('portfolios.txt')
-
-    print("Starting serial benchmarking...")
-    serial_times = benchmark_serial(portfolios)
-    plot_results(list(portfolios.keys()), serial_times)
-    save_results_csv('serial_benchmark_results.csv', list(portfolios.keys()), serial_times)
-    print("Serial benchmarking completed. Graph saved as 'benchmark_serial_results.png'.")
-    print("Serial benchmark timing saved to 'serial_benchmark_results.csv'.")
+    parser = argparse.ArgumentParser(description='Serial portfolio valuation benchmark over portfolios.txt.')
+    parser.add_argument('--threads', type=int, default=0, metavar='N',
+                        help='fetch each portfolio on N threads (ThreadedPriceClient) instead of one at a time')
+    args = parser.parse_args()
+
+    load_dotenv()
+    portfolios = sized_portfolios('portfolios.txt')
+    num_assets_list = [num_assets for num_assets, _ in portfolios]
+    # Threaded runs keep their own output files so both modes can be compared
+    mode = 'threaded' if args.threads else 'serial'
+    graph_file = f'benchmark_{mode}_results.png'
+    csv_file = f'{mode}_benchmark_results.csv'
+
+    cache = QuoteCache()
+    resilience = Resilience()
+    if args.threads:
+        client = ThreadedPriceClient(workers=args.threads, cache=cache, resilience=resilience)
+    else:
+        client = SerialPriceClient(cache=cache, resilience=resilience)
+    label = mode_label(client)
+    print(f"Starting {label.lower()} benchmarking...")
+    with client:
+        serial_times = benchmark_serial(portfolios, client)
+    print(f"Quote cache: {cache.stats()}")
+    print(f"Retries: {resilience.stats()}")
+    plot_results(num_assets_list, serial_times, label, graph_file)
+    save_results_csv(csv_file, num_assets_list, serial_times)
+    with ResultsStore() as store:
+        run_id = store.record_timings(mode, num_assets_list, serial_times, 'benchmark_serial.py',
+                                      metadata={'workers': args.threads} if args.threads else None)
+    print(f"{mode.title()} benchmarking completed. Graph saved as '{graph_file}'.")
+    print(f"{mode.title()} benchmark timing saved to '{csv_file}'.")
+    print(f"Stored as run {run_id} in the results database.")
 
 if __name__ == '__main__':
     main()
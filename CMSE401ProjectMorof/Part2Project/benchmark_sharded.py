@@ -0,0 +1,76 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from benchmark_incremental import make_book
+from portfolio_store import save_book
+from sharded_valuation import ShardedValuator
+from workload import load_workload
+
+DEFAULT_PORTFOLIOS = 2000000
+DEFAULT_UNIVERSE = 10000
+DEFAULT_MEAN_ASSETS = 10
+DEFAULT_REPEATS = 5
+
+
+def worker_counts(max_workers):
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sharded multi-process valuation scaling benchmark.')
+    parser.add_argument('--portfolios', type=int, default=DEFAULT_PORTFOLIOS)
+    parser.add_argument('--universe', type=int, default=DEFAULT_UNIVERSE)
+    parser.add_argument('--mean-assets', type=int, default=DEFAULT_MEAN_ASSETS)
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--analytics', action='store_true', help='also compute weights, HHI and max weight')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workload', help="'10x', '100x', '1000x' or a .pfbook/text file (see workload.py) "
+                                           "instead of --portfolios/--universe/--mean-assets")
+    args = parser.parse_args()
+
+    if args.workload:
+        book, prices = load_workload(args.workload, args.seed)
+    else:
+        book, prices = make_book(args.portfolios, args.universe, args.mean_assets, args.seed)
+    print(f"{len(book)} portfolios, {book.num_holdings} holdings, {len(book.symbols)} symbols")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        book_path = os.path.join(tmp, 'bench.pfbook')
+        save_book(book, book_path)
+
+        start = time.perf_counter()
+        reference = book.totals(prices)
+        print(f"In-process vectorized totals: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        print(f"\n{'workers':>8}{'median ms':>12}{'speedup':>10}{'efficiency':>12}{'slowest shard ms':>18}")
+        baseline = None
+        for workers in worker_counts(args.max_workers):
+            with ShardedValuator(book_path, workers) as valuator:
+                valuator.update_prices(prices)
+                valuator.warm_up()
+                times = []
+                result = None
+                for _ in range(args.repeats):
+                    result = valuator.value(args.analytics)
+                    times.append(result.elapsed)
+                assert np.allclose(result.totals, reference)
+
+            median = statistics.median(times)
+            baseline = baseline or median
+            speedup = baseline / median
+            slowest = max(t['seconds'] for t in result.shard_timings)
+            print(f"{workers:>8}{median * 1000:>12.1f}{speedup:>10.2f}{speedup / workers:>12.2f}{slowest * 1000:>18.1f}")
+
+if __name__ == '__main__':
+    main()
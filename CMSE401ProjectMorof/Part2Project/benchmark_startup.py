@@ -0,0 +1,72 @@
+import argparse
+import importlib.util
+import statistics
+import subprocess
+import sys
+import time
+
+from portfolio_cli import COMMAND_MODULES
+
+DEFAULT_REPEATS = 5
+RESULTS_FILE = 'startup_benchmark_results.csv'
+
+
+def startup_cases():
+    # (name, code run in a fresh interpreter); the bare interpreter is the floor
+    cases = [('python', 'pass'), ('cli', 'import portfolio_cli')]
+    for command in COMMAND_MODULES:
+        cases.append((command, f'import portfolio_cli; portfolio_cli.import_command({command!r})'))
+    # What compare_serial_parallel.py used to import before doing anything
+    if importlib.util.find_spec('pandas') is not None:
+        cases.append(('eager plot', 'import pandas, matplotlib.pyplot'))
+    return cases
+
+
+def heaviest_imports(importtime_output, count=3):
+    # Top-level entries of `python -X importtime`: "import time: self | cumulative | name"
+    modules = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            modules.append((int(cumulative) / 1e3, name.strip()))
+    return sorted(modules, reverse=True)[:count]
+
+
+def time_startup(code, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True)
+        times.append(time.perf_counter() - start)
+    profile = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], check=True,
+                             capture_output=True, text=True)
+    return statistics.median(times), heaviest_imports(profile.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fresh-interpreter startup cost of each portfolio_cli subcommand.')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--output', default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    rows = []
+    baseline = None
+    print(f"{'case':<12}{'startup ms':>11}{'imports ms':>12}   heaviest imports (cumulative ms)")
+    for name, code in startup_cases():
+        median, heaviest = time_startup(code, args.repeats)
+        baseline = median if baseline is None else baseline
+        overhead = median - baseline
+        rows.append((name, median, overhead))
+        print(f"{name:<12}{median * 1e3:>11.0f}{overhead * 1e3:>12.0f}   "
+              + ', '.join(f"{module} {ms:.0f}" for ms, module in heaviest))
+
+    with open(args.output, 'w') as f:
+        f.write('case,startup_seconds,import_seconds\n')
+        for name, median, overhead in rows:
+            f.write(f"{name},{median:.4f},{overhead:.4f}\n")
+    print(f"\nStartup timings saved to '{args.output}'.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import os
+
+import numpy as np
+from backtest import holdings_matrix
+from benchmark_incremental import make_book
+from benchmark_sharded import worker_counts
+from monte_carlo_var import MonteCarloVaR, estimate_risk_model
+from price_history import synthetic_history
+
+DEFAULT_PORTFOLIOS = 1000
+DEFAULT_UNIVERSE = 200
+DEFAULT_MEAN_ASSETS = 10
+DEFAULT_SCENARIOS = 1000000
+HISTORY_BARS = 30 * 24 * 60
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Monte Carlo VaR throughput and worker scaling.')
+    parser.add_argument('--portfolios', type=int, default=DEFAULT_PORTFOLIOS)
+    parser.add_argument('--universe', type=int, default=DEFAULT_UNIVERSE)
+    parser.add_argument('--mean-assets', type=int, default=DEFAULT_MEAN_ASSETS)
+    parser.add_argument('--scenarios', type=int, default=DEFAULT_SCENARIOS)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    book, prices = make_book(args.portfolios, args.universe, args.mean_assets, args.seed)
+    timestamps, history = synthetic_history(book.symbols.symbols, 0.0, 60.0, HISTORY_BARS, args.seed,
+                                            volatility=0.001, start_prices=prices)
+    mean, covariance, current = estimate_risk_model(history, timestamps)
+    holdings, _ = holdings_matrix(book, book.symbols.index)
+    print(f"{len(book)} portfolios, {args.universe} symbols, {args.scenarios} one-day scenarios")
+
+    print(f"{'workers':>8}{'seconds':>10}{'scenarios/s':>14}{'speedup':>10}")
+    baseline = None
+    reference = None
+    for workers in worker_counts(args.max_workers):
+        engine = MonteCarloVaR(mean, covariance, current, holdings, workers=workers)
+        result = engine.run(args.scenarios, seed=args.seed)
+        # Seeds belong to scenario blocks, so every worker count must agree exactly
+        if reference is None:
+            reference = result
+        assert all(np.array_equal(result.var[level], reference.var[level]) for level in result.confidence)
+
+        baseline = baseline or result.elapsed
+        print(f"{workers:>8}{result.elapsed:>10.2f}{result.scenarios_per_second:>14,.0f}"
+              f"{baseline / result.elapsed:>10.2f}")
+
+if __name__ == '__main__':
+    main()
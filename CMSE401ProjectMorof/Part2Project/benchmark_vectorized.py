@@ -0,0 +1,104 @@
+import argparse
+import statistics
+import time
+
+import numpy as np
+from valuation_engine import PortfolioBook, SymbolTable
+from workload import load_workload
+
+DEFAULT_PORTFOLIOS = 50000
+DEFAULT_UNIVERSE = 500
+DEFAULT_MAX_ASSETS = 20
+DEFAULT_REPEATS = 5
+DENSE_CELL_LIMIT = 50_000_000
+
+
+def make_portfolios(num_portfolios, universe_size, max_assets, seed=0):
+    rng = np.random.default_rng(seed)
+    symbols = [f"SYM{i}" for i in range(universe_size)]
+    sizes = rng.integers(1, max_assets + 1, size=num_portfolios)
+    portfolios = []
+    for size in sizes:
+        picks = rng.choice(universe_size, size=size, replace=False)
+        amounts = rng.uniform(0.1, 1000.0, size=size)
+        portfolios.append({symbols[p]: float(a) for p, a in zip(picks, amounts)})
+    prices = {symbol: float(p) for symbol, p in zip(symbols, 10 ** rng.uniform(-4, 4, size=universe_size))}
+    return portfolios, prices
+
+
+def book_to_dicts(book):
+    # {symbol: amount} per portfolio for the dict loop, in one pass over the columns
+    portfolios = [{} for _ in range(len(book))]
+    symbols = book.symbols.symbols
+    for portfolio_id, symbol_id, amount in zip(book.portfolio_ids.tolist(), book.symbol_ids.tolist(),
+                                               book.amounts.tolist()):
+        portfolios[portfolio_id][symbols[symbol_id]] = amount
+    return portfolios
+
+
+# The current per-portfolio dict loop, as in value_portfolio / value_portfolio_serial
+def value_with_dict_loop(portfolios, prices):
+    totals = []
+    for portfolio in portfolios:
+        total_value = 0.0
+        for symbol, amount in portfolio.items():
+            total_value += prices.get(symbol, 0.0) * amount
+        totals.append(total_value)
+    return totals
+
+
+def time_it(func, repeats):
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dict-loop vs vectorized portfolio valuation.')
+    parser.add_argument('--portfolios', type=int, default=DEFAULT_PORTFOLIOS)
+    parser.add_argument('--universe', type=int, default=DEFAULT_UNIVERSE)
+    parser.add_argument('--max-assets', type=int, default=DEFAULT_MAX_ASSETS)
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workload', help="'10x', '100x', '1000x' or a .pfbook/text file (see workload.py) "
+                                           "instead of --portfolios/--universe/--max-assets")
+    args = parser.parse_args()
+
+    if args.workload:
+        book, price_vector = load_workload(args.workload, args.seed)
+        portfolios = book_to_dicts(book)
+        prices = dict(zip(book.symbols.symbols, price_vector.tolist()))
+    else:
+        portfolios, prices = make_portfolios(args.portfolios, args.universe, args.max_assets, args.seed)
+        book = PortfolioBook.from_dicts(portfolios, symbols=SymbolTable(prices))
+    price_vector, _ = book.symbols.price_vector(prices)
+    print(f"{len(book)} portfolios, {book.num_holdings} holdings, {len(book.symbols)} symbols")
+
+    loop_time, loop_totals = time_it(lambda: value_with_dict_loop(portfolios, prices), args.repeats)
+    print(f"Dict loop:              {loop_time * 1000:9.2f} ms")
+
+    totals_time, totals = time_it(lambda: book.totals(price_vector), args.repeats)
+    assert np.allclose(totals, loop_totals)
+    print(f"Vectorized totals:      {totals_time * 1000:9.2f} ms   speedup {loop_time / totals_time:6.1f}x")
+
+    sparse_time, valuation = time_it(lambda: book.value(price_vector), args.repeats)
+    assert np.allclose(valuation.totals, loop_totals)
+    print(f"Vectorized (+weights):  {sparse_time * 1000:9.2f} ms   speedup {loop_time / sparse_time:6.1f}x")
+
+    dict_time, _ = time_it(lambda: book.value(prices), args.repeats)
+    print(f"Vectorized (dict in):   {dict_time * 1000:9.2f} ms   speedup {loop_time / dict_time:6.1f}x")
+
+    if len(book) * len(book.symbols) <= DENSE_CELL_LIMIT:
+        matrix = book.dense()
+        dense_time, dense_totals = time_it(lambda: matrix @ price_vector, args.repeats)
+        assert np.allclose(dense_totals, loop_totals)
+        print(f"Dense matvec:           {dense_time * 1000:9.2f} ms   speedup {loop_time / dense_time:6.1f}x")
+    else:
+        print("Dense matvec:           skipped (matrix too large)")
+
+if __name__ == '__main__':
+    main()
@@ -1,41 +1,141 @@
-import matplotlib.pyplot as plt
-import pandas as pd
-
-# Load the benchmark data
-serial_df = pd.read_csv('serial_benchmark_results.csv')
-parallel_df = pd.read_csv('parallel_benchmark_results.csv')
-
-# Extract data
-num_assets_serial = serial_df['num_assets']
-times_serial = serial_df['time_seconds']
-
-num_assets_parallel = parallel_df['num_assets']
-times_parallel = parallel_df['time_seconds']
-
-# --- Plot 1: Serial vs Parallel Timing ---
-plt.figure(figsize=(10, 6))
-plt.plot(num_assets_serial, times_serial, label='Serial', marker='o')
-plt.plot(num_assets_parallel, times_parallel, label='Parallel', marker='o')
-plt.title('Serial vs Parallel Portfolio Valuation Timing')
-plt.xlabel('Number of Assets in Portfolio')
-plt.ylabel('Time Taken (seconds)')
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('serial_vs_parallel_timing.png')
-plt.show()
-
-# --- Plot 2: Speedup Factor (Serial Time / Parallel Time) ---
-speedup = times_serial / times_parallel
-
-plt.figure(figsize=(10, 6))
-plt.plot(num_assets_serial, speedup, label='Speedup (Serial / Parallel)', marker='o', color='green')
-plt.title('Speedup Achieved by Parallelization')
-plt.xlabel('Number of Assets in Portfolio')
-plt.ylabel('Speedup Factor')
-plt.axhline(y=1, color='red', linestyle='--', label='No Speedup')
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('speedup_factor.png')
-plt.show()
+import csv
+import json
+import os
+import sys
+from plotting import pyplot, save_figure
+
+RESULTS_FILE = 'benchmark_results.json'
+
+
+def load_results(filename=RESULTS_FILE):
+    # {mode: (num_assets, medians, ci_low, ci_high)} from benchmark_runner.py output
+    with open(filename, 'r') as f:
+        results = json.load(f)['results']
+
+    by_mode = {}
+    for result in results:
+        summary = result['summary']
+        row = by_mode.setdefault(result['mode'], ([], [], [], []))
+        row[0].append(result['num_assets'])
+        row[1].append(summary['median'])
+        row[2].append(summary['median_ci_low'])
+        row[3].append(summary['median_ci_high'])
+    return by_mode
+
+
+def load_legacy_csv():
+    # Single-sample CSVs written by benchmark_serial.py (with and without
+    # --threads) and benchmark_parallel.py; the threaded one is optional
+    by_mode = {}
+    for mode, filename in (('serial', 'serial_benchmark_results.csv'), ('parallel', 'parallel_benchmark_results.csv'),
+                           ('threaded', 'threaded_benchmark_results.csv')):
+        if mode == 'threaded' and not os.path.exists(filename):
+            continue
+        with open(filename, newline='') as f:
+            rows = list(csv.DictReader(f))
+        times = [float(row['time_seconds']) for row in rows]
+        by_mode[mode] = ([int(row['num_assets']) for row in rows], times, times, times)
+    return by_mode
+
+
+def load_any(filename=RESULTS_FILE):
+    return load_results(filename) if os.path.exists(filename) else load_legacy_csv()
+
+
+def speedups(by_mode):
+    # {mode: [(num_assets, serial median / mode median)]} for every mode but
+    # serial, at the sizes serial was also run at (none without a serial mode)
+    if 'serial' not in by_mode:
+        return {}
+    num_assets, serial_medians, _, _ = by_mode['serial']
+    serial_by_size = dict(zip(num_assets, serial_medians))
+    return {mode: [(size, serial_by_size.get(size) / median) for size, median in zip(sizes, medians)
+                   if serial_by_size.get(size) is not None and median]
+            for mode, (sizes, medians, _, _) in by_mode.items() if mode != 'serial'}
+
+
+def print_comparison(by_mode):
+    print(f"{'mode':<10}{'assets':>7}{'median s':>10}{'vs serial':>11}")
+    ratios = speedups(by_mode)
+    for mode, (sizes, medians, _, _) in by_mode.items():
+        speedup = dict(ratios.get(mode, []))
+        for size, median in zip(sizes, medians):
+            ratio = f"{speedup[size]:.2f}x" if size in speedup else '-'
+            print(f"{mode:<10}{size:>7}{median:>10.4f}{ratio:>11}")
+
+
+def plot_timing(by_mode, filename='serial_vs_parallel_timing.png'):
+    plt = pyplot()
+    plt.figure(figsize=(10, 6))
+    for mode, (num_assets, medians, ci_low, ci_high) in by_mode.items():
+        errors = [[m - lo for m, lo in zip(medians, ci_low)], [hi - m for m, hi in zip(medians, ci_high)]]
+        plt.errorbar(num_assets, medians, yerr=errors, label=mode.title(), marker='o', capsize=4)
+    plt.title('Portfolio Valuation Timing (median, 95% CI)')
+    plt.xlabel('Number of Assets in Portfolio')
+    plt.ylabel('Time Taken (seconds)')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    return save_figure(plt, filename)
+
+
+def plot_speedup(by_mode, filename='speedup_factor.png'):
+    plt = pyplot()
+    plt.figure(figsize=(10, 6))
+    for mode, points in speedups(by_mode).items():
+        sizes = [size for size, _ in points]
+        speedup = [ratio for _, ratio in points]
+        plt.plot(sizes, speedup, label=f'Speedup (Serial / {mode.title()})', marker='o')
+    plt.title('Speedup Achieved by Parallelization')
+    plt.xlabel('Number of Assets in Portfolio')
+    plt.ylabel('Speedup Factor')
+    plt.axhline(y=1, color='red', linestyle='--', label='No Speedup')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    return save_figure(plt, filename)
+
+
+def plot_run_comparison(baseline, candidate, baseline_label, candidate_label, filename='run_comparison.png'):
+    # Two stored runs (results_db.py): timing per mode side by side, then the
+    # candidate/baseline median ratio (above 1 = slower)
+    plt = pyplot()
+    fig, (timing, ratio) = plt.subplots(1, 2, figsize=(14, 6))
+    for index, mode in enumerate(sorted(set(baseline) | set(candidate))):
+        color = f'C{index}'
+        for by_mode, label, style in ((baseline, baseline_label, '--'), (candidate, candidate_label, '-')):
+            if mode in by_mode:
+                sizes, medians, _, _ = by_mode[mode]
+                timing.plot(sizes, medians, style, color=color, marker='o', label=f'{mode.title()} ({label})')
+        if mode in baseline and mode in candidate:
+            base_by_size = dict(zip(baseline[mode][0], baseline[mode][1]))
+            points = [(size, median / base_by_size[size]) for size, median in zip(*candidate[mode][:2])
+                      if base_by_size.get(size)]
+            ratio.plot([size for size, _ in points], [value for _, value in points], color=color, marker='o',
+                       label=mode.title())
+    timing.set_title('Median Valuation Time')
+    timing.set_xlabel('Number of Assets in Portfolio')
+    timing.set_ylabel('Time Taken (seconds)')
+    ratio.set_title(f'{candidate_label} / {baseline_label}')
+    ratio.set_xlabel('Number of Assets in Portfolio')
+    ratio.set_ylabel('Median Time Ratio')
+    ratio.axhline(y=1, color='red', linestyle='--', label='No Change')
+    for axis in (timing, ratio):
+        axis.legend()
+        axis.grid(True)
+    fig.tight_layout()
+    return save_figure(plt, filename)
+
+
+def main():
+    filename = sys.argv[1] if len(sys.argv) > 1 else RESULTS_FILE
+    by_mode = load_any(filename)
+    print_comparison(by_mode)
+    print(f"Saved {plot_timing(by_mode)}.")
+    if 'serial' in by_mode:
+        print(f"Saved {plot_speedup(by_mode)}.")
+    else:
+        print("No serial mode in these results, so there is no speedup plot.")
+
+if __name__ == '__main__':
+    main()
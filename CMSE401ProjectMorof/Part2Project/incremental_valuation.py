@@ -0,0 +1,107 @@
+import numpy as np
+
+# Full recompute after this many applied price changes to shed float drift
+DEFAULT_RESYNC_EVERY = 100000
+
+
+class IncrementalValuationStore:
+    # Keeps every portfolio's current total plus an inverted index from symbol
+    # to its holders, so a price change touches only the portfolios that hold
+    # that symbol: O(holders) instead of O(all holdings).
+
+    def __init__(self, book, prices=None, resync_every=DEFAULT_RESYNC_EVERY):
+        self.book = book
+        self.symbols = book.symbols
+        self.resync_every = resync_every
+
+        # Inverted index in CSR form: holders of symbol s are
+        # holder_portfolios[offsets[s]:offsets[s + 1]] with matching holder_amounts
+        order = np.lexsort((book.portfolio_ids, book.symbol_ids))
+        sorted_portfolios = np.asarray(book.portfolio_ids)[order]
+        sorted_symbols = np.asarray(book.symbol_ids)[order]
+        sorted_amounts = np.asarray(book.amounts)[order]
+
+        # A portfolio listed twice for one symbol is merged into one entry, so
+        # each holder appears once and updates can use plain fancy indexing
+        if len(order):
+            first = np.flatnonzero(np.concatenate(([True], (sorted_symbols[1:] != sorted_symbols[:-1])
+                                                   | (sorted_portfolios[1:] != sorted_portfolios[:-1]))))
+            self.holder_portfolios = sorted_portfolios[first]
+            self.holder_amounts = np.add.reduceat(sorted_amounts, first)
+            holder_symbols = sorted_symbols[first]
+        else:
+            self.holder_portfolios = sorted_portfolios
+            self.holder_amounts = sorted_amounts
+            holder_symbols = sorted_symbols
+        counts = np.bincount(holder_symbols, minlength=len(self.symbols))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+        if prices is None:
+            self.prices = np.zeros(len(self.symbols), dtype=np.float64)
+        elif isinstance(prices, dict):
+            self.prices, _ = self.symbols.price_vector(prices)
+        else:
+            self.prices = np.array(prices, dtype=np.float64)
+        self.totals = book.totals(self.prices)
+        self.updates_since_resync = 0
+        self.updates_applied = 0
+
+    def holders(self, symbol):
+        column = self.symbols.column(symbol)
+        if column is None:
+            return np.zeros(0, dtype=self.holder_portfolios.dtype), np.zeros(0)
+        start, end = self.offsets[column], self.offsets[column + 1]
+        return self.holder_portfolios[start:end], self.holder_amounts[start:end]
+
+    def _apply_column(self, column, price):
+        delta = price - self.prices[column]
+        self.prices[column] = price
+        start, end = self.offsets[column], self.offsets[column + 1]
+        affected = self.holder_portfolios[start:end]
+        if delta:
+            self.totals[affected] += delta * self.holder_amounts[start:end]
+        return affected
+
+    def apply(self, symbol, price):
+        # One price change; returns the ids of the portfolios whose total moved
+        column = self.symbols.column(symbol)
+        # An unknown symbol or an unchanged price moves nothing, as in apply_events
+        if column is None or price == self.prices[column]:
+            return np.zeros(0, dtype=self.holder_portfolios.dtype)
+        affected = self._apply_column(column, price)
+        self._count_updates(1)
+        return affected
+
+    def apply_events(self, events):
+        # events: iterable of (symbol, price) or a {symbol: price} dict. Only the
+        # last price per symbol matters, so repeated ticks are coalesced first.
+        if isinstance(events, dict):
+            latest = events
+        else:
+            latest = {}
+            for symbol, price in events:
+                latest[symbol] = price
+
+        touched = []
+        for symbol, price in latest.items():
+            column = self.symbols.column(symbol)
+            if column is not None and price != self.prices[column]:
+                touched.append(self._apply_column(column, price))
+        self._count_updates(len(touched))
+
+        if not touched:
+            return np.zeros(0, dtype=self.holder_portfolios.dtype)
+        return np.unique(np.concatenate(touched))
+
+    def _count_updates(self, count):
+        self.updates_applied += count
+        self.updates_since_resync += count
+        if self.resync_every and self.updates_since_resync >= self.resync_every:
+            self.resync()
+
+    def resync(self):
+        self.totals = self.book.totals(self.prices)
+        self.updates_since_resync = 0
+
+    def total(self, portfolio_id):
+        return float(self.totals[portfolio_id])
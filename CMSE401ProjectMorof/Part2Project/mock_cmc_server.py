@@ -0,0 +1,434 @@
+import argparse
+import asyncio
+import json
+import random
+import string
+import threading
+import time
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+from price_client import QUOTES_PATH
+from symbol_registry import MAP_PATH
+
+# Real symbols first so existing portfolio files resolve, synthetic ones after
+KNOWN_SYMBOLS = [
+    'BTC', 'ETH', 'XRP', 'BNB', 'SOL', 'DOGE', 'ADA', 'TRX', 'SUI', 'LINK',
+    'AVAX', 'XLM', 'HBAR', 'SHIB', 'LEO', 'TON', 'BCH', 'DOT', 'LTC', 'HYPE'
+]
+
+DEFAULT_PORT = 8080
+DEFAULT_UNIVERSE = 5000
+# Top tickers that a second, obscure token also uses (as on the real listing)
+DEFAULT_DUPLICATE_SYMBOLS = 10
+# Most symbols or ids one quotes/latest call may name (batch_planner's cap)
+DEFAULT_MAX_KEYS = 100
+LATENCY_DISTRIBUTIONS = ('constant', 'uniform', 'normal', 'lognormal', 'exponential')
+
+
+def synthetic_symbol(index):
+    # 0 -> 'AAAA', 1 -> 'AAAB', ... 'ZZZZ', then five letters ('AAAAA', ...),
+    # then six, so any universe size gets distinct tickers
+    length = 4
+    while index >= 26 ** length:
+        index -= 26 ** length
+        length += 1
+    letters = []
+    for _ in range(length):
+        index, remainder = divmod(index, 26)
+        letters.append(string.ascii_uppercase[remainder])
+    return ''.join(reversed(letters))
+
+
+def build_universe(size, seed=0):
+    rng = random.Random(seed)
+    symbols = KNOWN_SYMBOLS[:size]
+    index = 0
+    known = set(symbols)
+    while len(symbols) < size:
+        symbol = synthetic_symbol(index)
+        index += 1
+        if symbol not in known:
+            symbols.append(symbol)
+            known.add(symbol)
+
+    universe = {}
+    for rank, symbol in enumerate(symbols, start=1):
+        universe[symbol] = {
+            'id': rank,
+            'rank': rank,
+            'price': 10 ** rng.uniform(-6, 5),
+            'supply': 10 ** rng.uniform(6, 12),
+        }
+    return universe
+
+
+def build_duplicates(universe, count, seed=0):
+    # (symbol, coin) for low-ranked tokens reusing the top `count` tickers;
+    # only id lookups and the map reach them, symbol quotes get the original
+    rng = random.Random(seed + 1)
+    duplicates = []
+    for offset, symbol in enumerate(list(universe)[:count], start=1):
+        rank = len(universe) + offset
+        duplicates.append((symbol, {
+            'id': rank,
+            'rank': rank,
+            'name': f"{symbol.title()} Token",
+            'price': 10 ** rng.uniform(-8, -2),
+            'supply': 10 ** rng.uniform(9, 12),
+        }))
+    return duplicates
+
+
+class MockConfig:
+    # Everything the stand-in can be tuned with. Latencies are in seconds.
+
+    def __init__(self, universe_size=DEFAULT_UNIVERSE, latency_dist='constant', latency_mean=0.05,
+                 latency_jitter=0.0, bandwidth=None, error_rate=0.0, throttle_rate=0.0,
+                 rate_limit_per_minute=None, volatility=0.0, duplicate_symbols=DEFAULT_DUPLICATE_SYMBOLS,
+                 max_keys=DEFAULT_MAX_KEYS, seed=0):
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist must be one of {LATENCY_DISTRIBUTIONS}")
+        self.universe_size = universe_size
+        self.latency_dist = latency_dist
+        self.latency_mean = latency_mean
+        self.latency_jitter = latency_jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.volatility = volatility
+        self.duplicate_symbols = duplicate_symbols
+        self.max_keys = max_keys
+        self.seed = seed
+
+
+class MockCMC:
+    def __init__(self, config=None):
+        self.config = config or MockConfig()
+        self.universe = build_universe(self.config.universe_size, self.config.seed)
+        self.duplicates = build_duplicates(self.universe, self.config.duplicate_symbols, self.config.seed)
+        self.by_id = {coin['id']: (symbol, coin) for symbol, coin in self.universe.items()}
+        self.by_id.update((coin['id'], (symbol, coin)) for symbol, coin in self.duplicates)
+        self.rng = random.Random(self.config.seed)
+        self.requests = 0
+        self.symbols_served = 0
+        self.errors = 0
+        self.throttled = 0
+        self.window_start = time.monotonic()
+        self.window_count = 0
+
+    # --- Fault and latency injection ---
+    def sample_latency(self):
+        c = self.config
+        if c.latency_dist == 'constant':
+            latency = c.latency_mean
+        elif c.latency_dist == 'uniform':
+            latency = self.rng.uniform(c.latency_mean - c.latency_jitter, c.latency_mean + c.latency_jitter)
+        elif c.latency_dist == 'normal':
+            latency = self.rng.gauss(c.latency_mean, c.latency_jitter)
+        elif c.latency_dist == 'lognormal':
+            # latency_jitter is the sigma of the underlying normal; the median equals latency_mean
+            latency = c.latency_mean * self.rng.lognormvariate(0.0, c.latency_jitter)
+        else:
+            latency = self.rng.expovariate(1.0 / c.latency_mean) if c.latency_mean > 0 else 0.0
+        return max(0.0, latency)
+
+    def over_rate_limit(self):
+        limit = self.config.rate_limit_per_minute
+        if not limit:
+            return False
+        now = time.monotonic()
+        if now - self.window_start >= 60.0:
+            self.window_start = now
+            self.window_count = 0
+        self.window_count += 1
+        return self.window_count > limit
+
+    # --- Response building ---
+    def status_block(self, error_code=0, error_message=None, credit_count=1):
+        return {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+            'error_code': error_code,
+            'error_message': error_message,
+            'elapsed': 0,
+            'credit_count': credit_count,
+            'notice': None,
+        }
+
+    def quote_entry(self, symbol, now, coin=None):
+        coin = coin or self.universe[symbol]
+        price = coin['price']
+        if self.config.volatility:
+            price *= max(0.01, 1.0 + self.rng.gauss(0.0, self.config.volatility))
+            coin['price'] = price
+        return {
+            'id': coin['id'],
+            'name': coin.get('name', symbol.title()),
+            'symbol': symbol,
+            'slug': coin.get('name', symbol).lower().replace(' ', '-'),
+            'num_market_pairs': 100,
+            'date_added': '2020-01-01T00:00:00.000Z',
+            'tags': [],
+            'max_supply': None,
+            'circulating_supply': coin['supply'],
+            'total_supply': coin['supply'],
+            'platform': None,
+            'cmc_rank': coin['rank'],
+            'last_updated': now,
+            'quote': {
+                'USD': {
+                    'price': price,
+                    'volume_24h': price * coin['supply'] * 0.01,
+                    'volume_change_24h': 0.0,
+                    'percent_change_1h': 0.0,
+                    'percent_change_24h': 0.0,
+                    'percent_change_7d': 0.0,
+                    'market_cap': price * coin['supply'],
+                    'market_cap_dominance': 0.0,
+                    'fully_diluted_market_cap': price * coin['supply'],
+                    'last_updated': now,
+                }
+            },
+        }
+
+    def error_response(self, status, error_code, message, headers=None):
+        body = {'status': self.status_block(error_code, message, 0)}
+        return web.json_response(body, status=status, headers=headers)
+
+    async def send(self, request, body):
+        payload = json.dumps(body).encode()
+        bandwidth = self.config.bandwidth
+        if not bandwidth:
+            return web.Response(body=payload, content_type='application/json')
+
+        # Throttle the body to `bandwidth` bytes/second in 16 KiB chunks
+        response = web.StreamResponse(headers={'Content-Type': 'application/json'})
+        response.content_length = len(payload)
+        await response.prepare(request)
+        chunk_size = 16384
+        for offset in range(0, len(payload), chunk_size):
+            chunk = payload[offset:offset + chunk_size]
+            await response.write(chunk)
+            await asyncio.sleep(len(chunk) / bandwidth)
+        await response.write_eof()
+        return response
+
+    def map_entry(self, symbol, coin):
+        return {
+            'id': coin['id'],
+            'rank': coin['rank'],
+            'name': coin.get('name', symbol.title()),
+            'symbol': symbol,
+            'slug': coin.get('name', symbol).lower().replace(' ', '-'),
+            'is_active': 1,
+            'first_historical_data': '2020-01-01T00:00:00.000Z',
+            'last_historical_data': datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+            'platform': None,
+        }
+
+    def too_many_keys(self, keys):
+        return self.config.max_keys is not None and len(keys) > self.config.max_keys
+
+    async def injected_fault(self):
+        # Latency, then a 429 or 500 if the config calls for one
+        self.requests += 1
+        await asyncio.sleep(self.sample_latency())
+        if self.over_rate_limit() or self.rng.random() < self.config.throttle_rate:
+            self.throttled += 1
+            return self.error_response(429, 1008, "You've exceeded your API Key's HTTP request rate limit.",
+                                       headers={'Retry-After': '1'})
+        if self.rng.random() < self.config.error_rate:
+            self.errors += 1
+            return self.error_response(500, 500, 'An internal server error occurred.')
+        return None
+
+    async def quotes_latest(self, request):
+        fault = await self.injected_fault()
+        if fault is not None:
+            return fault
+
+        skip_invalid = request.query.get('skip_invalid', 'false').lower() == 'true'
+        now = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+        if 'id' in request.query:
+            # Keyed by id, as the real API does for id queries
+            raw = [value.strip() for value in request.query['id'].split(',') if value.strip()]
+            ids = [int(value) if value.isdigit() else value for value in raw]
+            if not ids:
+                return self.error_response(400, 400, '"id" is required')
+            if self.too_many_keys(ids):
+                return self.error_response(400, 400, f'"id" accepts at most {self.config.max_keys} values')
+            invalid = [str(coin_id) for coin_id in ids if coin_id not in self.by_id]
+            if invalid and not skip_invalid:
+                return self.error_response(400, 400, f'Invalid value for "id": "{",".join(invalid)}"')
+            data = {str(coin_id): self.quote_entry(self.by_id[coin_id][0], now, self.by_id[coin_id][1])
+                    for coin_id in ids if coin_id in self.by_id}
+        else:
+            raw = request.query.get('symbol', '')
+            symbols = [symbol.strip().upper() for symbol in raw.split(',') if symbol.strip()]
+            if not symbols:
+                return self.error_response(400, 400, '"symbol" is required')
+            if self.too_many_keys(symbols):
+                return self.error_response(400, 400, f'"symbol" accepts at most {self.config.max_keys} values')
+            invalid = [symbol for symbol in symbols if symbol not in self.universe]
+            if invalid and not skip_invalid:
+                return self.error_response(400, 400, f'Invalid value for "symbol": "{",".join(invalid)}"')
+            data = {symbol: self.quote_entry(symbol, now) for symbol in symbols if symbol in self.universe}
+
+        self.symbols_served += len(data)
+        credits = max(1, (len(data) + 99) // 100)
+        return await self.send(request, {'status': self.status_block(credit_count=credits), 'data': data})
+
+    async def cryptocurrency_map(self, request):
+        # Every coin sorted by id, paged with start (1-based) and limit;
+        # symbol= narrows it to those tickers (duplicates included)
+        fault = await self.injected_fault()
+        if fault is not None:
+            return fault
+
+        coins = sorted(list(self.universe.items()) + self.duplicates, key=lambda item: item[1]['id'])
+        if 'symbol' in request.query:
+            wanted = {symbol.strip().upper() for symbol in request.query['symbol'].split(',')}
+            coins = [(symbol, coin) for symbol, coin in coins if symbol in wanted]
+        try:
+            start = int(request.query.get('start', 1))
+            limit = int(request.query.get('limit', len(coins)))
+        except ValueError:
+            return self.error_response(400, 400, '"start" and "limit" must be integers')
+        if start < 1 or limit < 1:
+            return self.error_response(400, 400, '"start" and "limit" must be at least 1')
+
+        data = [self.map_entry(symbol, coin) for symbol, coin in coins[start - 1:start - 1 + limit]]
+        credits = max(1, (len(data) + 4999) // 5000)
+        return await self.send(request, {'status': self.status_block(credit_count=credits), 'data': data})
+
+    async def stats(self, request):
+        return web.json_response({
+            'requests': self.requests,
+            'symbols_served': self.symbols_served,
+            'errors': self.errors,
+            'throttled': self.throttled,
+            'universe_size': len(self.universe),
+        })
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get(QUOTES_PATH, self.quotes_latest)
+        app.router.add_get(MAP_PATH, self.cryptocurrency_map)
+        app.router.add_get('/mock/stats', self.stats)
+        return app
+
+
+async def start_mock_server(config=None, host='127.0.0.1', port=DEFAULT_PORT):
+    # Returns (runner, mock, base_url); call `await runner.cleanup()` to stop
+    mock = MockCMC(config)
+    runner = web.AppRunner(mock.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, mock, f"http://{host}:{bound_port}"
+
+
+class MockServerThread:
+    # Runs the stand-in on its own loop in a background thread so synchronous
+    # code (requests, benchmark scripts) can use it. port=0 picks a free port.
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.thread = None
+        self.runner = None
+        self.mock = None
+        self.base_url = None
+
+    def start(self):
+        ready = threading.Event()
+        errors = []
+        self.loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            try:
+                self.runner, self.mock, self.base_url = self.loop.run_until_complete(
+                    start_mock_server(self.config, self.host, self.port))
+            except Exception as error:
+                # e.g. the port is taken; start() re-raises it instead of waiting forever
+                errors.append(error)
+                return
+            finally:
+                ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        ready.wait()
+        if errors:
+            self.thread.join()
+            self.loop.close()
+            self.loop = None
+            raise errors[0]
+        return self
+
+    def stop(self):
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Local CoinMarketCap quotes/latest and cryptocurrency/map stand-in.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--universe', type=int, default=DEFAULT_UNIVERSE, help='number of symbols served')
+    parser.add_argument('--latency-dist', choices=LATENCY_DISTRIBUTIONS, default='constant')
+    parser.add_argument('--latency-mean', type=float, default=0.05, help='seconds')
+    parser.add_argument('--latency-jitter', type=float, default=0.0)
+    parser.add_argument('--bandwidth', type=float, default=None, help='bytes/second per response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of 500 responses')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of random 429 responses')
+    parser.add_argument('--rate-limit', type=int, default=None, help='requests per minute before 429')
+    parser.add_argument('--volatility', type=float, default=0.0, help='per-quote price noise (stddev)')
+    parser.add_argument('--duplicate-symbols', type=int, default=DEFAULT_DUPLICATE_SYMBOLS,
+                        help='top tickers that a second token also lists under (see /v1/cryptocurrency/map)')
+    parser.add_argument('--max-keys', type=int, default=DEFAULT_MAX_KEYS,
+                        help='most symbols or ids per quotes request before a 400')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = MockConfig(
+        universe_size=args.universe,
+        latency_dist=args.latency_dist,
+        latency_mean=args.latency_mean,
+        latency_jitter=args.latency_jitter,
+        bandwidth=args.bandwidth,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit_per_minute=args.rate_limit,
+        volatility=args.volatility,
+        duplicate_symbols=args.duplicate_symbols,
+        max_keys=args.max_keys,
+        seed=args.seed,
+    )
+    print(f"Mock CoinMarketCap serving {config.universe_size} symbols on http://{args.host}:{args.port}")
+    print(f"Point the scripts at it with: CMC_BASE_URL=http://{args.host}:{args.port}")
+    web.run_app(MockCMC(config).make_app(), host=args.host, port=args.port, print=None)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+import argparse
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+import numpy as np
+from backtest import fill_forward, holdings_matrix, load_holdings
+
+DEFAULT_SCENARIOS = 1000000
+DEFAULT_CONFIDENCE = (0.95, 0.99)
+DEFAULT_BLOCK_SIZE = 50000
+DEFAULT_CHUNK_BYTES = 32 * 1024 * 1024
+DEFAULT_BLOCK_BYTES = 64 * 1024 * 1024
+SECONDS_PER_DAY = 86400
+
+# Per-process state set up once by the pool initializer
+_worker = {}
+
+
+def estimate_risk_model(prices, timestamps=None, horizon_seconds=SECONDS_PER_DAY):
+    # Mean and covariance of log returns from a (time x symbol) price matrix,
+    # scaled from the bar spacing to the horizon. Symbols with no usable
+    # history get zero mean and variance.
+    prices = fill_forward(prices)
+    usable = np.all(prices > 0, axis=0)
+    log_returns = np.zeros((max(0, len(prices) - 1), prices.shape[1]))
+    if len(prices) > 1 and usable.any():
+        log_returns[:, usable] = np.diff(np.log(prices[:, usable]), axis=0)
+    if len(log_returns) < 2:
+        raise ValueError("at least three price snapshots are needed to estimate a covariance")
+
+    if timestamps is not None and len(timestamps) > 1:
+        step = float(np.median(np.diff(timestamps)))
+    else:
+        step = horizon_seconds
+    scale = horizon_seconds / step
+    mean = log_returns.mean(axis=0) * scale
+    covariance = np.atleast_2d(np.cov(log_returns, rowvar=False)) * scale
+    return mean, covariance, prices[-1]
+
+
+def covariance_factor(covariance):
+    # L with L @ L.T == covariance; falls back to clipped eigenvalues when the
+    # sample covariance is not positive definite (e.g. more symbols than bars)
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(covariance)
+        return vectors * np.sqrt(np.clip(values, 0.0, None))
+
+
+def tail_size(num_scenarios, confidence):
+    # Worst-loss count needed for VaR/CVaR at the lowest confidence level.
+    # Rounded first: 1 - 0.95 is not exact, and (1 - 0.95) * 50000 would ceil to 2501.
+    return max(1, math.ceil(round((1.0 - min(confidence)) * num_scenarios, 9)))
+
+
+class WorstLosses:
+    # Largest k losses per portfolio (row), streamed: incoming columns are
+    # buffered and the buffer is cut back to k with one partition whenever it
+    # fills, so memory is rows x (k + spare) however many scenarios arrive
+
+    def __init__(self, rows, k, spare):
+        self.k = k
+        self.spare = max(1, spare)
+        self.buffer = np.empty((rows, k + self.spare))
+        self.size = 0
+
+    def add(self, losses):
+        width = losses.shape[1]
+        if width > self.spare:
+            for start in range(0, width, self.spare):
+                self.add(losses[:, start:start + self.spare])
+            return
+        if self.size + width > self.buffer.shape[1]:
+            self._compact()
+        self.buffer[:, self.size:self.size + width] = losses
+        self.size += width
+
+    def _compact(self):
+        if self.size > self.k:
+            filled = self.buffer[:, :self.size]
+            filled.partition(self.size - self.k, axis=1)
+            self.buffer[:, :self.k] = filled[:, -self.k:]
+            self.size = self.k
+
+    def worst(self):
+        self._compact()
+        return self.buffer[:, :self.size]
+
+
+def _init_worker(mean, factor, exposures, k, chunk):
+    _worker['mean'] = mean
+    _worker['factor'] = factor
+    _worker['exposures'] = exposures
+    _worker['k'] = k
+    _worker['chunk'] = chunk
+
+
+def _simulate_block(seed, block_id, count):
+    # `count` scenarios from the block's own seed, streamed in chunks; returns
+    # (block_id, worst-k losses per portfolio, sum of losses per portfolio).
+    # Seeding per block (not per process) makes results independent of the
+    # worker count.
+    mean = _worker['mean']
+    factor = _worker['factor']
+    exposures = _worker['exposures']
+    k = _worker['k']
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block_id,)))
+
+    chunk = _worker['chunk']
+    tail = WorstLosses(exposures.shape[0], min(k, count), chunk)
+    loss_sums = np.zeros(exposures.shape[0])
+    for start in range(0, count, chunk):
+        size = min(chunk, count - start)
+        shocks = rng.standard_normal((size, len(mean)))
+        returns = shocks @ factor.T
+        returns += mean
+        np.expm1(returns, out=returns)
+        # Loss per portfolio per scenario: -(exposure . simple return)
+        losses = exposures @ returns.T
+        np.negative(losses, out=losses)
+        loss_sums += losses.sum(axis=1)
+        tail.add(losses)
+    return block_id, tail.worst(), loss_sums
+
+
+class VaRResult:
+    def __init__(self, confidence, var, cvar, expected_loss, scenarios, elapsed, workers):
+        self.confidence = confidence
+        # {confidence: per-portfolio array}, losses as positive dollar amounts
+        self.var = var
+        self.cvar = cvar
+        self.expected_loss = expected_loss
+        self.scenarios = scenarios
+        self.elapsed = elapsed
+        self.workers = workers
+
+    @property
+    def scenarios_per_second(self):
+        return self.scenarios / self.elapsed if self.elapsed else 0.0
+
+
+class MonteCarloVaR:
+    # Correlated log-normal price shocks from a historical covariance, applied
+    # to every portfolio's dollar exposures at once. Scenarios are split into
+    # fixed-size seeded blocks run across a process pool; each block streams
+    # its scenarios in chunks and keeps only each portfolio's worst losses, so
+    # memory is bounded by the chunk size and the loss tail ((1 - confidence)
+    # x scenarios per portfolio), never by the full scenario set.
+
+    def __init__(self, mean, covariance, current_prices, holdings, workers=None, block_size=None):
+        current_prices = np.nan_to_num(np.asarray(current_prices, dtype=np.float64))
+        exposures = holdings * current_prices
+        # Symbols nobody holds do not move any portfolio; drop them up front
+        active = np.flatnonzero(np.any(exposures != 0, axis=0))
+        self.mean = np.asarray(mean)[active]
+        self.factor = covariance_factor(np.asarray(covariance)[np.ix_(active, active)])
+        self.exposures = np.ascontiguousarray(exposures[:, active])
+        self.workers = workers or os.cpu_count()
+        num_portfolios = max(1, self.exposures.shape[0])
+        self.chunk = max(1, DEFAULT_CHUNK_BYTES // (8 * max(len(active), num_portfolios, 1)))
+        # A block's result is (portfolios x its scenarios) at most; the block
+        # size depends only on the inputs, never on the worker count
+        if block_size is None:
+            block_size = min(DEFAULT_BLOCK_SIZE, max(self.chunk, DEFAULT_BLOCK_BYTES // (8 * num_portfolios)))
+        self.block_size = block_size
+
+    def _outputs(self, blocks, seed, initargs):
+        # Yields block results as they finish, with at most two blocks per
+        # worker in flight so finished tails never pile up in the parent
+        if self.workers == 1:
+            _init_worker(*initargs)
+            for block_id, count in blocks:
+                yield _simulate_block(seed, block_id, count)
+            return
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=initargs) as pool:
+            pending = set()
+            for block_id, count in blocks:
+                if len(pending) >= 2 * self.workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                pending.add(pool.submit(_simulate_block, seed, block_id, count))
+            for future in as_completed(pending):
+                yield future.result()
+
+    def run(self, num_scenarios=DEFAULT_SCENARIOS, confidence=DEFAULT_CONFIDENCE, seed=0):
+        k = tail_size(num_scenarios, confidence)
+        blocks = ((block_id, min(self.block_size, num_scenarios - start))
+                  for block_id, start in enumerate(range(0, num_scenarios, self.block_size)))
+        initargs = (self.mean, self.factor, self.exposures, k, self.chunk)
+        num_portfolios = self.exposures.shape[0]
+
+        started = time.perf_counter()
+        # Spare room of k / 2 keeps re-partitioning to ~3 passes per loss
+        tail = WorstLosses(num_portfolios, k, max(min(k, self.block_size), k // 2))
+        block_sums = {}
+        for block_id, block_tail, sums in self._outputs(blocks, seed, initargs):
+            tail.add(block_tail)
+            block_sums[block_id] = sums
+        # The worst-k set does not depend on arrival order; the loss sums are
+        # added in block order so they are bit-identical for any worker count
+        loss_sums = np.zeros(num_portfolios)
+        for block_id in sorted(block_sums):
+            loss_sums += block_sums[block_id]
+        worst = -np.sort(-tail.worst(), axis=1)
+        elapsed = time.perf_counter() - started
+
+        var = {}
+        cvar = {}
+        for level in confidence:
+            count = tail_size(num_scenarios, [level])
+            var[level] = worst[:, count - 1]
+            cvar[level] = worst[:, :count].mean(axis=1)
+        return VaRResult(list(confidence), var, cvar, loss_sums / max(1, num_scenarios), num_scenarios,
+                         elapsed, self.workers)
+
+
+def var_from_history(book, history, days=90, horizon_days=1.0, **options):
+    # Risk model from the last `days` of a PriceHistory, priced at its latest snapshot
+    end = history.timestamps[-1]
+    timestamps, prices = history.window(end - days * SECONDS_PER_DAY, None)
+    mean, covariance, current = estimate_risk_model(np.asarray(prices), timestamps,
+                                                    horizon_days * SECONDS_PER_DAY)
+    holdings, missing = holdings_matrix(book, history.columns)
+    return MonteCarloVaR(mean, covariance, current, holdings, **options), missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Monte Carlo VaR / CVaR from historical returns.')
+    parser.add_argument('book', help='portfolio text file or .pfbook')
+    parser.add_argument('history', help='price_history.py store directory')
+    parser.add_argument('--scenarios', type=int, default=DEFAULT_SCENARIOS)
+    parser.add_argument('--confidence', type=float, nargs='+', default=list(DEFAULT_CONFIDENCE))
+    parser.add_argument('--days', type=float, default=90.0, help='history used for the covariance')
+    parser.add_argument('--horizon-days', type=float, default=1.0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--block-size', type=int, default=None, help='scenarios per seeded block')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from price_history import PriceHistory
+
+    book = load_holdings(args.book)
+    history = PriceHistory(args.history)
+    engine, missing = var_from_history(book, history, args.days, args.horizon_days,
+                                       workers=args.workers, block_size=args.block_size)
+    result = engine.run(args.scenarios, args.confidence, args.seed)
+
+    print(f"{result.scenarios} scenarios x {len(book)} portfolios on {result.workers} workers in "
+          f"{result.elapsed:.2f} s ({result.scenarios_per_second:,.0f} scenarios/s)")
+    names = book.names or [str(i) for i in range(len(book))]
+    header = ''.join(f"{f'VaR {level:.0%}':>16}{f'CVaR {level:.0%}':>16}" for level in result.confidence)
+    print(f"{'portfolio':>12}{header}")
+    for i, name in enumerate(names):
+        row = ''.join(f"{result.var[level][i]:>16,.2f}{result.cvar[level][i]:>16,.2f}"
+                      for level in result.confidence)
+        print(f"{str(name):>12}{row}")
+    if missing:
+        print(f"No history for: {', '.join(missing)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+import os
+import sys
+
+
+def pyplot():
+    # matplotlib costs most of a second to import, so scripts load it only
+    # when they actually draw. Outside a notebook/GUI session that already
+    # set up pyplot, the non-interactive Agg backend is used: figures are
+    # written to disk and nothing waits on a window.
+    import matplotlib
+    if 'matplotlib.pyplot' not in sys.modules and not os.environ.get('MPLBACKEND'):
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def save_figure(plt, filename):
+    plt.savefig(filename)
+    plt.close()
+    return filename
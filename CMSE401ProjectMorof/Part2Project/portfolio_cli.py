@@ -0,0 +1,192 @@
+import argparse
+import importlib
+import sys
+import time
+
+# One entry point for the common jobs. Only argparse is loaded up front: each
+# subcommand imports what it needs when it runs, so `value` never pays for
+# matplotlib or numpy and a cron job gets its total after the network libraries
+# alone. Plots are written to disk with the Agg backend (see plotting.py).
+#
+# Modules each subcommand loads, kept in step with the imports in its handler
+# (benchmark_startup.py times them in a fresh interpreter)
+COMMAND_MODULES = {
+    'value': ('dotenv', 'portfolio_serial', 'quote_cache', 'threaded_client', 'batch_planner'),
+    'benchmark': ('benchmark_runner',),
+    'compare': ('compare_serial_parallel',),
+    'plot': ('compare_serial_parallel', 'matplotlib.pyplot'),
+    'results': ('results_db',),
+    'gateway': ('price_gateway',),
+}
+VALUE_MODES = ('batched', 'async', 'threaded', 'serial')
+
+
+def import_command(name):
+    return [importlib.import_module(module) for module in COMMAND_MODULES[name]]
+
+
+def fetch_prices_by_id(symbol_ids, mode, base_url=None, cache=None):
+    # {symbol: CMC id} (see symbol_registry.py) is one id query whatever the
+    # mode, so the mode only picks the sync or async client
+    if mode in ('serial', 'threaded'):
+        from price_client import SerialPriceClient
+        with SerialPriceClient(base_url=base_url, cache=cache) as client:
+            return client.fetch_prices_by_id(symbol_ids)
+
+    import asyncio
+    from price_client import PriceClient
+
+    async def run():
+        async with PriceClient(base_url=base_url, cache=cache) as client:
+            return await client.fetch_prices_by_id(symbol_ids)
+
+    return asyncio.run(run())
+
+
+def fetch_prices(symbols, mode, base_url=None, cache=None):
+    if mode in ('serial', 'threaded'):
+        from price_client import SerialPriceClient
+        from threaded_client import ThreadedPriceClient
+        client_class = ThreadedPriceClient if mode == 'threaded' else SerialPriceClient
+        with client_class(base_url=base_url, cache=cache) as client:
+            return client.fetch_prices(symbols)
+
+    import asyncio
+    from batch_planner import fetch_batched_prices
+    from price_client import PriceClient
+
+    async def run():
+        async with PriceClient(base_url=base_url, cache=cache) as client:
+            if mode == 'batched':
+                return await fetch_batched_prices(client, [symbols])
+            return await client.fetch_prices(symbols)
+
+    return asyncio.run(run())
+
+
+# --- Subcommands ---
+def command_value(args):
+    from dotenv import load_dotenv
+    from portfolio_serial import read_portfolio
+    from quote_cache import DEFAULT_CACHE_FILE, QuoteCache
+
+    load_dotenv()
+    portfolio = read_portfolio(args.portfolio)
+    cache = QuoteCache(path=DEFAULT_CACHE_FILE) if args.cache else None
+
+    server = None
+    base_url = None
+    if args.mock:
+        from mock_cmc_server import MockServerThread
+        server = MockServerThread().start()
+        base_url = server.base_url
+
+    start_time = time.perf_counter()
+    try:
+        if args.by_id:
+            from symbol_registry import DEFAULT_REGISTRY_FILE, SymbolRegistry
+            registry = SymbolRegistry(None if args.mock else DEFAULT_REGISTRY_FILE, base_url=base_url).ensure()
+            valid, invalid = registry.validate(portfolio)
+            for symbol in invalid:
+                print(f"Symbol {symbol} is not listed on CoinMarketCap. Skipping.")
+            prices = fetch_prices_by_id(registry.id_map(valid), args.mode, base_url, cache)
+        else:
+            prices = fetch_prices(list(portfolio), args.mode, base_url, cache)
+    finally:
+        if server is not None:
+            server.stop()
+    elapsed = time.perf_counter() - start_time
+
+    total_value = 0.0
+    for symbol, amount in portfolio.items():
+        value = prices.get(symbol, 0.0) * amount
+        if not args.quiet:
+            print(f"{symbol}: {amount} × ${prices.get(symbol, 0.0):.2f} = ${value:.2f}")
+        total_value += value
+    if args.quiet:
+        print(f"{total_value:.2f}")
+        return 0
+    print(f"\nTotal Portfolio Value: ${total_value:.2f}")
+    print(f"Time Taken ({args.mode}): {elapsed:.2f} seconds")
+    return 0
+
+
+def command_benchmark(args):
+    import benchmark_runner
+    benchmark_runner.main(args.runner_args)
+    return 0
+
+
+def command_results(args):
+    import results_db
+    return results_db.main(args.runner_args)
+
+
+def command_gateway(args):
+    import price_gateway
+    price_gateway.main(args.runner_args)
+    return 0
+
+
+def command_compare(args):
+    from compare_serial_parallel import load_any, print_comparison
+    print_comparison(load_any(args.results))
+    return 0
+
+
+def command_plot(args):
+    from compare_serial_parallel import load_any, plot_speedup, plot_timing
+    by_mode = load_any(args.results)
+    print(f"Saved {plot_timing(by_mode)}")
+    if 'serial' in by_mode:
+        print(f"Saved {plot_speedup(by_mode)}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='portfolio_cli.py', description='Crypto portfolio valuation tools.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    value = commands.add_parser('value', help='value one portfolio file and print its total')
+    value.add_argument('portfolio', nargs='?', default='basic_portfolio.txt', help='"SYMBOL amount" per line')
+    value.add_argument('--mode', choices=VALUE_MODES, default='batched',
+                       help='how quotes are fetched (default: batched, the fewest requests)')
+    value.add_argument('--no-cache', dest='cache', action='store_false', help='skip the on-disk quote cache')
+    value.add_argument('--mock', action='store_true', help='price against a local mock server')
+    value.add_argument('--by-id', action='store_true',
+                       help='validate against the cached symbol map and fetch by CMC id (one unambiguous request)')
+    value.add_argument('-q', '--quiet', action='store_true', help='print only the total (for scripts and cron)')
+    value.set_defaults(handler=command_value)
+
+    benchmark = commands.add_parser('benchmark', help='run benchmark_runner.py (remaining arguments pass through)',
+                                    add_help=False)
+    benchmark.set_defaults(handler=command_benchmark, passthrough=True)
+
+    results = commands.add_parser('results', help='stored runs: list, import, check for regressions, plot two runs '
+                                                  '(arguments pass through to results_db.py)', add_help=False)
+    results.set_defaults(handler=command_results, passthrough=True)
+
+    gateway = commands.add_parser('gateway', help='serve POST /value and GET /quotes to many local clients '
+                                                  '(arguments pass through to price_gateway.py)', add_help=False)
+    gateway.set_defaults(handler=command_gateway, passthrough=True)
+
+    for name, handler, text in (('compare', command_compare, 'print mode medians and speedups vs serial'),
+                                ('plot', command_plot, 'save timing and speedup figures')):
+        command = commands.add_parser(name, help=text)
+        command.add_argument('results', nargs='?', default='benchmark_results.json',
+                             help='benchmark_runner.py output (falls back to the legacy CSVs)')
+        command.set_defaults(handler=handler)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if not getattr(args, 'passthrough', False) and extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.runner_args = extra
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,18 +1,8 @@
-import aiohttp
 import asyncio
-import os
 import time
 from dotenv import load_dotenv
-
-# Load API key
-load_dotenv()
-API_KEY = os.getenv('CMC_API_KEY')
-
-# API URL and headers
-url = 'https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest'
-headers = {
-    'X-CMC_PRO_API_KEY': API_KEY
-}
+from price_client import PriceClient
+from quote_cache import DEFAULT_CACHE_FILE, QuoteCache
 
 # Read portfolio
 def read_portfolio(filename):
@@ -25,24 +15,19 @@ def read_portfolio(filename):
                 portfolio[symbol.upper()] = float(amount)
     return portfolio
 
-# Async function to fetch a single price
-async def fetch_price(session, symbol):
-    params = {'symbol': symbol, 'convert': 'USD'}
-    async with session.get(url, headers=headers, params=params) as response:
-        data = await response.json()
-        price = data['data'][symbol]['quote']['USD']['price']
-        return symbol, price
+# Async function to fetch a single price (cache first)
+async def fetch_price(client, symbol):
+    return await client.fetch_price(symbol)
 
 # Async function to fetch all prices
-async def fetch_all_prices(symbols):
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch_price(session, symbol) for symbol in symbols]
-        results = await asyncio.gather(*tasks)
-        return dict(results)
+async def fetch_all_prices(client, symbols):
+    tasks = [fetch_price(client, symbol) for symbol in symbols]
+    results = await asyncio.gather(*tasks)
+    return dict(results)
 
 # Main valuation function
-async def value_portfolio(portfolio):
-    prices = await fetch_all_prices(portfolio.keys())
+async def value_portfolio(portfolio, client):
+    prices = await fetch_all_prices(client, portfolio.keys())
     total_value = 0.0
     for symbol, amount in portfolio.items():
         price = prices[symbol]
@@ -53,12 +38,20 @@ async def value_portfolio(portfolio):
 
 # Timing wrapper
 def main():
+    load_dotenv()
     portfolio = read_portfolio('basic_portfolio.txt')
-    start_time = time.time()
-    total_value = asyncio.run(value_portfolio(portfolio))
-    end_time = time.time()
+    cache = QuoteCache(path=DEFAULT_CACHE_FILE)
+
+    async def run():
+        async with PriceClient(cache=cache) as client:
+            return await value_portfolio(portfolio, client)
+
+    start_time = time.perf_counter()
+    total_value = asyncio.run(run())
+    end_time = time.perf_counter()
     print(f"\nTotal Portfolio Value: ${total_value:.2f}")
     print(f"Time Taken (parallel version): {end_time - start_time:.2f} seconds")
+    print(f"Quote cache: {cache.stats()}")
 
 if __name__ == '__main__':
     main()
@@ -1,17 +1,7 @@
-import requests
-import os
 import time
 from dotenv import load_dotenv
-
-# Load API key
-load_dotenv()
-API_KEY = os.getenv('CMC_API_KEY')
-
-# API URL and headers
-url = 'https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest'
-headers = {
-    'X-CMC_PRO_API_KEY': API_KEY
-}
+from price_client import SerialPriceClient
+from quote_cache import DEFAULT_CACHE_FILE, QuoteCache
 
 # Read portfolio
 def read_portfolio(filename):
@@ -24,19 +14,15 @@ def read_portfolio(filename):
                 portfolio[symbol.upper()] = float(amount)
     return portfolio
 
-# Fetch price (serially, one at a time)
-def fetch_price(symbol):
-    params = {'symbol': symbol, 'convert': 'USD'}
-    response = requests.get(url, headers=headers, params=params)
-    data = response.json()
-    price = data['data'][symbol]['quote']['USD']['price']
-    return price
+# Fetch price (serially, one at a time, cache first)
+def fetch_price(client, symbol):
+    return client.fetch_price(symbol)
 
 # Main valuation function
-def value_portfolio(portfolio):
+def value_portfolio(portfolio, client):
     total_value = 0.0
     for symbol, amount in portfolio.items():
-        price = fetch_price(symbol)
+        price = fetch_price(client, symbol)
         value = price * amount
         print(f"{symbol}: {amount} × ${price:.2f} = ${value:.2f}")
         total_value += value
@@ -44,12 +30,16 @@ def value_portfolio(portfolio):
 
 # Timing wrapper
 def main():
+    load_dotenv()
     portfolio = read_portfolio('basic_portfolio.txt')
-    start_time = time.time()
-    total_value = value_portfolio(portfolio)
-    end_time = time.time()
+    cache = QuoteCache(path=DEFAULT_CACHE_FILE)
+    start_time = time.perf_counter()
+    with SerialPriceClient(cache=cache) as client:
+        total_value = value_portfolio(portfolio, client)
+    end_time = time.perf_counter()
     print(f"\nTotal Portfolio Value: ${total_value:.2f}")
     print(f"Time Taken (serial version): {end_time - start_time:.2f} seconds")
+    print(f"Quote cache: {cache.stats()}")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,152 @@
+import argparse
+import json
+import struct
+import time
+from array import array
+
+import numpy as np
+from valuation_engine import PortfolioBook, SymbolTable
+
+# Binary book layout (little-endian):
+#   header   MAGIC, version, num_portfolios, num_holdings, num_symbols, symbols_bytes, names_bytes
+#   columns  portfolio_ids int32[num_holdings], symbol_ids int32[num_holdings], amounts float64[num_holdings]
+#   trailer  symbols as UTF-8 joined by '\n', then portfolio names as a JSON list (optional)
+MAGIC = b'PFBOOK01'
+VERSION = 1
+HEADER = struct.Struct('<8sIQQQQQ')
+ID_DTYPE = np.dtype('<i4')
+AMOUNT_DTYPE = np.dtype('<f8')
+
+
+def align8(offset):
+    return (offset + 7) & ~7
+
+
+# --- Streaming text parser ---
+def iter_portfolios(filename):
+    # Yields (name, {symbol: amount}) one portfolio at a time. Every '#' header
+    # starts a new portfolio, so two portfolios of the same size stay separate.
+    # A file without headers (basic_portfolio.txt) is one unnamed portfolio.
+    name = None
+    portfolio = {}
+
+    with open(filename, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('#'):
+                if portfolio:
+                    yield name, portfolio
+                name = line.lstrip('#').strip()
+                portfolio = {}
+                continue
+            parts = line.split()
+            if len(parts) != 2:
+                continue
+            symbol, amount = parts
+            symbol = symbol.upper()
+            portfolio[symbol] = portfolio.get(symbol, 0.0) + float(amount)
+
+    if portfolio:
+        yield name, portfolio
+
+
+def sized_portfolios(filename):
+    # [(num_assets, {symbol: amount})] in file order for the benchmark scripts;
+    # unlike a dict keyed by size, portfolios of the same size are all kept
+    return [(len(portfolio), portfolio) for _, portfolio in iter_portfolios(filename)]
+
+
+def read_book(filename, symbols=None, keep_names=True):
+    # Text file straight into typed columns, no per-holding Python objects kept
+    symbols = symbols if symbols is not None else SymbolTable()
+    portfolio_ids = array('i')
+    symbol_ids = array('i')
+    amounts = array('d')
+    names = [] if keep_names else None
+    count = 0
+
+    for name, portfolio in iter_portfolios(filename):
+        for symbol, amount in portfolio.items():
+            portfolio_ids.append(count)
+            symbol_ids.append(symbols.intern(symbol))
+            amounts.append(amount)
+        if keep_names:
+            names.append(name)
+        count += 1
+
+    return PortfolioBook(np.frombuffer(portfolio_ids, dtype=np.int32), np.frombuffer(symbol_ids, dtype=np.int32),
+                         np.frombuffer(amounts, dtype=np.float64), symbols, count, names)
+
+
+# --- Memory-mapped binary format ---
+def save_book(book, path):
+    symbols_blob = '\n'.join(book.symbols.symbols).encode('utf-8')
+    names_blob = json.dumps(book.names).encode('utf-8') if book.names is not None else b''
+    num_holdings = book.num_holdings
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, book.num_portfolios, num_holdings, len(book.symbols),
+                            len(symbols_blob), len(names_blob)))
+        for column, dtype in ((book.portfolio_ids, ID_DTYPE), (book.symbol_ids, ID_DTYPE),
+                              (book.amounts, AMOUNT_DTYPE)):
+            f.write(b'\0' * (align8(f.tell()) - f.tell()))
+            f.write(np.ascontiguousarray(column, dtype=dtype).tobytes())
+        f.write(symbols_blob)
+        f.write(names_blob)
+
+
+def load_book(path, mmap=True):
+    with open(path, 'rb') as f:
+        magic, version, num_portfolios, num_holdings, num_symbols, symbols_bytes, names_bytes = \
+            HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} portfolio book")
+
+        offset = HEADER.size
+        columns = []
+        for dtype in (ID_DTYPE, ID_DTYPE, AMOUNT_DTYPE):
+            offset = align8(offset)
+            if num_holdings == 0:
+                columns.append(np.zeros(0, dtype=dtype))
+            elif mmap:
+                columns.append(np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(num_holdings,)))
+            else:
+                f.seek(offset)
+                columns.append(np.fromfile(f, dtype=dtype, count=num_holdings))
+            offset += num_holdings * dtype.itemsize
+
+        f.seek(offset)
+        symbols_blob = f.read(symbols_bytes).decode('utf-8')
+        names_blob = f.read(names_bytes)
+
+    symbols = SymbolTable(symbols_blob.split('\n') if num_symbols else [])
+    names = json.loads(names_blob) if names_bytes else None
+    return PortfolioBook(columns[0], columns[1], columns[2], symbols, num_portfolios, names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert portfolio text files to memory-mapped books.')
+    parser.add_argument('source', help='portfolio text file (e.g. portfolios.txt)')
+    parser.add_argument('target', nargs='?', help='binary book to write (default: <source>.pfbook)')
+    parser.add_argument('--no-names', action='store_true', help='do not store portfolio header names')
+    args = parser.parse_args()
+    target = args.target or f"{args.source.rsplit('.', 1)[0]}.pfbook"
+
+    start_time = time.perf_counter()
+    book = read_book(args.source, keep_names=not args.no_names)
+    parse_time = time.perf_counter() - start_time
+    save_book(book, target)
+
+    start_time = time.perf_counter()
+    loaded = load_book(target)
+    load_time = time.perf_counter() - start_time
+
+    print(f"{len(book)} portfolios, {book.num_holdings} holdings, {len(book.symbols)} symbols")
+    print(f"Text parse:       {parse_time * 1000:.2f} ms")
+    print(f"Memory-mapped load: {load_time * 1000:.2f} ms ({len(loaded)} portfolios)")
+    print(f"Book saved to '{target}'.")
+
+if __name__ == '__main__':
+    main()
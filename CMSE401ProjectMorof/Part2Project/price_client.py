@@ -0,0 +1,358 @@
+import asyncio
+import os
+import threading
+import time
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from quote_decoder import JsonDecoder
+from request_trace import TracingHTTPAdapter
+from resilience import RETRYABLE_ERRORS, RETRYABLE_STATUS, RetryableResponse, retry_after_seconds
+from single_flight import SingleFlight
+
+# API URL
+BASE_URL = 'https://pro-api.coinmarketcap.com'
+QUOTES_PATH = '/v1/cryptocurrency/quotes/latest'
+
+# Connection pool settings shared by both clients
+POOL_LIMIT = 100
+POOL_LIMIT_PER_HOST = 20
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+
+def make_headers(api_key=None):
+    if api_key is None:
+        api_key = os.getenv('CMC_API_KEY')
+    return {
+        'X-CMC_PRO_API_KEY': api_key or '',
+        'Accept': 'application/json',
+        'Accept-Encoding': 'deflate, gzip',
+    }
+
+
+def resolve_base_url(base_url=None):
+    # CMC_BASE_URL points every fetcher at a stand-in server (see mock_cmc_server.py)
+    if base_url is None:
+        base_url = os.getenv('CMC_BASE_URL') or BASE_URL
+    return base_url.rstrip('/')
+
+
+def quotes_url(base_url=None):
+    return resolve_base_url(base_url) + QUOTES_PATH
+
+
+def quote_params(symbols):
+    # skip_invalid keeps one unknown symbol from failing a whole batch
+    return {'symbol': ','.join(symbols), 'convert': 'USD', 'skip_invalid': 'true'}
+
+
+def id_quote_params(ids):
+    # Ids name exactly one coin each; the response is keyed by id (as a string)
+    return {'id': ','.join(str(coin_id) for coin_id in ids), 'convert': 'USD', 'skip_invalid': 'true'}
+
+
+def request_keys(params):
+    # The keys the response's 'data' object will use
+    return (params.get('symbol') or params['id']).split(',')
+
+
+def found_prices(data):
+    quotes = data.get('data') if isinstance(data, dict) else None
+    if not quotes:
+        return {}
+    return {symbol: quote['quote']['USD']['price'] for symbol, quote in quotes.items()}
+
+
+def parse_prices(data, symbols):
+    prices = {}
+    if not isinstance(data, dict) or data.get('data') is None:
+        print("API returned no data. Skipping batch.")
+        return {symbol: 0.0 for symbol in symbols}
+
+    found = found_prices(data)
+    for symbol in symbols:
+        if symbol in found:
+            prices[symbol] = found[symbol]
+        else:
+            print(f"Price for {symbol} not found. Skipping.")
+            prices[symbol] = 0.0
+    return prices
+
+
+def found_id_prices(data, ids):
+    # {id: price} for the ids an id-keyed response (keys are strings) priced
+    found = found_prices(data)
+    return {coin_id: found[str(coin_id)] for coin_id in ids if str(coin_id) in found}
+
+
+def prices_by_id(id_prices, symbol_ids):
+    # {symbol: id} and {id: price} -> {symbol: price}
+    prices = {}
+    for symbol, coin_id in symbol_ids.items():
+        price = id_prices.get(coin_id)
+        if price is None:
+            print(f"Price for {symbol} (id {coin_id}) not found. Skipping.")
+        prices[symbol] = price or 0.0
+    return prices
+
+
+def failed_request(symbols, error):
+    print(f"Quote request for {','.join(symbols)} failed after retries ({error}). Skipping.")
+    return {}
+
+
+def cached_prices(cache, symbols):
+    if cache is None:
+        return {}, list(symbols)
+    return cache.get_many(symbols)
+
+
+# --- Async client (aiohttp) ---
+class PriceClient:
+    # Keeps one ClientSession and keep-alive connector open across many
+    # valuations so each portfolio does not pay for new TCP/TLS handshakes.
+
+    def __init__(self, api_key=None, base_url=None, limit=POOL_LIMIT,
+                 limit_per_host=POOL_LIMIT_PER_HOST, dns_cache_ttl=DNS_CACHE_TTL,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT, cache=None, controller=None, resilience=None, decoder=None,
+                 tracer=None):
+        self.url = quotes_url(base_url)
+        self.decoder = decoder or JsonDecoder()
+        self.tracer = tracer
+        self.headers = make_headers(api_key)
+        self.cache = cache
+        self.controller = controller
+        self.resilience = resilience
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.session = None
+        self.request_count = 0
+        self.flights = SingleFlight()
+        # Keyed by CMC id, apart from the symbol-keyed flights
+        self.id_flights = SingleFlight()
+
+    async def open(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            trace_configs = [self.tracer.trace_config()] if self.tracer is not None else None
+            self.session = aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                                 trace_configs=trace_configs)
+        return self
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        if self.cache is not None:
+            self.cache.save()
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _get(self, params):
+        # Network (send -> body read) and decode are timed separately; a
+        # tracer also splits the network part into phases (request_trace.py)
+        symbols = request_keys(params)
+        trace = self.tracer.start('aiohttp', symbols) if self.tracer is not None else None
+        start = time.perf_counter()
+        async with self.session.get(self.url, params=params, trace_request_ctx=trace) as response:
+            body = await response.read()
+            self.decoder.stats.record_network(time.perf_counter() - start)
+            data = {}
+            if trace is not None:
+                trace.body_read(response.status, len(body))
+            decode_start = time.perf_counter()
+            if response.status not in RETRYABLE_STATUS:
+                data = self.decoder.decode(body, symbols)
+            if trace is not None:
+                self.tracer.finish(trace, time.perf_counter() - decode_start)
+            return response.status, response.headers, data
+
+    async def _request(self, params):
+        self.request_count += 1
+        if self.controller is None:
+            status, headers, data = await self._get(params)
+        else:
+            async with self.controller.slot() as slot:
+                status, headers, data = await self._get(params)
+                slot.throttled = status == 429
+        if self.resilience is not None and status in RETRYABLE_STATUS:
+            raise RetryableResponse(status, retry_after_seconds(headers))
+        return data
+
+    async def _fetch(self, params, symbols):
+        await self.open()
+        if self.resilience is None:
+            return await self._request(params)
+        try:
+            return await self.resilience.call(lambda: self._request(params))
+        except RETRYABLE_ERRORS as error:
+            return failed_request(symbols, error)
+
+    async def fetch_quotes(self, symbols):
+        data = await self._fetch(quote_params(symbols), symbols)
+        if self.cache is not None:
+            self.cache.put_many(found_prices(data))
+        return data
+
+    async def _fetch_ids_uncached(self, ids):
+        data = await self._fetch(id_quote_params(ids), [str(coin_id) for coin_id in ids])
+        return found_id_prices(data, ids)
+
+    async def fetch_prices_by_id(self, symbol_ids):
+        # {symbol: CMC id} (see symbol_registry.py) -> {symbol: price}. Ids are
+        # split under the same per-request caps as symbols, the batches go out
+        # together, and an id already in flight is joined rather than resent.
+        # Prices are cached and returned under the caller's symbols.
+        # (Imported here: batch_planner imports this module.)
+        from batch_planner import plan_id_batches
+        prices, missing = cached_prices(self.cache, symbol_ids)
+        if missing:
+            ids = {symbol: symbol_ids[symbol] for symbol in missing}
+            batches = plan_id_batches(list(dict.fromkeys(ids.values())), self.url)
+            results = await asyncio.gather(*(self.id_flights.do_many(batch, self._fetch_ids_uncached)
+                                             for batch in batches))
+            id_prices = {coin_id: price for result in results for coin_id, price in result.items()}
+            fetched = prices_by_id(id_prices, ids)
+            if self.cache is not None:
+                self.cache.put_many({symbol: price for symbol, price in fetched.items() if price})
+            prices.update(fetched)
+        return prices
+
+    async def _fetch_uncached(self, symbols):
+        data = await self.fetch_quotes(symbols)
+        return parse_prices(data, symbols)
+
+    async def fetch_missing(self, symbols):
+        # For symbols the caller already found missing from the cache: join any
+        # in-flight request for them without looking them up (and counting a miss) again
+        return await self.flights.do_many(symbols, self._fetch_uncached)
+
+    async def fetch_batch(self, symbols):
+        # Cache first, then join any in-flight request for the same symbols
+        prices, missing = cached_prices(self.cache, symbols)
+        if missing:
+            prices.update(await self.fetch_missing(missing))
+        return prices
+
+    async def fetch_price(self, symbol):
+        prices = await self.fetch_batch([symbol])
+        return symbol, prices[symbol]
+
+    async def fetch_prices(self, symbols):
+        results = await asyncio.gather(*(self.fetch_price(symbol) for symbol in symbols))
+        return dict(results)
+
+
+# --- Sync client (requests) ---
+class SerialPriceClient:
+    # Same idea for the requests-based path: one pooled Session so serial
+    # calls reuse a warm keep-alive connection instead of reconnecting.
+
+    def __init__(self, api_key=None, base_url=None, pool_connections=POOL_LIMIT_PER_HOST,
+                 pool_maxsize=POOL_LIMIT_PER_HOST, cache=None, resilience=None, decoder=None, tracer=None):
+        self.url = quotes_url(base_url)
+        self.decoder = decoder or JsonDecoder()
+        self.tracer = tracer
+        self.headers = make_headers(api_key)
+        self.cache = cache
+        self.resilience = resilience
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # The tracing adapter's connections report connect and TLS time
+        adapter_class = TracingHTTPAdapter if tracer is not None else HTTPAdapter
+        adapter = adapter_class(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.request_count = 0
+        # ThreadedPriceClient calls _request from its worker threads
+        self.count_lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _request(self, params):
+        with self.count_lock:
+            self.request_count += 1
+        symbols = request_keys(params)
+        trace = self.tracer.start('requests', symbols) if self.tracer is not None else None
+        start = time.perf_counter()
+        # stream=True returns at the headers so ttfb and body can be told apart;
+        # reading .content releases the connection back to the pool either way
+        response = self.session.get(self.url, params=params, stream=True)
+        if trace is not None:
+            trace.response_started()
+        body = response.content
+        self.decoder.stats.record_network(time.perf_counter() - start)
+        if trace is not None:
+            trace.body_read(response.status_code, len(body))
+        if response.status_code in RETRYABLE_STATUS:
+            if trace is not None:
+                self.tracer.finish(trace)
+            if self.resilience is not None:
+                raise RetryableResponse(response.status_code, retry_after_seconds(response.headers))
+            return {}
+        decode_start = time.perf_counter()
+        data = self.decoder.decode(body, symbols)
+        if trace is not None:
+            self.tracer.finish(trace, time.perf_counter() - decode_start)
+        return data
+
+    def _fetch(self, params, symbols):
+        if self.resilience is None:
+            return self._request(params)
+        try:
+            return self.resilience.call_sync(lambda: self._request(params))
+        except RETRYABLE_ERRORS as error:
+            return failed_request(symbols, error)
+
+    def fetch_quotes(self, symbols):
+        data = self._fetch(quote_params(symbols), symbols)
+        if self.cache is not None:
+            self.cache.put_many(found_prices(data))
+        return data
+
+    def fetch_prices_by_id(self, symbol_ids):
+        from batch_planner import plan_id_batches
+        prices, missing = cached_prices(self.cache, symbol_ids)
+        if missing:
+            ids = {symbol: symbol_ids[symbol] for symbol in missing}
+            id_prices = {}
+            for batch in plan_id_batches(list(dict.fromkeys(ids.values())), self.url):
+                data = self._fetch(id_quote_params(batch), [str(coin_id) for coin_id in batch])
+                id_prices.update(found_id_prices(data, batch))
+            fetched = prices_by_id(id_prices, ids)
+            if self.cache is not None:
+                self.cache.put_many({symbol: price for symbol, price in fetched.items() if price})
+            prices.update(fetched)
+        return prices
+
+    def fetch_price(self, symbol):
+        cached, _ = cached_prices(self.cache, [symbol])
+        if symbol in cached:
+            return cached[symbol]
+        data = self.fetch_quotes([symbol])
+        return parse_prices(data, [symbol])[symbol]
+
+    def fetch_prices(self, symbols):
+        return {symbol: self.fetch_price(symbol) for symbol in symbols}
@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import math
+import random
+import time
+from array import array
+
+import numpy as np
+from incremental_valuation import IncrementalValuationStore
+
+# Tick line format (file and socket): "<unix timestamp>,<SYMBOL>,<price>\n"
+DEFAULT_FEED_PORT = 9009
+DEFAULT_MAX_BATCH = 1000
+DEFAULT_QUEUE_SIZE = 10000
+
+
+class Tick:
+    __slots__ = ('timestamp', 'symbol', 'price', 'received')
+
+    def __init__(self, timestamp, symbol, price, received=None):
+        self.timestamp = timestamp
+        self.symbol = symbol
+        self.price = price
+        self.received = received
+
+
+def parse_tick(line):
+    parts = line.strip().split(',')
+    if len(parts) != 3:
+        return None
+    try:
+        return Tick(float(parts[0]), parts[1].upper(), float(parts[2]))
+    except ValueError:
+        return None
+
+
+def format_tick(tick):
+    return f"{tick.timestamp:.6f},{tick.symbol},{tick.price!r}\n"
+
+
+# --- Tick sources: anything with an async ticks() generator ---
+class FileTickSource:
+    # Replays a recorded tick file. speed=None replays as fast as possible,
+    # speed=1.0 keeps the original spacing, 10.0 replays ten times faster.
+
+    def __init__(self, path, speed=None):
+        self.path = path
+        self.speed = speed
+
+    async def ticks(self):
+        first_timestamp = None
+        start = time.perf_counter()
+        with open(self.path, 'r') as f:
+            for count, line in enumerate(f):
+                tick = parse_tick(line)
+                if tick is None:
+                    continue
+                if self.speed:
+                    if first_timestamp is None:
+                        first_timestamp = tick.timestamp
+                    due = (tick.timestamp - first_timestamp) / self.speed
+                    delay = due - (time.perf_counter() - start)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif count % 1000 == 0:
+                    await asyncio.sleep(0)
+                yield tick
+
+
+class SocketTickSource:
+    # Reads tick lines from a TCP stream, e.g. one served by serve_tick_file()
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_FEED_PORT):
+        self.host = host
+        self.port = port
+
+    async def ticks(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                tick = parse_tick(line.decode())
+                if tick is not None:
+                    yield tick
+        finally:
+            writer.close()
+
+
+class SyntheticTickSource:
+    # Seeded random-walk ticks over a symbol list; rate=None is as fast as possible
+
+    def __init__(self, symbols, count, rate=None, volatility=0.001, seed=0, start_prices=None):
+        self.symbols = list(symbols)
+        self.count = count
+        self.rate = rate
+        self.volatility = volatility
+        self.seed = seed
+        self.start_prices = start_prices
+
+    async def ticks(self):
+        rng = random.Random(self.seed)
+        if self.start_prices is not None:
+            prices = [float(p) for p in self.start_prices]
+        else:
+            prices = [10 ** rng.uniform(-4, 4) for _ in self.symbols]
+        start = time.perf_counter()
+        wall_start = time.time()
+
+        for i in range(self.count):
+            column = rng.randrange(len(self.symbols))
+            prices[column] *= math.exp(rng.gauss(0.0, self.volatility))
+            if self.rate:
+                delay = i / self.rate - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                timestamp = time.time()
+            else:
+                timestamp = wall_start + i * 1e-6
+                if i % 1000 == 0:
+                    await asyncio.sleep(0)
+            yield Tick(timestamp, self.symbols[column], prices[column])
+
+
+async def record_ticks(source, path):
+    count = 0
+    with open(path, 'w') as f:
+        async for tick in source.ticks():
+            f.write(format_tick(tick))
+            count += 1
+    return count
+
+
+async def serve_tick_file(path, host='127.0.0.1', port=DEFAULT_FEED_PORT, speed=None):
+    # Every client that connects gets its own replay of the file
+    async def handle(reader, writer):
+        try:
+            async for tick in FileTickSource(path, speed).ticks():
+                writer.write(format_tick(tick).encode())
+                if writer.transport.get_write_buffer_size() > 65536:
+                    await writer.drain()
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+# --- Continuous valuation ---
+class FeedValuator:
+    # Reads ticks into a bounded queue and applies them to an
+    # IncrementalValuationStore in micro-batches: whatever has queued up since
+    # the last batch (up to max_batch) is applied at once, then the changed
+    # portfolios are published. Lag is measured per tick from receipt to publish.
+
+    def __init__(self, store, max_batch=DEFAULT_MAX_BATCH, queue_size=DEFAULT_QUEUE_SIZE):
+        self.store = store
+        self.max_batch = max_batch
+        self.queue_size = queue_size
+        self.subscribers = []
+        self.lags = array('d')
+        self.ticks_processed = 0
+        self.batches = 0
+        self.portfolio_updates = 0
+        self.elapsed = 0.0
+
+    def subscribe(self, callback):
+        # callback(changed_portfolio_ids, their_new_totals)
+        self.subscribers.append(callback)
+
+    async def _produce(self, source, queue):
+        try:
+            async for tick in source.ticks():
+                tick.received = time.perf_counter()
+                await queue.put(tick)
+        finally:
+            await queue.put(None)
+
+    def _publish(self, batch):
+        changed = self.store.apply_events((tick.symbol, tick.price) for tick in batch)
+        totals = self.store.totals[changed]
+        for callback in self.subscribers:
+            callback(changed, totals)
+
+        now = time.perf_counter()
+        self.lags.extend(now - tick.received for tick in batch)
+        self.ticks_processed += len(batch)
+        self.batches += 1
+        self.portfolio_updates += len(changed)
+
+    async def _consume(self, queue):
+        while True:
+            tick = await queue.get()
+            if tick is None:
+                return
+            batch = [tick]
+            finished = False
+            while len(batch) < self.max_batch and not queue.empty():
+                tick = queue.get_nowait()
+                if tick is None:
+                    finished = True
+                    break
+                batch.append(tick)
+            self._publish(batch)
+            if finished:
+                return
+
+    async def run(self, source):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        start = time.perf_counter()
+        producer = asyncio.ensure_future(self._produce(source, queue))
+        try:
+            await self._consume(queue)
+        finally:
+            if not producer.done():
+                producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+            self.elapsed += time.perf_counter() - start
+        return self.stats()
+
+    def stats(self):
+        lags = np.frombuffer(self.lags, dtype=np.float64) if len(self.lags) else np.zeros(1)
+        return {
+            'ticks': self.ticks_processed,
+            'batches': self.batches,
+            'portfolio_updates': self.portfolio_updates,
+            'ticks_per_second': self.ticks_processed / self.elapsed if self.elapsed else 0.0,
+            'lag_p50_ms': float(np.percentile(lags, 50) * 1000),
+            'lag_p99_ms': float(np.percentile(lags, 99) * 1000),
+            'lag_max_ms': float(lags.max() * 1000),
+        }
+
+
+def load_store(book_path):
+    from portfolio_store import load_book, read_book
+
+    book = load_book(book_path) if book_path.endswith('.pfbook') else read_book(book_path)
+    return IncrementalValuationStore(book)
+
+
+def print_stats(stats):
+    print(f"Ticks: {stats['ticks']} in {stats['batches']} batches, "
+          f"{stats['ticks_per_second']:.0f} ticks/s, {stats['portfolio_updates']} portfolio updates")
+    print(f"Update lag: p50 {stats['lag_p50_ms']:.3f} ms, p99 {stats['lag_p99_ms']:.3f} ms, "
+          f"max {stats['lag_max_ms']:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replayable local price feed and continuous valuation.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    record = sub.add_parser('record', help='write synthetic ticks to a file')
+    record.add_argument('book', help='portfolio text file or .pfbook (its symbols are ticked)')
+    record.add_argument('output')
+    record.add_argument('--ticks', type=int, default=100000)
+    record.add_argument('--rate', type=float, default=None, help='ticks/second (default: no spacing)')
+    record.add_argument('--seed', type=int, default=0)
+
+    serve = sub.add_parser('serve', help='replay a tick file to TCP clients')
+    serve.add_argument('ticks')
+    serve.add_argument('--port', type=int, default=DEFAULT_FEED_PORT)
+    serve.add_argument('--speed', type=float, default=None)
+
+    run = sub.add_parser('run', help='value a book continuously from a tick file or socket')
+    run.add_argument('book', help='portfolio text file or .pfbook')
+    run.add_argument('--file', help='tick file to replay')
+    run.add_argument('--port', type=int, default=DEFAULT_FEED_PORT, help='tick socket (if no --file)')
+    run.add_argument('--speed', type=float, default=None)
+    run.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        store = load_store(args.book)
+        # Timestamps are always real when recording with a rate, synthetic otherwise
+        source = SyntheticTickSource(store.symbols.symbols, args.ticks, args.rate, seed=args.seed)
+        count = asyncio.run(record_ticks(source, args.output))
+        print(f"Recorded {count} ticks to '{args.output}'.")
+
+    elif args.command == 'serve':
+        async def serve_forever():
+            server = await serve_tick_file(args.ticks, port=args.port, speed=args.speed)
+            print(f"Serving '{args.ticks}' on 127.0.0.1:{args.port}")
+            async with server:
+                await server.serve_forever()
+        asyncio.run(serve_forever())
+
+    else:
+        store = load_store(args.book)
+        source = FileTickSource(args.file, args.speed) if args.file else SocketTickSource(port=args.port)
+        valuator = FeedValuator(store, max_batch=args.max_batch)
+        print_stats(asyncio.run(valuator.run(source)))
+
+if __name__ == '__main__':
+    main()
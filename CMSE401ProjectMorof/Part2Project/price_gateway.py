@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import time
+
+from aiohttp import web
+from batch_planner import MAX_SYMBOLS_PER_REQUEST, plan_batches, symbol_union, value_portfolios
+from price_client import POOL_LIMIT_PER_HOST, PriceClient, cached_prices, found_prices, parse_prices
+from quote_cache import DEFAULT_CACHE_FILE, DEFAULT_TTL, QuoteCache
+from rate_limit import FetchController, TokenBucket
+from resilience import Resilience
+
+DEFAULT_GATEWAY_PORT = 8090
+# How long a cache miss waits for other callers' misses to join its upstream batch
+DEFAULT_BATCH_WINDOW = 0.005
+# How long a symbol upstream had no price for is answered 0.0 without asking again
+DEFAULT_MISS_TTL = 30.0
+# Expired misses are only swept once this many are remembered
+MAX_REMEMBERED_MISSES = 10_000
+# Largest POST body accepted (a few thousand portfolios)
+MAX_BODY_BYTES = 8 * 1024 * 1024
+# Large enough that a burst of clients queues in the kernel instead of being refused
+LISTEN_BACKLOG = 1024
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def parse_portfolio(holdings):
+    # {'BTC': 1.5, ...} -> {'BTC': 1.5} with upper-case symbols and float amounts
+    if not isinstance(holdings, dict):
+        raise BadRequest('holdings must be an object of {"SYMBOL": amount}')
+    portfolio = {}
+    for symbol, amount in holdings.items():
+        if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+            raise BadRequest(f'amount for {symbol!r} must be a number')
+        portfolio[symbol.upper()] = portfolio.get(symbol.upper(), 0.0) + float(amount)
+    return portfolio
+
+
+def parse_value_request(body):
+    # {'holdings': {...}} values one book; {'portfolios': [{...}, ...]} values many
+    # against one price table. Returns (portfolios, whether it was a single book).
+    if not isinstance(body, dict) or ('holdings' in body) == ('portfolios' in body):
+        raise BadRequest('body must have either "holdings" or "portfolios"')
+    if 'holdings' in body:
+        return [parse_portfolio(body['holdings'])], True
+    if not isinstance(body['portfolios'], list):
+        raise BadRequest('"portfolios" must be a list of holdings objects')
+    return [parse_portfolio(holdings) for holdings in body['portfolios']], False
+
+
+class PriceGateway:
+    # A long-running local service in front of CoinMarketCap: every caller
+    # shares one PriceClient, so one quote cache, one keep-alive pool and one
+    # single-flight table. Cache misses from concurrent requests are held for
+    # `batch_window` seconds and go upstream together, batched by
+    # batch_planner, so overlapping books from many clients cost one fan-out
+    # instead of one per client.
+
+    def __init__(self, client, registry=None, batch_window=DEFAULT_BATCH_WINDOW, miss_ttl=DEFAULT_MISS_TTL):
+        self.client = client
+        self.registry = registry
+        self.batch_window = batch_window
+        self.miss_ttl = miss_ttl
+        # symbol -> time.monotonic() until which it is known to have no price
+        self.unpriced = {}
+        self.pending = {}
+        self.flush_handle = None
+        self.fetches = set()
+        self.started = time.time()
+        self.served = {'value': 0, 'quotes': 0}
+        self.bad_requests = 0
+        self.batches = 0
+        self.symbols_requested = 0
+        self.symbols_missed = 0
+        self.misses_skipped = 0
+
+    # --- Shared price lookups ---
+    async def prices(self, symbols):
+        prices, missing = cached_prices(self.client.cache, symbols)
+        self.symbols_requested += len(symbols)
+        if missing and self.unpriced:
+            missing = self.skip_unpriced(missing, prices)
+        self.symbols_missed += len(missing)
+        if not missing:
+            return prices
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for symbol in missing:
+            future = self.pending.get(symbol)
+            if future is None:
+                future = self.pending[symbol] = loop.create_future()
+            futures.append(future)
+        if len(self.pending) >= MAX_SYMBOLS_PER_REQUEST:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.batch_window, self.flush)
+
+        # Shielded: a client that disconnects must not cancel a price others wait on
+        results = await asyncio.gather(*(asyncio.shield(future) for future in futures))
+        prices.update(zip(missing, results))
+        return prices
+
+    def skip_unpriced(self, missing, prices):
+        # Symbols that came back without a price a moment ago are 0.0 until
+        # miss_ttl runs out, instead of going upstream on every request
+        now = time.monotonic()
+        still_missing = []
+        for symbol in missing:
+            if self.unpriced.get(symbol, 0.0) > now:
+                prices[symbol] = 0.0
+                self.misses_skipped += 1
+            else:
+                still_missing.append(symbol)
+        return still_missing
+
+    def remember_unpriced(self, symbols):
+        if not self.miss_ttl:
+            return
+        now = time.monotonic()
+        if len(self.unpriced) >= MAX_REMEMBERED_MISSES:
+            self.unpriced = {symbol: until for symbol, until in self.unpriced.items() if until > now}
+        self.unpriced.update(dict.fromkeys(symbols, now + self.miss_ttl))
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        pending, self.pending = self.pending, {}
+        if pending:
+            self.batches += 1
+            task = asyncio.ensure_future(self._fetch(pending))
+            self.fetches.add(task)
+            task.add_done_callback(self.fetches.discard)
+
+    async def _fetch_quotes(self, symbols):
+        # Like PriceClient._fetch_uncached, but only a response that came back
+        # with data and left a symbol out marks it unpriced; a request that
+        # failed after retries is priced 0.0 this time and asked again next time
+        data = await self.client.fetch_quotes(symbols)
+        if isinstance(data, dict) and data.get('data') is not None:
+            found = found_prices(data)
+            self.remember_unpriced(symbol for symbol in symbols if symbol not in found)
+        return parse_prices(data, symbols)
+
+    async def _fetch(self, pending):
+        # The pending symbols already missed the cache in prices(), so they go
+        # straight to the batches without a second lookup
+        try:
+            batches = plan_batches(list(pending), self.client.url)
+            results = await asyncio.gather(*(self.client.flights.do_many(batch, self._fetch_quotes)
+                                             for batch in batches))
+        except Exception as error:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(error)
+                    # Retrieved here so a future whose callers all left does not log a warning
+                    future.exception()
+            return
+        prices = {symbol: price for result in results for symbol, price in result.items()}
+        for symbol, future in pending.items():
+            if not future.done():
+                future.set_result(prices.get(symbol, 0.0))
+
+    async def priced(self, symbols):
+        # (prices, unknown symbols); unknown ones are priced 0.0 without a request
+        unknown = []
+        if self.registry is not None:
+            symbols, unknown = self.registry.validate(symbols)
+        prices = await self.prices(symbols)
+        prices.update(dict.fromkeys(unknown, 0.0))
+        return prices, unknown
+
+    # --- HTTP handlers ---
+    def bad_request(self, message):
+        self.bad_requests += 1
+        return web.json_response({'error': message}, status=400)
+
+    async def handle_value(self, request):
+        try:
+            portfolios, single = parse_value_request(await request.json())
+        except BadRequest as error:
+            return self.bad_request(str(error))
+        except ValueError:
+            return self.bad_request('body must be JSON')
+
+        self.served['value'] += 1
+        prices, unknown = await self.priced(symbol_union(portfolios))
+        totals = value_portfolios(portfolios, prices)
+        if single:
+            return web.json_response({
+                'total': totals[0],
+                'prices': {symbol: prices[symbol] for symbol in portfolios[0]},
+                'unknown': unknown,
+            })
+        return web.json_response({'totals': totals, 'prices': prices, 'unknown': unknown})
+
+    async def handle_quotes(self, request):
+        raw = request.query.get('symbol', '')
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in raw.split(',') if symbol.strip()))
+        if not symbols:
+            return self.bad_request('"symbol" is required, e.g. /quotes?symbol=BTC,ETH')
+        self.served['quotes'] += 1
+        prices, unknown = await self.priced(symbols)
+        return web.json_response({'prices': prices, 'unknown': unknown})
+
+    async def handle_health(self, request):
+        return web.json_response({'status': 'ok'})
+
+    async def handle_stats(self, request):
+        return web.json_response(self.stats())
+
+    def stats(self):
+        requested = self.symbols_requested
+        stats = {
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'served': dict(self.served),
+            'bad_requests': self.bad_requests,
+            'symbol_hit_rate': 1.0 - self.symbols_missed / requested if requested else 0.0,
+            'upstream_batches': self.batches,
+            'unpriced_skipped': self.misses_skipped,
+            'upstream_requests': self.client.request_count,
+            'single_flight': self.client.flights.stats(),
+        }
+        if self.client.cache is not None:
+            stats['cache'] = self.client.cache.stats()
+        if self.client.resilience is not None:
+            stats['resilience'] = self.client.resilience.stats()
+        if self.client.controller is not None:
+            stats['controller'] = self.client.controller.stats()
+        return stats
+
+    # --- Lifecycle ---
+    async def on_startup(self, app):
+        await self.client.open()
+
+    async def on_cleanup(self, app):
+        self.flush()
+        if self.fetches:
+            await asyncio.gather(*self.fetches, return_exceptions=True)
+        await self.client.close()
+
+    def make_app(self):
+        app = web.Application(client_max_size=MAX_BODY_BYTES)
+        app.router.add_post('/value', self.handle_value)
+        app.router.add_get('/quotes', self.handle_quotes)
+        app.router.add_get('/stats', self.handle_stats)
+        app.router.add_get('/health', self.handle_health)
+        app.on_startup.append(self.on_startup)
+        app.on_cleanup.append(self.on_cleanup)
+        return app
+
+
+def build_gateway(base_url=None, ttl=DEFAULT_TTL, cache_path=DEFAULT_CACHE_FILE, pool_size=POOL_LIMIT_PER_HOST,
+                  rate_limit=None, batch_window=DEFAULT_BATCH_WINDOW, validate=False, miss_ttl=DEFAULT_MISS_TTL):
+    controller = FetchController(TokenBucket.per_minute(rate_limit)) if rate_limit else None
+    client = PriceClient(base_url=base_url, limit_per_host=pool_size, cache=QuoteCache(ttl=ttl, path=cache_path),
+                         controller=controller, resilience=Resilience())
+    registry = None
+    if validate:
+        from symbol_registry import DEFAULT_REGISTRY_FILE, SymbolRegistry
+        registry = SymbolRegistry(DEFAULT_REGISTRY_FILE if cache_path else None, base_url=base_url).ensure()
+    return PriceGateway(client, registry, batch_window, miss_ttl)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Local price gateway: many clients, one shared upstream fan-out.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_GATEWAY_PORT)
+    parser.add_argument('--ttl', type=float, default=DEFAULT_TTL, help='seconds a quote is served from cache')
+    parser.add_argument('--batch-window', type=float, default=DEFAULT_BATCH_WINDOW,
+                        help='seconds cache misses wait to share an upstream batch')
+    parser.add_argument('--pool-size', type=int, default=POOL_LIMIT_PER_HOST,
+                        help='upstream keep-alive connections')
+    parser.add_argument('--rate-limit', type=int, default=None, help='upstream requests per minute (API plan)')
+    parser.add_argument('--miss-ttl', type=float, default=DEFAULT_MISS_TTL,
+                        help='seconds a symbol upstream had no price for is answered 0.0 locally (0 disables)')
+    parser.add_argument('--validate', action='store_true',
+                        help='check symbols against the cached CMC map and never send unknown ones upstream')
+    parser.add_argument('--no-cache-file', action='store_true', help='do not load or save quote_cache.json')
+    parser.add_argument('--mock', action='store_true', help='use a local mock server as the upstream')
+    parser.add_argument('--mock-latency', type=float, default=0.05, help='median mock latency (seconds)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    load_dotenv()
+    args = parse_args(argv)
+
+    server = None
+    base_url = None
+    if args.mock:
+        from mock_cmc_server import MockConfig, MockServerThread
+        server = MockServerThread(MockConfig(latency_dist='lognormal', latency_mean=args.mock_latency,
+                                             latency_jitter=0.3)).start()
+        base_url = server.base_url
+    # Mock prices never go into the real quote cache
+    cache_path = None if args.mock or args.no_cache_file else DEFAULT_CACHE_FILE
+
+    try:
+        gateway = build_gateway(base_url, args.ttl, cache_path, args.pool_size, args.rate_limit, args.batch_window,
+                                args.validate, args.miss_ttl)
+        print(f"Price gateway on http://{args.host}:{args.port} -> {gateway.client.url}")
+        print("  POST /value  {\"holdings\": {\"BTC\": 0.5}} or {\"portfolios\": [...]}")
+        print("  GET  /quotes?symbol=BTC,ETH   GET /stats   GET /health")
+        web.run_app(gateway.make_app(), host=args.host, port=args.port, access_log=None,
+                    backlog=LISTEN_BACKLOG, print=None)
+    finally:
+        if server is not None:
+            server.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+# A store is a directory:
+#   meta.json      symbols (column order), symbol capacity, format version
+#   timestamps.f8  float64 unix timestamps, one per snapshot, strictly increasing
+#   prices.f8      float64 rows of `capacity` prices, one row per snapshot (NaN = no quote)
+# Both data files are append-only; a snapshot is committed once its timestamp is written.
+VERSION = 1
+META_FILE = 'meta.json'
+TIMESTAMPS_FILE = 'timestamps.f8'
+PRICES_FILE = 'prices.f8'
+DTYPE = np.dtype('<f8')
+# Synthetic data: typical crypto annualized volatility, scaled to the snapshot step
+SYNTHETIC_ANNUAL_VOLATILITY = 0.8
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+class PriceHistory:
+    # Memory-mapped (time x symbol) float64 price history with O(log n)
+    # time-range lookup by binary search on the timestamp column.
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            meta = json.load(f)
+        if meta.get('version') != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} price history")
+        self.symbols = meta['symbols']
+        self.capacity = meta['capacity']
+        self.columns = {symbol: column for column, symbol in enumerate(self.symbols)}
+        self.refresh()
+
+    @classmethod
+    def create(cls, path, symbols, capacity=None):
+        # capacity > len(symbols) leaves room to add symbols later without a rewrite
+        symbols = [symbol.upper() for symbol in symbols]
+        capacity = max(capacity or 0, len(symbols))
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, META_FILE)):
+            raise FileExistsError(f"{path} already holds a price history")
+        for name in (TIMESTAMPS_FILE, PRICES_FILE):
+            open(os.path.join(path, name), 'wb').close()
+        cls._write_meta(path, symbols, capacity)
+        return cls(path)
+
+    @staticmethod
+    def _write_meta(path, symbols, capacity):
+        tmp_path = os.path.join(path, META_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': VERSION, 'symbols': symbols, 'capacity': capacity}, f)
+        os.replace(tmp_path, os.path.join(path, META_FILE))
+
+    def refresh(self):
+        # (Re)map the committed snapshots; call after another process appends
+        timestamps_path = os.path.join(self.path, TIMESTAMPS_FILE)
+        prices_path = os.path.join(self.path, PRICES_FILE)
+        row_bytes = self.capacity * DTYPE.itemsize
+        rows = min(os.path.getsize(timestamps_path) // DTYPE.itemsize,
+                   os.path.getsize(prices_path) // row_bytes if row_bytes else 0)
+        self.length = rows
+        if rows:
+            self.timestamps = np.memmap(timestamps_path, dtype=DTYPE, mode='r', shape=(rows,))
+            self.prices = np.memmap(prices_path, dtype=DTYPE, mode='r', shape=(rows, self.capacity))
+        else:
+            self.timestamps = np.zeros(0, dtype=DTYPE)
+            self.prices = np.zeros((0, self.capacity), dtype=DTYPE)
+
+    def __len__(self):
+        return self.length
+
+    # --- Ingestion ---
+    def add_symbols(self, symbols):
+        new = [s.upper() for s in symbols if s.upper() not in self.columns]
+        if not new:
+            return
+        if len(self.symbols) + len(new) > self.capacity:
+            raise ValueError(f"symbol capacity {self.capacity} exceeded; create a store with more room")
+        self.symbols.extend(new)
+        self.columns.update({symbol: len(self.columns) + i for i, symbol in enumerate(new)})
+        self._write_meta(self.path, self.symbols, self.capacity)
+
+    def append_rows(self, timestamps, rows):
+        # rows: (n, capacity) float64 matrix aligned to columns, NaN where missing
+        timestamps = np.asarray(timestamps, dtype=DTYPE).reshape(-1)
+        rows = np.asarray(rows, dtype=DTYPE).reshape(len(timestamps), self.capacity)
+        if len(timestamps) == 0:
+            return
+        last = self.timestamps[-1] if self.length else -math.inf
+        if timestamps[0] <= last or np.any(np.diff(timestamps) <= 0):
+            raise ValueError("snapshots must be appended in strictly increasing time order")
+
+        # Prices first, timestamps last: a crash in between leaves an
+        # uncommitted tail that refresh() ignores and the next append overwrites
+        row_bytes = self.capacity * DTYPE.itemsize
+        with open(os.path.join(self.path, PRICES_FILE), 'r+b') as f:
+            f.seek(self.length * row_bytes)
+            f.write(rows.tobytes())
+            f.truncate()
+        with open(os.path.join(self.path, TIMESTAMPS_FILE), 'r+b') as f:
+            f.seek(self.length * DTYPE.itemsize)
+            f.write(timestamps.tobytes())
+            f.truncate()
+        self.refresh()
+
+    def append(self, timestamp, prices):
+        # One snapshot from a {symbol: price} dict; unseen symbols take free columns
+        self.add_symbols(prices)
+        row = np.full(self.capacity, np.nan, dtype=DTYPE)
+        for symbol, price in prices.items():
+            if price:
+                row[self.columns[symbol.upper()]] = price
+        self.append_rows([timestamp], row[None, :])
+
+    # --- Queries ---
+    def index_range(self, start=None, end=None):
+        # Row slice for start <= t < end via binary search on the timestamps
+        low = 0 if start is None else int(np.searchsorted(self.timestamps, start, side='left'))
+        high = self.length if end is None else int(np.searchsorted(self.timestamps, end, side='left'))
+        return low, high
+
+    def window(self, start=None, end=None, symbols=None):
+        # Returns (timestamps, prices) with prices shaped (time, symbol); views, not copies,
+        # unless a symbol subset is requested
+        low, high = self.index_range(start, end)
+        prices = self.prices[low:high, :len(self.symbols)]
+        if symbols is not None:
+            prices = prices[:, [self.columns[symbol] for symbol in symbols]]
+        return self.timestamps[low:high], prices
+
+    def at(self, timestamp):
+        # Latest snapshot at or before `timestamp` as {symbol: price}
+        row = int(np.searchsorted(self.timestamps, timestamp, side='right')) - 1
+        if row < 0:
+            return {}
+        values = self.prices[row]
+        return {symbol: float(values[c]) for symbol, c in self.columns.items() if not np.isnan(values[c])}
+
+
+# --- Data sources ---
+def synthetic_history(symbols, start, step, count, seed=0, volatility=0.02, start_prices=None):
+    # Seeded geometric random walk; `volatility` is per step. Returns (timestamps, (count, n) prices)
+    rng = np.random.default_rng(seed)
+    if start_prices is None:
+        start_prices = 10 ** rng.uniform(-4, 4, size=len(symbols))
+    shocks = rng.normal(-0.5 * volatility ** 2, volatility, size=(count, len(symbols)))
+    prices = np.asarray(start_prices) * np.exp(np.cumsum(shocks, axis=0))
+    timestamps = start + step * np.arange(count, dtype=np.float64)
+    return timestamps, prices
+
+
+def ingest_synthetic(history, start, step, count, seed=0, chunk=10000):
+    n = len(history.symbols)
+    volatility = SYNTHETIC_ANNUAL_VOLATILITY * math.sqrt(step / SECONDS_PER_YEAR)
+    rng_seed = seed
+    last_prices = None
+    for offset in range(0, count, chunk):
+        rows = min(chunk, count - offset)
+        timestamps, prices = synthetic_history(history.symbols, start + offset * step, step, rows,
+                                               seed=rng_seed, volatility=volatility,
+                                               start_prices=last_prices)
+        padded = np.full((rows, history.capacity), np.nan)
+        padded[:, :n] = prices
+        history.append_rows(timestamps, padded)
+        last_prices = prices[-1]
+        rng_seed += 1
+
+
+def ingest_tick_file(history, path, interval):
+    # Recorded source: replays a price_feed tick file into one snapshot per
+    # `interval` seconds, carrying each symbol's last price forward
+    from price_feed import parse_tick
+
+    latest = {}
+    bucket_end = None
+    count = 0
+    with open(path, 'r') as f:
+        for line in f:
+            tick = parse_tick(line)
+            if tick is None:
+                continue
+            if bucket_end is None:
+                bucket_end = (tick.timestamp // interval + 1) * interval
+            while tick.timestamp >= bucket_end:
+                if latest and (not len(history) or history.timestamps[-1] < bucket_end):
+                    history.append(bucket_end, latest)
+                    count += 1
+                bucket_end += interval
+            latest[tick.symbol] = tick.price
+    if latest and bucket_end is not None and (not len(history) or history.timestamps[-1] < bucket_end):
+        history.append(bucket_end, latest)
+        count += 1
+    return count
+
+
+async def snapshot(history, client):
+    # One snapshot of every tracked symbol through the existing batched fetcher
+    from batch_planner import fetch_batched_prices
+
+    prices = await fetch_batched_prices(client, [dict.fromkeys(history.symbols)])
+    history.append(time.time(), prices)
+    return prices
+
+
+async def ingest_live(history, client, interval, count):
+    for i in range(count):
+        started = time.perf_counter()
+        await snapshot(history, client)
+        print(f"Snapshot {i + 1}/{count} appended ({len(history)} total).")
+        if i < count - 1:
+            await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local memory-mapped price history store.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    create = sub.add_parser('create', help='create a store tracking the symbols in a portfolio file')
+    create.add_argument('store')
+    create.add_argument('book', help='portfolio text file or .pfbook')
+    create.add_argument('--capacity', type=int, default=None, help='symbol slots to reserve')
+
+    synth = sub.add_parser('synthetic', help='append seeded synthetic snapshots')
+    synth.add_argument('store')
+    synth.add_argument('--count', type=int, default=90 * 24 * 60, help='snapshots (default: 90 days of minutes)')
+    synth.add_argument('--step', type=float, default=60.0, help='seconds between snapshots')
+    synth.add_argument('--seed', type=int, default=0)
+
+    replay = sub.add_parser('replay', help='append snapshots from a recorded price_feed tick file')
+    replay.add_argument('store')
+    replay.add_argument('ticks')
+    replay.add_argument('--interval', type=float, default=60.0, help='seconds per snapshot')
+
+    ingest = sub.add_parser('ingest', help='append live snapshots from the quotes API (or CMC_BASE_URL)')
+    ingest.add_argument('store')
+    ingest.add_argument('--interval', type=float, default=60.0)
+    ingest.add_argument('--count', type=int, default=1)
+
+    info = sub.add_parser('info', help='describe a store')
+    info.add_argument('store')
+    args = parser.parse_args()
+
+    if args.command == 'create':
+        from portfolio_store import load_book, read_book
+        book = load_book(args.book) if args.book.endswith('.pfbook') else read_book(args.book)
+        history = PriceHistory.create(args.store, book.symbols.symbols, args.capacity)
+        print(f"Created '{args.store}' tracking {len(history.symbols)} symbols (capacity {history.capacity}).")
+
+    elif args.command == 'synthetic':
+        history = PriceHistory(args.store)
+        start = history.timestamps[-1] + args.step if len(history) else time.time() - args.count * args.step
+        started = time.perf_counter()
+        ingest_synthetic(history, start, args.step, args.count, args.seed)
+        print(f"Appended {args.count} snapshots in {time.perf_counter() - started:.2f} s ({len(history)} total).")
+
+    elif args.command == 'replay':
+        history = PriceHistory(args.store)
+        count = ingest_tick_file(history, args.ticks, args.interval)
+        print(f"Appended {count} snapshots from '{args.ticks}' ({len(history)} total).")
+
+    elif args.command == 'ingest':
+        from dotenv import load_dotenv
+        from price_client import PriceClient
+
+        load_dotenv()
+        history = PriceHistory(args.store)
+
+        async def run():
+            async with PriceClient() as client:
+                await ingest_live(history, client, args.interval, args.count)
+        asyncio.run(run())
+
+    else:
+        history = PriceHistory(args.store)
+        print(f"{len(history)} snapshots x {len(history.symbols)} symbols (capacity {history.capacity})")
+        if len(history):
+            first, last = history.timestamps[0], history.timestamps[-1]
+            print(f"From {time.strftime('%Y-%m-%d %H:%M', time.gmtime(first))} "
+                  f"to {time.strftime('%Y-%m-%d %H:%M', time.gmtime(last))} UTC")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+# Cache defaults
+DEFAULT_TTL = 60.0
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_CACHE_FILE = 'quote_cache.json'
+
+
+class QuoteCache:
+    # Symbol -> (price, fetched_at) with a freshness TTL and LRU eviction.
+    # Timestamps are wall-clock so a saved cache is still valid after a restart.
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, path=None, clock=time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, symbol):
+        return self.get(symbol, count=False) is not None
+
+    def is_fresh(self, fetched_at, now=None):
+        if now is None:
+            now = self.clock()
+        return now - fetched_at <= self.ttl
+
+    def get(self, symbol, count=True):
+        entry = self.entries.get(symbol)
+        if entry is not None and not self.is_fresh(entry[1]):
+            del self.entries[symbol]
+            self.expirations += 1
+            entry = None
+
+        if entry is None:
+            if count:
+                self.misses += 1
+            return None
+
+        self.entries.move_to_end(symbol)
+        if count:
+            self.hits += 1
+        return entry[0]
+
+    def get_many(self, symbols):
+        # Returns (cached prices, symbols that still need fetching)
+        found = {}
+        missing = []
+        for symbol in symbols:
+            price = self.get(symbol)
+            if price is None:
+                missing.append(symbol)
+            else:
+                found[symbol] = price
+        return found, missing
+
+    def put(self, symbol, price, fetched_at=None):
+        if fetched_at is None:
+            fetched_at = self.clock()
+        self.entries[symbol] = (price, fetched_at)
+        self.entries.move_to_end(symbol)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def put_many(self, prices, fetched_at=None):
+        for symbol, price in prices.items():
+            self.put(symbol, price, fetched_at)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def save(self, path=None):
+        path = path or self.path
+        if path is None:
+            return
+        now = self.clock()
+        fresh = {symbol: [price, fetched_at] for symbol, (price, fetched_at) in self.entries.items()
+                 if self.is_fresh(fetched_at, now)}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(fresh, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        path = path or self.path
+        try:
+            with open(path, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            print(f"Could not read quote cache {path}. Starting cold.")
+            return 0
+
+        now = self.clock()
+        loaded = 0
+        for symbol, (price, fetched_at) in sorted(saved.items(), key=lambda item: item[1][1]):
+            if self.is_fresh(fetched_at, now):
+                self.put(symbol, price, fetched_at)
+                loaded += 1
+        return loaded
@@ -0,0 +1,143 @@
+import json
+import re
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DECODERS = ('auto', 'json', 'orjson', 'lean')
+
+# Lean extraction patterns. Everything the fetchers read is
+# data[SYMBOL].quote.USD.{price,last_updated}; the USD object is flat.
+_QUOTE_USD = re.compile(rb'"quote"\s*:\s*\{\s*"USD"\s*:\s*\{([^{}]*)\}')
+_PRICE = re.compile(rb'"price"\s*:\s*(null|-?[0-9][0-9.eE+-]*)')
+_LAST_UPDATED = re.compile(rb'"last_updated"\s*:\s*"([^"]*)"')
+_DATA = re.compile(rb'"data"\s*:\s*\{')
+_OBJECT_KEY = re.compile(rb'"([^"\\]+)"\s*:\s*\{')
+# After one entry's USD quote: close quote and entry, then the next entry's key
+_NEXT_ENTRY = re.compile(rb'\s*\}\s*\}\s*,\s*"([^"\\]+)"\s*:\s*\{')
+
+
+class DecodeStats:
+    # Shared by every worker of a ThreadedPriceClient, hence the lock
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.responses = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.network_seconds = 0.0
+        self.fallbacks = 0
+
+    def record(self, size, seconds):
+        with self.lock:
+            self.responses += 1
+            self.bytes += size
+            self.seconds += seconds
+
+    def record_network(self, seconds):
+        # Request sent -> body fully read, as measured by the client
+        with self.lock:
+            self.network_seconds += seconds
+
+    def as_dict(self):
+        return {
+            'responses': self.responses,
+            'bytes': self.bytes,
+            'decode_seconds': round(self.seconds, 6),
+            'network_seconds': round(self.network_seconds, 6),
+            'mean_bytes': self.bytes / self.responses if self.responses else 0.0,
+            'mean_decode_us': self.seconds / self.responses * 1e6 if self.responses else 0.0,
+            'fallbacks': self.fallbacks,
+        }
+
+
+class JsonDecoder:
+    # Full decode of the payload with the standard library or orjson
+
+    def __init__(self, backend='auto'):
+        if backend == 'auto':
+            backend = 'orjson' if orjson is not None else 'json'
+        if backend == 'orjson' and orjson is None:
+            raise ValueError("orjson is not installed (pip install orjson)")
+        self.name = backend
+        self.loads = orjson.loads if backend == 'orjson' else json.loads
+        self.stats = DecodeStats()
+
+    def decode(self, body, symbols=None):
+        start = time.perf_counter()
+        data = self.loads(body)
+        self.stats.record(len(body), time.perf_counter() - start)
+        return data
+
+
+class LeanQuoteDecoder:
+    # Pulls only price and last_updated per requested symbol straight out of
+    # the raw bytes, skipping tags, platform, supply and the rest of each
+    # entry. The result is a minimal payload of the same shape
+    # ({'data': {SYM: {'quote': {'USD': {...}}}}}), so parse_prices and the
+    # caches work unchanged. Anything unexpected (an error body, a symbol it
+    # cannot locate) falls back to a full decode of that response.
+
+    name = 'lean'
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback or JsonDecoder()
+        self.stats = DecodeStats()
+
+    def extract(self, body, symbols):
+        data_start = _DATA.search(body)
+        # A symbol named like a quote key would be ambiguous; decode those fully
+        if data_start is None or 'USD' in symbols:
+            return None
+        wanted = set(symbols)
+        data = {}
+        # One forward pass: find the next object-valued key; if it is a
+        # requested symbol, read its USD quote and resume after it
+        position = data_start.end()
+        while len(data) < len(wanted):
+            # Entries are usually back to back: try the next one in place first
+            key = _NEXT_ENTRY.match(body, position) if data else None
+            if key is None:
+                key = _OBJECT_KEY.search(body, position)
+            if key is None:
+                # skip_invalid drops unknown symbols; a missing key is not an error
+                break
+            symbol = key.group(1).decode()
+            if symbol not in wanted:
+                position = key.end()
+                continue
+            quote_start = body.find(b'"quote"', key.end())
+            quote = _QUOTE_USD.match(body, quote_start) if quote_start >= 0 else None
+            if quote is None:
+                return None
+            fields = quote.group(1)
+            price = _PRICE.search(fields)
+            if price is None:
+                return None
+            updated = _LAST_UPDATED.search(fields)
+            data[symbol] = {'quote': {'USD': {
+                'price': None if price.group(1) == b'null' else float(price.group(1)),
+                'last_updated': updated.group(1).decode() if updated else None,
+            }}}
+            position = quote.end()
+        return {'data': data}
+
+    def decode(self, body, symbols=None):
+        start = time.perf_counter()
+        data = self.extract(body, symbols) if symbols else None
+        if data is None:
+            with self.stats.lock:
+                self.stats.fallbacks += 1
+            data = self.fallback.loads(body)
+        self.stats.record(len(body), time.perf_counter() - start)
+        return data
+
+
+def make_decoder(name='auto'):
+    if name == 'lean':
+        return LeanQuoteDecoder()
+    return JsonDecoder(name)
@@ -0,0 +1,136 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+# CoinMarketCap Basic plan: 30 requests per minute
+PLAN_REQUESTS_PER_MINUTE = 30
+
+# Adaptive window defaults
+INITIAL_CONCURRENCY = 4
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 64
+LATENCY_TARGET = 1.0
+BACKOFF_FACTOR = 0.5
+
+
+class TokenBucket:
+    # Refills at `rate` tokens per second up to `capacity`. Waiters are served
+    # in arrival order so a burst cannot starve earlier callers.
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.lock = asyncio.Lock()
+        self.waited = 0.0
+
+    @classmethod
+    def per_minute(cls, requests_per_minute=PLAN_REQUESTS_PER_MINUTE, burst=None):
+        return cls(requests_per_minute / 60.0, burst if burst is not None else requests_per_minute)
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens=1):
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                delay = (tokens - self.tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+
+
+class AdaptiveLimiter:
+    # AIMD in-flight window: grows by 1/window per fast response (about +1 per
+    # round trip) and is cut by BACKOFF_FACTOR on a 429 or a slow response.
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, min_limit=MIN_CONCURRENCY, max_limit=MAX_CONCURRENCY,
+                 latency_target=LATENCY_TARGET, backoff=BACKOFF_FACTOR, clock=time.monotonic):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.clock = clock
+        self.inflight = 0
+        self.condition = asyncio.Condition()
+        self.last_decrease = None
+        self.increases = 0
+        self.decreases = 0
+        self.peak_inflight = 0
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.inflight < int(self.limit))
+            self.inflight += 1
+            self.peak_inflight = max(self.peak_inflight, self.inflight)
+
+    async def release(self, latency=None, throttled=False):
+        async with self.condition:
+            self.inflight -= 1
+            self.adjust(latency, throttled)
+            self.condition.notify_all()
+
+    def adjust(self, latency=None, throttled=False):
+        slow = latency is not None and latency > self.latency_target
+        if throttled or slow:
+            now = self.clock()
+            # One cut per congestion event, not one per response in the burst
+            if self.last_decrease is None or now - self.last_decrease >= self.latency_target:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self.last_decrease = now
+                self.decreases += 1
+        elif latency is not None:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.increases += 1
+
+
+class Slot:
+    def __init__(self):
+        self.throttled = False
+
+
+class FetchController:
+    # Gate for every async request: an adaptive in-flight window plus a
+    # token bucket that matches the API plan's request rate.
+
+    def __init__(self, bucket=None, limiter=None):
+        self.bucket = bucket if bucket is not None else TokenBucket.per_minute()
+        self.limiter = limiter if limiter is not None else AdaptiveLimiter()
+        self.throttled = 0
+        self.requests = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.limiter.acquire()
+        slot = Slot()
+        latency = None
+        try:
+            await self.bucket.acquire()
+            start = time.perf_counter()
+            yield slot
+            latency = time.perf_counter() - start
+        finally:
+            # Failed requests release the slot without moving the window
+            self.requests += 1
+            if slot.throttled:
+                self.throttled += 1
+            await self.limiter.release(latency, slot.throttled)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'throttled': self.throttled,
+            'window': round(self.limiter.limit, 2),
+            'peak_inflight': self.limiter.peak_inflight,
+            'increases': self.limiter.increases,
+            'decreases': self.limiter.decreases,
+            'rate_wait_seconds': round(self.bucket.waited, 3),
+        }
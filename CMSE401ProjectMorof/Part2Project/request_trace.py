@@ -0,0 +1,262 @@
+import csv
+import json
+import statistics
+import threading
+import time
+
+import aiohttp
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Phases of one quote request, in the order they happen (seconds):
+#   queued   waiting for a free connection in the pool (aiohttp only)
+#   dns      host resolution (aiohttp only; folded into connect for requests)
+#   connect  TCP connect (aiohttp: plus the TLS handshake, which it does not report separately)
+#   tls      TLS handshake (requests only)
+#   ttfb     request sent -> response headers received
+#   body     headers -> body fully read
+#   decode   body -> Python objects (see quote_decoder.py)
+PHASES = ('queued', 'dns', 'connect', 'tls', 'ttfb', 'body', 'decode')
+FIELDS = ('label', 'client', 'status', 'symbols', 'bytes', 'reused') + PHASES + ('total',)
+TRACE_FILE = 'request_trace'
+
+# The requests path records connection phases from inside urllib3, on the
+# thread that is making the request
+_active = threading.local()
+
+
+class RequestTrace:
+    __slots__ = FIELDS + ('started', 'sent', 'headers', 'create_started', 'queue_started', 'dns_started')
+
+    def __init__(self, label, client, symbols):
+        self.label = label
+        self.client = client
+        self.symbols = symbols
+        self.status = None
+        self.bytes = 0
+        self.reused = True
+        self.queued = 0.0
+        self.dns = 0.0
+        self.connect = 0.0
+        self.tls = 0.0
+        self.ttfb = 0.0
+        self.body = 0.0
+        self.decode = 0.0
+        self.total = 0.0
+        self.started = self.sent = time.perf_counter()
+        self.headers = None
+        self.create_started = self.queue_started = self.dns_started = None
+
+    def response_started(self):
+        self.headers = time.perf_counter()
+        self.ttfb = self.headers - self.sent
+
+    def body_read(self, status, size):
+        self.status = status
+        self.bytes = size
+        self.body = time.perf_counter() - (self.headers or self.started)
+
+    def row(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+
+class PhaseTracer:
+    # Collects a RequestTrace per HTTP request from either price client.
+    # `label` tags new traces (benchmark_runner sets it to the mode being
+    # timed) so one run can be broken down mode by mode.
+
+    def __init__(self, label=None):
+        self.label = label
+        self.records = []
+        self.lock = threading.Lock()
+
+    def start(self, client, symbols):
+        trace = RequestTrace(self.label, client, len(symbols))
+        _active.trace = trace
+        return trace
+
+    def finish(self, trace, decode_seconds=0.0):
+        trace.decode = decode_seconds
+        trace.total = time.perf_counter() - trace.started
+        _active.trace = None
+        with self.lock:
+            self.records.append(trace)
+
+    def clear(self):
+        with self.lock:
+            self.records = []
+
+    # --- aiohttp: TraceConfig callbacks fill in the trace passed as trace_request_ctx ---
+    def trace_config(self):
+        config = aiohttp.TraceConfig()
+        config.on_connection_queued_start.append(_queued_start)
+        config.on_connection_queued_end.append(_queued_end)
+        config.on_connection_create_start.append(_create_start)
+        config.on_connection_create_end.append(_create_end)
+        config.on_dns_resolvehost_start.append(_dns_start)
+        config.on_dns_resolvehost_end.append(_dns_end)
+        config.on_request_headers_sent.append(_headers_sent)
+        config.on_request_end.append(_request_end)
+        return config
+
+    # --- Aggregation and export ---
+    def summary(self):
+        with self.lock:
+            records = list(self.records)
+        groups = {}
+        for trace in records:
+            groups.setdefault((trace.label, trace.client), []).append(trace)
+
+        summary = []
+        for (label, client), traces in groups.items():
+            entry = {
+                'label': label,
+                'client': client,
+                'requests': len(traces),
+                'reused_pct': 100.0 * sum(trace.reused for trace in traces) / len(traces),
+                'mean_bytes': statistics.fmean(trace.bytes for trace in traces),
+            }
+            for phase in PHASES + ('total',):
+                values = [getattr(trace, phase) for trace in traces]
+                entry[f'{phase}_mean'] = statistics.fmean(values)
+                entry[f'{phase}_median'] = statistics.median(values)
+                entry[f'{phase}_p95'] = statistics.quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+            summary.append(entry)
+        return summary
+
+    def save_csv(self, filename):
+        with self.lock:
+            rows = [trace.row() for trace in self.records]
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def save_json(self, filename, metadata=None):
+        with self.lock:
+            rows = [trace.row() for trace in self.records]
+        with open(filename, 'w') as f:
+            json.dump({'meta': metadata or {}, 'summary': self.summary(), 'requests': rows}, f, indent=2)
+
+    def save(self, prefix=TRACE_FILE, metadata=None):
+        self.save_csv(f'{prefix}.csv')
+        self.save_json(f'{prefix}.json', metadata)
+        return f'{prefix}.csv', f'{prefix}.json'
+
+
+def print_phase_summary(summary):
+    # Mean milliseconds per request in each phase
+    print(f"\n{'label':<10}{'client':<10}{'requests':>9}{'reused':>8}"
+          + ''.join(f'{phase:>9}' for phase in PHASES) + f"{'total':>9}   (mean ms)")
+    for s in summary:
+        print(f"{str(s['label']):<10}{s['client']:<10}{s['requests']:>9}{s['reused_pct']:>7.0f}%"
+              + ''.join(f"{s[f'{phase}_mean'] * 1e3:>9.2f}" for phase in PHASES)
+              + f"{s['total_mean'] * 1e3:>9.2f}")
+
+
+# aiohttp callbacks: (session, trace_config_ctx, params); untraced requests carry no trace
+def _trace(context):
+    return context.trace_request_ctx if isinstance(context.trace_request_ctx, RequestTrace) else None
+
+
+async def _queued_start(session, context, params):
+    trace = _trace(context)
+    if trace is not None:
+        trace.queue_started = time.perf_counter()
+
+
+async def _queued_end(session, context, params):
+    trace = _trace(context)
+    if trace is not None and trace.queue_started is not None:
+        trace.queued += time.perf_counter() - trace.queue_started
+
+
+async def _create_start(session, context, params):
+    trace = _trace(context)
+    if trace is not None:
+        trace.reused = False
+        trace.create_started = time.perf_counter()
+
+
+async def _create_end(session, context, params):
+    # Host resolution happens inside connection creation; report it on its own
+    trace = _trace(context)
+    if trace is not None and trace.create_started is not None:
+        trace.connect += time.perf_counter() - trace.create_started - trace.dns
+
+
+async def _dns_start(session, context, params):
+    trace = _trace(context)
+    if trace is not None:
+        trace.dns_started = time.perf_counter()
+
+
+async def _dns_end(session, context, params):
+    trace = _trace(context)
+    if trace is not None and trace.dns_started is not None:
+        trace.dns += time.perf_counter() - trace.dns_started
+
+
+async def _headers_sent(session, context, params):
+    trace = _trace(context)
+    if trace is not None:
+        trace.sent = time.perf_counter()
+
+
+async def _request_end(session, context, params):
+    trace = _trace(context)
+    if trace is not None:
+        trace.response_started()
+
+
+# urllib3 connections: _new_conn is DNS + TCP connect, the rest of connect() is
+# TLS. The request goes out once the connection is up, so that is where ttfb starts.
+def _record_connect(elapsed):
+    trace = getattr(_active, 'trace', None)
+    if trace is not None:
+        trace.reused = False
+        trace.connect += elapsed
+        trace.sent = time.perf_counter()
+
+
+class TracedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        _record_connect(time.perf_counter() - start)
+        return sock
+
+
+class TracedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        _record_connect(time.perf_counter() - start)
+        return sock
+
+    def connect(self):
+        trace = getattr(_active, 'trace', None)
+        before = trace.connect if trace is not None else 0.0
+        start = time.perf_counter()
+        super().connect()
+        if trace is not None:
+            trace.sent = time.perf_counter()
+            trace.tls += trace.sent - start - (trace.connect - before)
+
+
+class TracedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TracedHTTPConnection
+
+
+class TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TracedHTTPSConnection
+
+
+class TracingHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TracedHTTPConnectionPool,
+            'https': TracedHTTPSConnectionPool,
+        }
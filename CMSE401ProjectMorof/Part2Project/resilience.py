@@ -0,0 +1,174 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+import aiohttp
+import requests
+
+# Retry defaults
+MAX_ATTEMPTS = 3
+BASE_DELAY = 0.25
+MAX_DELAY = 4.0
+
+# Hedging defaults
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.05
+LATENCY_WINDOW = 500
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class RetryableResponse(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(headers):
+    value = headers.get('Retry-After') if headers else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+RETRYABLE_ERRORS = (RetryableResponse, aiohttp.ClientError, asyncio.TimeoutError,
+                    requests.ConnectionError, requests.Timeout)
+
+
+class LatencyTracker:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, pct):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class Resilience:
+    # Bounded retries with full-jitter exponential backoff, plus optional
+    # hedging: if an attempt is still running after the observed p95 latency,
+    # a duplicate is fired and whichever finishes first wins.
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY, max_delay=MAX_DELAY,
+                 hedge=False, hedge_percentile=HEDGE_PERCENTILE, hedge_min_samples=HEDGE_MIN_SAMPLES,
+                 hedge_min_delay=HEDGE_MIN_DELAY, attempt_timeout=None, seed=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.attempt_timeout = attempt_timeout
+        self.random = random.Random(seed)
+        self.latencies = LatencyTracker()
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failures = 0
+        # call_sync runs on ThreadedPriceClient's pool, so its counters are locked
+        self.lock = threading.Lock()
+
+    def backoff(self, attempt, error=None):
+        delay = self.random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def hedge_delay(self):
+        if not self.hedge or len(self.latencies.samples) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latencies.percentile(self.hedge_percentile))
+
+    async def _timed(self, func):
+        start = time.perf_counter()
+        if self.attempt_timeout is None:
+            result = await func()
+        else:
+            result = await asyncio.wait_for(func(), self.attempt_timeout)
+        self.latencies.record(time.perf_counter() - start)
+        return result
+
+    async def _attempt(self, func):
+        primary = asyncio.ensure_future(self._timed(func))
+        tasks = {primary}
+        try:
+            delay = self.hedge_delay()
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedges += 1
+                tasks.add(asyncio.ensure_future(self._timed(func)))
+
+            error = None
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def call(self, func):
+        self.calls += 1
+        for attempt in range(self.max_attempts):
+            try:
+                return await self._attempt(func)
+            except RETRYABLE_ERRORS as error:
+                if attempt == self.max_attempts - 1:
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self.backoff(attempt, error))
+
+    def call_sync(self, func):
+        # Retry-only variant for the requests-based path
+        with self.lock:
+            self.calls += 1
+        for attempt in range(self.max_attempts):
+            try:
+                start = time.perf_counter()
+                result = func()
+                self.latencies.record(time.perf_counter() - start)
+                return result
+            except RETRYABLE_ERRORS as error:
+                if attempt == self.max_attempts - 1:
+                    with self.lock:
+                        self.failures += 1
+                    raise
+                with self.lock:
+                    self.retries += 1
+                time.sleep(self.backoff(attempt, error))
+
+    def stats(self):
+        p95 = self.latencies.percentile(95)
+        return {
+            'calls': self.calls,
+            'retries': self.retries,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'failures': self.failures,
+            'p95_seconds': round(p95, 4) if p95 is not None else None,
+        }
@@ -0,0 +1,357 @@
+import argparse
+import json
+import math
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+DEFAULT_DB = 'benchmark_results.db'
+# A slowdown is reported when it is both statistically significant (one-sided
+# Mann-Whitney U) and large enough to matter
+DEFAULT_ALPHA = 0.01
+DEFAULT_MIN_SLOWDOWN = 0.05
+MIN_SAMPLES = 5
+# 'previous' is the last earlier run from the same script with these settings
+BASELINE_MATCH_KEYS = ('portfolio_file', 'mock', 'modes')
+
+# Append-only: runs and samples are only ever inserted. The triggers make an
+# UPDATE or DELETE fail instead of silently rewriting history.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at TEXT NOT NULL,
+    source TEXT NOT NULL,
+    host TEXT,
+    platform TEXT,
+    python TEXT,
+    git_commit TEXT,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cases (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    mode TEXT NOT NULL,
+    num_assets INTEGER NOT NULL,
+    sample_count INTEGER NOT NULL,
+    median REAL NOT NULL,
+    summary TEXT NOT NULL,
+    PRIMARY KEY (run_id, mode, num_assets)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL,
+    mode TEXT NOT NULL,
+    num_assets INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (run_id, mode, num_assets, seq),
+    FOREIGN KEY (run_id, mode, num_assets) REFERENCES cases(run_id, mode, num_assets)
+);
+"""
+APPEND_ONLY_TABLES = ('runs', 'cases', 'samples')
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def environment_metadata():
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'host': socket.gethostname(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'git_commit': git_commit(),
+    }
+
+
+def basic_summary(samples):
+    # For callers without benchmark_runner's bootstrap summary (single-sample scripts)
+    ordered = sorted(samples)
+    middle = len(ordered) // 2
+    median = ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+    return {'n': len(ordered), 'mean': sum(ordered) / len(ordered), 'median': median, 'min': ordered[0],
+            'max': ordered[-1], 'median_ci_low': median, 'median_ci_high': median}
+
+
+class ResultsStore:
+    # Every benchmark run with its metadata, per-case summaries and raw samples.
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        for table in APPEND_ONLY_TABLES:
+            for action in ('UPDATE', 'DELETE'):
+                self.conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_no_{action.lower()} BEFORE {action} ON {table} "
+                    f"BEGIN SELECT RAISE(ABORT, '{table} is append-only'); END")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def record_run(self, metadata, results, source='benchmark_runner'):
+        # results: benchmark_runner's [{'mode', 'num_assets', 'samples', 'summary'}]
+        metadata = {**environment_metadata(), **metadata}
+        with self.conn:
+            run_id = self.conn.execute(
+                "INSERT INTO runs (recorded_at, source, host, platform, python, git_commit, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (metadata['timestamp'], source, metadata.get('host'), metadata.get('platform'),
+                 metadata.get('python'), metadata.get('git_commit'), json.dumps(metadata))).lastrowid
+            for result in results:
+                summary = result.get('summary') or basic_summary(result['samples'])
+                key = (run_id, result['mode'], result['num_assets'])
+                self.conn.execute("INSERT INTO cases VALUES (?, ?, ?, ?, ?, ?)",
+                                  key + (len(result['samples']), summary['median'], json.dumps(summary)))
+                self.conn.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?)",
+                                      [key + (seq, seconds) for seq, seconds in enumerate(result['samples'])])
+        return run_id
+
+    def record_timings(self, mode, num_assets_list, times, source, metadata=None):
+        # One timing per portfolio, as the benchmark_serial/parallel scripts
+        # produce; portfolios of the same size are samples of one case
+        by_size = {}
+        for size, seconds in zip(num_assets_list, times):
+            by_size.setdefault(size, []).append(seconds)
+        results = [{'mode': mode, 'num_assets': size, 'samples': samples} for size, samples in by_size.items()]
+        return self.record_run({'modes': [mode], **(metadata or {})}, results, source)
+
+    def runs(self, limit=None):
+        query = ("SELECT run_id, recorded_at, source, host, git_commit, "
+                 "(SELECT COUNT(*) FROM samples WHERE samples.run_id = runs.run_id) "
+                 "FROM runs ORDER BY run_id DESC")
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        keys = ('run_id', 'recorded_at', 'source', 'host', 'git_commit', 'samples')
+        return [dict(zip(keys, row)) for row in self.conn.execute(query)]
+
+    def resolve(self, run, candidate=None):
+        # 'latest', a run id, or 'previous': the latest run before `candidate`
+        # (default: latest) from the same source with the same
+        # BASELINE_MATCH_KEYS, so a baseline never comes from another benchmark
+        if run == 'previous':
+            candidate_id = self.resolve(candidate or 'latest')
+            source, = self.conn.execute("SELECT source FROM runs WHERE run_id = ?", (candidate_id,)).fetchone()
+            settings = self.metadata(candidate_id)
+            row = None
+            for run_id, metadata in self.conn.execute(
+                    "SELECT run_id, metadata FROM runs WHERE source = ? AND run_id < ? ORDER BY run_id DESC",
+                    (source, candidate_id)):
+                metadata = json.loads(metadata)
+                if all(metadata.get(key) == settings.get(key) for key in BASELINE_MATCH_KEYS):
+                    row = (run_id,)
+                    break
+            if row is None:
+                raise KeyError(f"no earlier {source} run with the same settings as run {candidate_id} in {self.path}")
+        elif run == 'latest':
+            row = self.conn.execute("SELECT run_id FROM runs ORDER BY run_id DESC LIMIT 1").fetchone()
+        else:
+            row = self.conn.execute("SELECT run_id FROM runs WHERE run_id = ?", (int(run),)).fetchone()
+        if row is None:
+            raise KeyError(f"no run '{run}' in {self.path}")
+        return row[0]
+
+    def metadata(self, run_id):
+        return json.loads(self.conn.execute("SELECT metadata FROM runs WHERE run_id = ?", (run_id,)).fetchone()[0])
+
+    def samples(self, run_id):
+        # {(mode, num_assets): [seconds, ...]} in recorded order
+        by_case = {}
+        for mode, size, seconds in self.conn.execute(
+                "SELECT mode, num_assets, seconds FROM samples WHERE run_id = ? ORDER BY mode, num_assets, seq",
+                (run_id,)):
+            by_case.setdefault((mode, size), []).append(seconds)
+        return by_case
+
+    def by_mode(self, run_id):
+        # Same shape as compare_serial_parallel.load_results: {mode: (sizes, medians, ci_low, ci_high)}
+        by_mode = {}
+        for mode, size, summary in self.conn.execute(
+                "SELECT mode, num_assets, summary FROM cases WHERE run_id = ? ORDER BY num_assets", (run_id,)):
+            summary = json.loads(summary)
+            row = by_mode.setdefault(mode, ([], [], [], []))
+            row[0].append(size)
+            row[1].append(summary['median'])
+            row[2].append(summary['median_ci_low'])
+            row[3].append(summary['median_ci_high'])
+        return by_mode
+
+
+# --- Regression detection ---
+def mann_whitney_greater(candidate, baseline):
+    # One-sided p-value that candidate times are stochastically larger than
+    # baseline times (normal approximation, tie-corrected, continuity-corrected)
+    n1, n2 = len(candidate), len(baseline)
+    pooled = sorted([(value, 0) for value in candidate] + [(value, 1) for value in baseline])
+    rank_sum = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        ties = j - i + 1
+        average_rank = (i + j) / 2 + 1
+        rank_sum += average_rank * sum(1 for _, group in pooled[i:j + 1] if group == 0)
+        tie_term += ties ** 3 - ties
+        i = j + 1
+
+    n = n1 + n2
+    u = rank_sum - n1 * (n1 + 1) / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare_runs(store, baseline_id, candidate_id, alpha=DEFAULT_ALPHA, min_slowdown=DEFAULT_MIN_SLOWDOWN):
+    # One row per (mode, num_assets) present in both runs
+    baseline = store.samples(baseline_id)
+    candidate = store.samples(candidate_id)
+    rows = []
+    for key in sorted(set(baseline) & set(candidate)):
+        base, cand = baseline[key], candidate[key]
+        ratio = basic_summary(cand)['median'] / basic_summary(base)['median']
+        if min(len(base), len(cand)) < MIN_SAMPLES:
+            p_value, verdict = None, 'too few samples'
+        else:
+            p_value = mann_whitney_greater(cand, base)
+            if p_value < alpha and ratio > 1 + min_slowdown:
+                verdict = 'REGRESSION'
+            elif ratio < 1 and mann_whitney_greater(base, cand) < alpha:
+                verdict = 'faster'
+            else:
+                verdict = 'ok'
+        rows.append({'mode': key[0], 'num_assets': key[1], 'baseline_n': len(base), 'candidate_n': len(cand),
+                     'ratio': ratio, 'p_value': p_value, 'verdict': verdict})
+    return rows
+
+
+def config_differences(store, baseline_id, candidate_id):
+    # Settings that make two runs incomparable if they differ
+    keys = ('base_url', 'mock', 'portfolio_file', 'workers', 'decoder', 'host')
+    baseline, candidate = store.metadata(baseline_id), store.metadata(candidate_id)
+    if baseline.get('mock') and candidate.get('mock'):
+        # Each mock server listens on a fresh port
+        keys = tuple(key for key in keys if key != 'base_url')
+    return {key: (baseline.get(key), candidate.get(key)) for key in keys if baseline.get(key) != candidate.get(key)}
+
+
+def print_comparison(rows):
+    print(f"{'mode':<10}{'assets':>7}{'n base':>8}{'n new':>7}{'new/base':>10}{'p-value':>10}   verdict")
+    for row in rows:
+        p_value = f"{row['p_value']:.4f}" if row['p_value'] is not None else '-'
+        print(f"{row['mode']:<10}{row['num_assets']:>7}{row['baseline_n']:>8}{row['candidate_n']:>7}"
+              f"{row['ratio']:>9.3f}x{p_value:>10}   {row['verdict']}")
+
+
+# --- CLI ---
+def command_list(store, args):
+    print(f"{'run':>5}  {'recorded (UTC)':<28}{'source':<20}{'commit':<10}{'samples':>8}  host")
+    for run in store.runs(args.limit):
+        print(f"{run['run_id']:>5}  {run['recorded_at'][:26]:<28}{run['source']:<20}{run['git_commit'] or '-':<10}"
+              f"{run['samples']:>8}  {run['host']}")
+    return 0
+
+
+def command_import(store, args):
+    for filename in args.files:
+        with open(filename, 'r') as f:
+            data = json.load(f)
+        run_id = store.record_run(data.get('meta', {}), data['results'], source=os.path.basename(filename))
+        print(f"Imported {filename} as run {run_id}.")
+    return 0
+
+
+def command_check(store, args):
+    candidate_id = store.resolve(args.candidate)
+    baseline_id = store.resolve(args.baseline, candidate_id)
+    print(f"Run {candidate_id} vs baseline run {baseline_id} "
+          f"(one-sided Mann-Whitney U, alpha={args.alpha}, min slowdown {args.min_slowdown:.0%})")
+    for key, (old, new) in config_differences(store, baseline_id, candidate_id).items():
+        print(f"warning: {key} differs ({old!r} -> {new!r}); the runs may not be comparable")
+    rows = compare_runs(store, baseline_id, candidate_id, args.alpha, args.min_slowdown)
+    if not rows:
+        print("The runs share no (mode, portfolio size) cases.", file=sys.stderr)
+        return 2
+    print_comparison(rows)
+
+    regressions = [row for row in rows if row['verdict'] == 'REGRESSION']
+    if regressions:
+        print(f"\n*** PERFORMANCE REGRESSION: {len(regressions)} case(s) significantly slower than run "
+              f"{baseline_id} ***", file=sys.stderr)
+        for row in regressions:
+            print(f"***   {row['mode']} with {row['num_assets']} assets: {row['ratio']:.2f}x the baseline median "
+                  f"(p={row['p_value']:.2g})", file=sys.stderr)
+        return 1
+    if all(row['p_value'] is None for row in rows):
+        print(f"\nNo case has the {MIN_SAMPLES} samples per run the test needs, so nothing was checked.",
+              file=sys.stderr)
+        return 2
+    print("\nNo significant slowdowns.")
+    return 0
+
+
+def command_plot(store, args):
+    from compare_serial_parallel import plot_run_comparison
+    candidate_id = store.resolve(args.candidate)
+    baseline_id = store.resolve(args.baseline, candidate_id)
+    filename = plot_run_comparison(store.by_mode(baseline_id), store.by_mode(candidate_id),
+                                   f'run {baseline_id}', f'run {candidate_id}', args.output)
+    print(f"Saved {filename}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Append-only benchmark results store.')
+    parser.add_argument('--db', default=DEFAULT_DB)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    runs = commands.add_parser('list', help='list stored runs, newest first')
+    runs.add_argument('--limit', type=int, default=20)
+    runs.set_defaults(handler=command_list)
+
+    imports = commands.add_parser('import', help='store benchmark_runner.py JSON output files')
+    imports.add_argument('files', nargs='+')
+    imports.set_defaults(handler=command_import)
+
+    check = commands.add_parser('check', help='exit 1 if a run is significantly slower than a baseline')
+    check.add_argument('--baseline', default='previous',
+                       help="run id or 'previous' (default: the last earlier run of the same benchmark and settings)")
+    check.add_argument('--candidate', default='latest', help="run id or 'latest' (default)")
+    check.add_argument('--alpha', type=float, default=DEFAULT_ALPHA)
+    check.add_argument('--min-slowdown', type=float, default=DEFAULT_MIN_SLOWDOWN,
+                       help='ignore slowdowns below this fraction of the baseline median')
+    check.set_defaults(handler=command_check)
+
+    plot = commands.add_parser('plot', help='timing and ratio plots for two stored runs')
+    plot.add_argument('baseline', help="run id, 'previous' or 'latest'")
+    plot.add_argument('candidate', nargs='?', default='latest')
+    plot.add_argument('--output', default='run_comparison.png')
+    plot.set_defaults(handler=command_plot)
+
+    args = parser.parse_args(argv)
+    with ResultsStore(args.db) as store:
+        try:
+            return args.handler(store, args)
+        except KeyError as error:
+            parser.error(error.args[0])
+
+if __name__ == '__main__':
+    sys.exit(main())
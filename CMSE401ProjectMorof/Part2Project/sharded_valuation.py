@@ -0,0 +1,162 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from portfolio_store import load_book
+
+# Rows of the shared output block
+TOTAL_ROW = 0
+HHI_ROW = 1
+MAX_WEIGHT_ROW = 2
+OUTPUT_ROWS = 3
+
+# Per-process state set up once by the pool initializer
+_worker = {}
+
+
+def attach_shared_memory(name):
+    # Workers only borrow the block; the parent owns (and unlinks) it. Before
+    # Python 3.13 there is no track flag, but workers share the parent's
+    # resource tracker, so the parent's unlink still clears the registration.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(book_path, prices_name, num_symbols, output_name, num_portfolios):
+    book = load_book(book_path)
+    prices_shm = attach_shared_memory(prices_name)
+    output_shm = attach_shared_memory(output_name)
+    _worker['book'] = book
+    _worker['shm'] = (prices_shm, output_shm)
+    _worker['prices'] = np.ndarray((num_symbols,), dtype=np.float64, buffer=prices_shm.buf)
+    _worker['output'] = np.ndarray((OUTPUT_ROWS, num_portfolios), dtype=np.float64, buffer=output_shm.buf)
+
+
+def _value_shard(shard_id, first_portfolio, last_portfolio, start, end, analytics):
+    # Values holdings[start:end], which belong to portfolios [first, last), and
+    # writes results straight into the shared output block
+    started = time.perf_counter()
+    book = _worker['book']
+    prices = _worker['prices']
+    output = _worker['output']
+    count = last_portfolio - first_portfolio
+
+    local_ids = np.asarray(book.portfolio_ids[start:end], dtype=np.int64) - first_portfolio
+    holding_values = book.amounts[start:end] * prices[book.symbol_ids[start:end]]
+    totals = np.bincount(local_ids, weights=holding_values, minlength=count)
+    output[TOTAL_ROW, first_portfolio:last_portfolio] = totals
+
+    if analytics:
+        holding_totals = totals[local_ids]
+        weights = np.divide(holding_values, holding_totals, out=np.zeros_like(holding_values),
+                            where=holding_totals != 0)
+        output[HHI_ROW, first_portfolio:last_portfolio] = np.bincount(local_ids, weights=weights * weights,
+                                                                      minlength=count)
+        max_weight = np.zeros(count)
+        np.maximum.at(max_weight, local_ids, weights)
+        output[MAX_WEIGHT_ROW, first_portfolio:last_portfolio] = max_weight
+
+    return shard_id, os.getpid(), end - start, time.perf_counter() - started
+
+
+def plan_shards(book, num_shards):
+    # Contiguous portfolio ranges with roughly equal holdings; needs holdings
+    # ordered by portfolio id (true for read_book and saved books)
+    portfolio_ids = np.asarray(book.portfolio_ids)
+    cuts = np.linspace(0, len(portfolio_ids), num_shards + 1).astype(np.int64)
+    shards = []
+    first_portfolio = 0
+    start = 0
+    for shard_id in range(num_shards):
+        if shard_id == num_shards - 1:
+            last_portfolio = book.num_portfolios
+        else:
+            cut = cuts[shard_id + 1]
+            last_portfolio = int(portfolio_ids[cut]) if cut < len(portfolio_ids) else book.num_portfolios
+            last_portfolio = max(last_portfolio, first_portfolio)
+        end = int(np.searchsorted(portfolio_ids, last_portfolio, side='left'))
+        if last_portfolio > first_portfolio:
+            shards.append((first_portfolio, last_portfolio, start, end))
+        first_portfolio, start = last_portfolio, end
+    return shards
+
+
+class ShardResult:
+    def __init__(self, totals, hhi, max_weight, shard_timings, elapsed):
+        self.totals = totals
+        self.hhi = hhi
+        self.max_weight = max_weight
+        self.shard_timings = shard_timings
+        self.elapsed = elapsed
+
+
+class ShardedValuator:
+    # Values a memory-mapped book across a process pool. Workers map the book
+    # file themselves and read prices from a shared-memory vector, so each
+    # valuation only sends shard bounds over the pipe, never holdings or prices.
+
+    def __init__(self, book_path, workers=None, shards_per_worker=1):
+        self.book_path = book_path
+        self.book = load_book(book_path)
+        self.workers = workers or os.cpu_count()
+        num_symbols = max(1, len(self.book.symbols))
+        num_portfolios = max(1, self.book.num_portfolios)
+
+        self.prices_shm = shared_memory.SharedMemory(create=True, size=num_symbols * 8)
+        self.output_shm = shared_memory.SharedMemory(create=True, size=OUTPUT_ROWS * num_portfolios * 8)
+        self.prices = np.ndarray((num_symbols,), dtype=np.float64, buffer=self.prices_shm.buf)
+        self.output = np.ndarray((OUTPUT_ROWS, num_portfolios), dtype=np.float64, buffer=self.output_shm.buf)
+        self.prices[:] = 0.0
+
+        self.shards = plan_shards(self.book, self.workers * shards_per_worker)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(book_path, self.prices_shm.name, num_symbols, self.output_shm.name, num_portfolios),
+        )
+
+    def update_prices(self, prices):
+        # prices: {symbol: price} or a vector aligned to the book's symbols
+        if isinstance(prices, dict):
+            vector, _ = self.book.symbols.price_vector(prices)
+        else:
+            vector = np.asarray(prices, dtype=np.float64)
+        self.prices[:len(vector)] = vector
+
+    def warm_up(self):
+        # Start every worker (and run its initializer) before timing anything
+        futures = [self.pool.submit(_value_shard, -1, 0, 0, 0, 0, False) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def value(self, analytics=False):
+        started = time.perf_counter()
+        futures = [self.pool.submit(_value_shard, shard_id, first, last, start, end, analytics)
+                   for shard_id, (first, last, start, end) in enumerate(self.shards)]
+        timings = []
+        for future in futures:
+            shard_id, pid, holdings, seconds = future.result()
+            timings.append({'shard': shard_id, 'pid': pid, 'holdings': holdings, 'seconds': seconds})
+        elapsed = time.perf_counter() - started
+
+        count = self.book.num_portfolios
+        hhi = self.output[HHI_ROW, :count].copy() if analytics else None
+        max_weight = self.output[MAX_WEIGHT_ROW, :count].copy() if analytics else None
+        return ShardResult(self.output[TOTAL_ROW, :count].copy(), hhi, max_weight, timings, elapsed)
+
+    def close(self):
+        self.pool.shutdown()
+        del self.prices, self.output
+        for shm in (self.prices_shm, self.output_shm):
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,70 @@
+import asyncio
+
+
+class SingleFlight:
+    # Collapses concurrent requests for the same key onto one in-flight call.
+    # Callers that arrive while a key is being fetched await the same future
+    # instead of sending their own upstream request.
+
+    def __init__(self):
+        self.inflight = {}
+        self.launched = 0
+        self.shared = 0
+
+    def _settle(self, key, future, result=None, exc=None):
+        if self.inflight.get(key) is future:
+            del self.inflight[key]
+        if future.done():
+            return
+        if exc is None:
+            future.set_result(result)
+        else:
+            future.set_exception(exc)
+            # Mark as retrieved so a flight with no followers does not log a warning
+            future.exception()
+
+    async def do(self, key, func):
+        results = await self.do_many([key], lambda keys: self._call_one(keys[0], func))
+        return results[key]
+
+    async def _call_one(self, key, func):
+        return {key: await func()}
+
+    async def do_many(self, keys, func):
+        # func(list_of_keys) must return a dict covering the keys it was given
+        loop = asyncio.get_running_loop()
+        waiting = {}
+        owned = []
+
+        for key in dict.fromkeys(keys):
+            future = self.inflight.get(key)
+            if future is not None:
+                waiting[key] = future
+                self.shared += 1
+            else:
+                future = loop.create_future()
+                self.inflight[key] = future
+                owned.append(key)
+
+        results = {}
+        if owned:
+            self.launched += 1
+            futures = {key: self.inflight[key] for key in owned}
+            try:
+                fetched = await func(owned)
+            except BaseException as exc:
+                if isinstance(exc, asyncio.CancelledError):
+                    exc = asyncio.CancelledError()
+                for key, future in futures.items():
+                    self._settle(key, future, exc=exc)
+                raise
+            for key, future in futures.items():
+                results[key] = fetched.get(key)
+                self._settle(key, future, result=results[key])
+
+        for key, future in waiting.items():
+            results[key] = await asyncio.shield(future)
+        return results
+
+    def stats(self):
+        return {'launched': self.launched, 'shared': self.shared, 'inflight': len(self.inflight)}
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+from dotenv import load_dotenv
+from batch_planner import plan_batches
+from price_client import PriceClient
+
+
+class HoldingUpdate:
+    def __init__(self, symbol, amount, price, running_total, completed, total_holdings, elapsed):
+        self.symbol = symbol
+        self.amount = amount
+        self.price = price
+        self.value = price * amount
+        self.running_total = running_total
+        self.completed = completed
+        self.total_holdings = total_holdings
+        self.elapsed = elapsed
+
+
+class ValuationSummary:
+    def __init__(self, total_value, missing_symbols, total_holdings, elapsed):
+        self.total_value = total_value
+        self.missing_symbols = missing_symbols
+        self.total_holdings = total_holdings
+        self.elapsed = elapsed
+
+
+async def stream_valuation(portfolio, client, batch_size=1):
+    # Yields a HoldingUpdate for each holding as soon as its quote lands (in
+    # completion order, not portfolio order), then one ValuationSummary.
+    # A price of 0.0 means the API did not return the symbol; it is reported
+    # in the summary's missing_symbols.
+    start = time.perf_counter()
+    if batch_size > 1:
+        batches = plan_batches(list(portfolio), client.url, max_symbols=batch_size)
+    else:
+        batches = [[symbol] for symbol in portfolio]
+    tasks = [asyncio.ensure_future(client.fetch_batch(batch)) for batch in batches]
+
+    running_total = 0.0
+    completed = 0
+    missing = []
+    try:
+        for next_batch in asyncio.as_completed(tasks):
+            prices = await next_batch
+            for symbol, price in prices.items():
+                completed += 1
+                running_total += price * portfolio[symbol]
+                if not price:
+                    missing.append(symbol)
+                yield HoldingUpdate(symbol, portfolio[symbol], price, running_total, completed,
+                                    len(portfolio), time.perf_counter() - start)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    yield ValuationSummary(running_total, missing, len(portfolio), time.perf_counter() - start)
+
+
+async def print_streaming_valuation(portfolio, client, batch_size=1):
+    summary = None
+    async for update in stream_valuation(portfolio, client, batch_size):
+        if isinstance(update, ValuationSummary):
+            summary = update
+            continue
+        print(f"[{update.elapsed:6.3f}s] {update.amount:.4f} {update.symbol} @ ${update.price:.2f} each = "
+              f"${update.value:.2f}   running total ${update.running_total:.2f} "
+              f"({update.completed}/{update.total_holdings})")
+
+    if summary.missing_symbols:
+        print(f"Missing prices for: {', '.join(summary.missing_symbols)}")
+    return summary
+
+
+def main():
+    from portfolio_parallel import read_portfolio
+
+    load_dotenv()
+    portfolio = read_portfolio('basic_portfolio.txt')
+
+    async def run():
+        async with PriceClient() as client:
+            return await print_streaming_valuation(portfolio, client)
+
+    summary = asyncio.run(run())
+    print(f"\nTotal Portfolio Value: ${summary.total_value:.2f}")
+    print(f"Time Taken (streaming): {summary.elapsed:.2f} seconds")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import time
+
+import requests
+from price_client import make_headers, resolve_base_url
+
+MAP_PATH = '/v1/cryptocurrency/map'
+DEFAULT_REGISTRY_FILE = 'symbol_map.json'
+# New listings and delistings trickle in; a day-old map is fine for validation
+DEFAULT_MAX_AGE = 24 * 3600
+# Largest page the map endpoint returns
+MAP_PAGE_LIMIT = 5000
+# What is kept per coin, stored as one row per coin on disk
+COIN_FIELDS = ('id', 'symbol', 'name', 'slug', 'rank', 'is_active')
+
+
+class SymbolRegistry:
+    # Symbol -> CoinMarketCap id for the whole listing, loaded in bulk from
+    # /v1/cryptocurrency/map and kept on disk between runs, so validating a
+    # portfolio is a dictionary lookup instead of a request per symbol.
+    # Tickers are not unique (small tokens reuse popular ones): each symbol
+    # keeps every coin listed under it, best-ranked first, and resolve()
+    # picks that one. Quotes fetched by id (fetch_prices_by_id) are then
+    # unambiguous and keyed by id.
+
+    def __init__(self, path=DEFAULT_REGISTRY_FILE, max_age=DEFAULT_MAX_AGE, base_url=None, api_key=None,
+                 clock=time.time):
+        self.path = path
+        self.max_age = max_age
+        self.base_url = resolve_base_url(base_url)
+        self.api_key = api_key
+        self.clock = clock
+        self.fetched_at = None
+        self.coins = {}
+        self.by_symbol = {}
+        self.requests = 0
+
+    def __len__(self):
+        return len(self.coins)
+
+    def __contains__(self, symbol):
+        return symbol.upper() in self.by_symbol
+
+    # --- Loading and refresh policy ---
+    def index(self, coins):
+        self.coins = {coin['id']: coin for coin in coins}
+        self.by_symbol = {}
+        for coin in coins:
+            self.by_symbol.setdefault(coin['symbol'].upper(), []).append(coin['id'])
+        for ids in self.by_symbol.values():
+            # Active before inactive, then by rank; unranked coins go last
+            ids.sort(key=lambda coin_id: (not self.coins[coin_id]['is_active'],
+                                          self.coins[coin_id]['rank'] is None,
+                                          self.coins[coin_id]['rank'] or 0, coin_id))
+
+    def is_fresh(self, now=None):
+        if self.fetched_at is None:
+            return False
+        if now is None:
+            now = self.clock()
+        return now - self.fetched_at <= self.max_age
+
+    def fetch(self):
+        # Page through the whole listing; one request per 5000 coins
+        coins = []
+        with requests.Session() as session:
+            session.headers.update(make_headers(self.api_key))
+            start = 1
+            while True:
+                params = {'start': start, 'limit': MAP_PAGE_LIMIT, 'listing_status': 'active'}
+                response = session.get(self.base_url + MAP_PATH, params=params, timeout=30)
+                self.requests += 1
+                response.raise_for_status()
+                page = response.json()['data']
+                coins.extend({field: coin.get(field) for field in COIN_FIELDS} for coin in page)
+                if len(page) < MAP_PAGE_LIMIT:
+                    break
+                start += MAP_PAGE_LIMIT
+        return coins
+
+    def refresh(self):
+        coins = self.fetch()
+        self.fetched_at = self.clock()
+        self.index(coins)
+        self.save()
+        return len(coins)
+
+    def ensure(self):
+        # Disk copy if it is fresh and from the same server; otherwise
+        # refetch, falling back to a stale copy when the API is unreachable
+        if not self.coins:
+            self.load()
+        if self.is_fresh():
+            return self
+        try:
+            self.refresh()
+        except (requests.RequestException, ValueError, KeyError) as error:
+            if not self.coins:
+                raise
+            age = (self.clock() - self.fetched_at) / 3600
+            print(f"Could not refresh the symbol map ({error}). Using the saved copy from {age:.1f} h ago.")
+        return self
+
+    def save(self, path=None):
+        path = path or self.path
+        if path is None:
+            return
+        saved = {
+            'fetched_at': self.fetched_at,
+            'base_url': self.base_url,
+            'fields': COIN_FIELDS,
+            'coins': [[coin[field] for field in COIN_FIELDS] for coin in self.coins.values()],
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(saved, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        path = path or self.path
+        if path is None or not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r') as f:
+                saved = json.load(f)
+            fields = saved['fields']
+            coins = [dict(zip(fields, row)) for row in saved['coins']]
+        except (OSError, ValueError, KeyError, TypeError):
+            print(f"Could not read symbol map {path}. Fetching a new one.")
+            return 0
+        # A map from another server (the mock vs the real API) has other ids
+        if saved.get('base_url') != self.base_url:
+            return 0
+        self.fetched_at = saved.get('fetched_at')
+        self.index(coins)
+        return len(coins)
+
+    # --- Lookups (all in memory) ---
+    def ids_for(self, symbol):
+        return list(self.by_symbol.get(symbol.upper(), ()))
+
+    def resolve(self, symbol):
+        ids = self.by_symbol.get(symbol.upper())
+        return ids[0] if ids else None
+
+    def coin(self, coin_id):
+        return self.coins.get(coin_id)
+
+    def validate(self, symbols):
+        # Returns (known symbols, unknown symbols), both in input order
+        valid = []
+        invalid = []
+        for symbol in symbols:
+            (valid if symbol.upper() in self.by_symbol else invalid).append(symbol)
+        return valid, invalid
+
+    def id_map(self, symbols):
+        # {symbol: id} for the known symbols, ready for fetch_prices_by_id
+        return {symbol: self.by_symbol[symbol.upper()][0] for symbol in symbols
+                if symbol.upper() in self.by_symbol}
+
+    def ambiguous(self, symbols):
+        # Symbols that more than one coin lists under, with every candidate id
+        return {symbol: self.ids_for(symbol) for symbol in symbols
+                if len(self.by_symbol.get(symbol.upper(), ())) > 1}
+
+
+def load_registry(path=DEFAULT_REGISTRY_FILE, max_age=DEFAULT_MAX_AGE, base_url=None, api_key=None):
+    return SymbolRegistry(path, max_age, base_url, api_key).ensure()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate symbols against the cached CoinMarketCap id map.')
+    parser.add_argument('symbols', nargs='*', help='symbols to look up (default: just report the map)')
+    parser.add_argument('--file', help='portfolio file ("SYMBOL amount" per line) to validate')
+    parser.add_argument('--path', default=DEFAULT_REGISTRY_FILE)
+    parser.add_argument('--max-age', type=float, default=DEFAULT_MAX_AGE, help='seconds before the map is refetched')
+    parser.add_argument('--refresh', action='store_true', help='refetch even if the saved map is fresh')
+    parser.add_argument('--mock', action='store_true', help='load the map from a local mock server')
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    symbols = list(args.symbols)
+    if args.file:
+        from portfolio_serial import read_portfolio
+        symbols.extend(read_portfolio(args.file))
+
+    server = None
+    base_url = None
+    if args.mock:
+        from mock_cmc_server import MockServerThread
+        server = MockServerThread().start()
+        base_url = server.base_url
+    try:
+        # The mock's map stays in memory so it never replaces the real one on disk
+        registry = SymbolRegistry(None if args.mock else args.path, args.max_age, base_url)
+        start = time.perf_counter()
+        if args.refresh:
+            registry.refresh()
+        else:
+            registry.ensure()
+        load_time = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(f"{len(registry)} coins, {len(registry.by_symbol)} symbols ({registry.requests} map requests, "
+          f"{load_time * 1e3:.0f} ms)")
+    if not symbols:
+        return
+    start = time.perf_counter()
+    valid, invalid = registry.validate(symbols)
+    print(f"Validated {len(symbols)} symbols in {(time.perf_counter() - start) * 1e3:.2f} ms: "
+          f"{len(valid)} known, {len(invalid)} unknown")
+    if invalid:
+        print(f"  unknown: {', '.join(invalid[:20])}{' ...' if len(invalid) > 20 else ''}")
+    for symbol, ids in registry.ambiguous(valid).items():
+        names = ', '.join(f"{registry.coin(coin_id)['name']} (id {coin_id})" for coin_id in ids)
+        print(f"  {symbol} is ambiguous: {names}; using id {ids[0]}")
+
+if __name__ == '__main__':
+    main()
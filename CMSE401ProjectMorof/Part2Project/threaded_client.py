@@ -0,0 +1,69 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from price_client import SerialPriceClient, cached_prices, parse_prices
+
+DEFAULT_WORKERS = 8
+
+
+class ThreadedPriceClient:
+    # Concurrency for synchronous code that cannot adopt asyncio: per-symbol
+    # requests run on a ThreadPoolExecutor over one pooled requests.Session,
+    # sized so every worker keeps its own keep-alive connection.
+    #
+    # The Session's connection pool is thread-safe; the quote cache is not,
+    # so it is only touched from the calling thread, under a lock.
+
+    def __init__(self, api_key=None, base_url=None, workers=DEFAULT_WORKERS, cache=None, resilience=None,
+                 decoder=None, tracer=None):
+        self.workers = workers
+        self.cache = cache
+        self.client = SerialPriceClient(api_key, base_url, pool_connections=workers, pool_maxsize=workers,
+                                        resilience=resilience, decoder=decoder, tracer=tracer)
+        self.decoder = self.client.decoder
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='price-fetch')
+        self.cache_lock = threading.Lock()
+
+    @property
+    def request_count(self):
+        return self.client.request_count
+
+    def close(self):
+        self.executor.shutdown()
+        self.client.close()
+        if self.cache is not None:
+            self.cache.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _fetch_one(self, symbol):
+        data = self.client.fetch_quotes([symbol])
+        return symbol, parse_prices(data, [symbol])[symbol]
+
+    def fetch_prices(self, symbols):
+        # {symbol: price}; cache hits are served inline, misses fan out to the pool
+        symbols = list(dict.fromkeys(symbols))
+        with self.cache_lock:
+            prices, missing = cached_prices(self.cache, symbols)
+        fetched = dict(self.executor.map(self._fetch_one, missing))
+        if self.cache is not None:
+            with self.cache_lock:
+                self.cache.put_many({symbol: price for symbol, price in fetched.items() if price})
+        prices.update(fetched)
+        return prices
+
+    def fetch_price(self, symbol):
+        return self.fetch_prices([symbol])[symbol]
+
+    def value_portfolio(self, portfolio):
+        prices = self.fetch_prices(portfolio)
+        return sum(prices[symbol] * amount for symbol, amount in portfolio.items())
+
+    def value_portfolios(self, portfolios):
+        # Several portfolios at once: their symbols are fetched in one fan-out
+        prices = self.fetch_prices(symbol for portfolio in portfolios for symbol in portfolio)
+        return [sum(prices[symbol] * amount for symbol, amount in portfolio.items()) for portfolio in portfolios]
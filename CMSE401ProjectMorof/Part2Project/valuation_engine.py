@@ -0,0 +1,134 @@
+import numpy as np
+
+
+class SymbolTable:
+    # Interns symbols to dense column indices shared by holdings and prices
+
+    def __init__(self, symbols=()):
+        self.index = {}
+        self.symbols = []
+        for symbol in symbols:
+            self.intern(symbol)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol.upper() in self.index
+
+    def column(self, symbol):
+        # Column of a symbol in any case (intern() stores them upper-cased), or None
+        return self.index.get(symbol.upper())
+
+    def intern(self, symbol):
+        symbol = symbol.upper()
+        column = self.index.get(symbol)
+        if column is None:
+            column = len(self.symbols)
+            self.index[symbol] = column
+            self.symbols.append(symbol)
+        return column
+
+    def price_vector(self, prices):
+        # Returns (vector aligned to columns, boolean mask of symbols with no price)
+        vector = np.zeros(len(self.symbols), dtype=np.float64)
+        missing = np.ones(len(self.symbols), dtype=bool)
+        for symbol, price in prices.items():
+            column = self.column(symbol)
+            if column is not None and price is not None:
+                vector[column] = price
+                missing[column] = False
+        return vector, missing
+
+
+def as_index_array(values):
+    array = np.asarray(values)
+    if array.dtype.kind not in 'iu':
+        array = array.astype(np.int64)
+    return array
+
+
+class Valuation:
+    def __init__(self, totals, holding_values, weights, missing_symbols):
+        self.totals = totals
+        self.holding_values = holding_values
+        self.weights = weights
+        self.missing_symbols = missing_symbols
+
+
+class PortfolioBook:
+    # All holdings as a sparse portfolios x symbols matrix in coordinate form:
+    # one (portfolio_id, symbol_id, amount) entry per holding, in typed arrays.
+
+    def __init__(self, portfolio_ids, symbol_ids, amounts, symbols, num_portfolios=None, names=None):
+        # Integer arrays keep their dtype so memory-mapped int32 columns are not copied
+        self.portfolio_ids = as_index_array(portfolio_ids)
+        self.symbol_ids = as_index_array(symbol_ids)
+        self.amounts = np.asarray(amounts, dtype=np.float64)
+        self.symbols = symbols
+        if num_portfolios is None:
+            num_portfolios = int(self.portfolio_ids.max()) + 1 if len(self.portfolio_ids) else 0
+        self.num_portfolios = num_portfolios
+        self.names = names
+
+    @classmethod
+    def from_dicts(cls, portfolios, names=None, symbols=None):
+        symbols = symbols if symbols is not None else SymbolTable()
+        portfolio_ids = []
+        symbol_ids = []
+        amounts = []
+        count = 0
+        for portfolio_id, portfolio in enumerate(portfolios):
+            for symbol, amount in portfolio.items():
+                portfolio_ids.append(portfolio_id)
+                symbol_ids.append(symbols.intern(symbol))
+                amounts.append(amount)
+            count = portfolio_id + 1
+        return cls(portfolio_ids, symbol_ids, amounts, symbols, count, names)
+
+    def __len__(self):
+        return self.num_portfolios
+
+    @property
+    def num_holdings(self):
+        return len(self.amounts)
+
+    def dense(self):
+        matrix = np.zeros((self.num_portfolios, len(self.symbols)), dtype=np.float64)
+        np.add.at(matrix, (self.portfolio_ids, self.symbol_ids), self.amounts)
+        return matrix
+
+    def totals(self, price_vector):
+        # Totals only: one gather + weighted bincount over every holding
+        totals = np.bincount(self.portfolio_ids, weights=self.amounts * price_vector[self.symbol_ids],
+                             minlength=self.num_portfolios)
+        return totals.astype(np.float64, copy=False)
+
+    def value(self, prices, dense=False):
+        # prices: {symbol: price} or a vector already aligned to self.symbols
+        if isinstance(prices, dict):
+            price_vector, missing = self.symbols.price_vector(prices)
+        else:
+            price_vector = np.asarray(prices, dtype=np.float64)
+            missing = np.zeros(len(price_vector), dtype=bool)
+
+        holding_values = self.amounts * price_vector[self.symbol_ids]
+        if dense:
+            totals = self.dense() @ price_vector
+        else:
+            totals = np.bincount(self.portfolio_ids, weights=holding_values,
+                                 minlength=self.num_portfolios).astype(np.float64, copy=False)
+
+        holding_totals = totals[self.portfolio_ids]
+        weights = np.divide(holding_values, holding_totals, out=np.zeros_like(holding_values),
+                            where=holding_totals != 0)
+
+        held = np.zeros(len(self.symbols), dtype=bool)
+        held[self.symbol_ids] = True
+        missing_symbols = [self.symbols.symbols[column] for column in np.flatnonzero(missing & held)]
+        return Valuation(totals, holding_values, weights, missing_symbols)
+
+    def holdings(self, portfolio_id):
+        # Back to a {symbol: amount} dict for one portfolio
+        mask = self.portfolio_ids == portfolio_id
+        return {self.symbols.symbols[s]: float(a) for s, a in zip(self.symbol_ids[mask], self.amounts[mask])}
@@ -0,0 +1,227 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from mock_cmc_server import build_universe
+from portfolio_store import load_book, read_book, save_book
+from valuation_engine import PortfolioBook, SymbolTable
+
+# Relative to today's inputs: a ~20-symbol universe and portfolios of up to 12
+# assets (portfolios.txt). Universe and largest portfolio grow with the factor;
+# the portfolio count grows faster so 1000x reaches millions of portfolios.
+SCALES = {
+    '10x': {'universe': 200, 'portfolios': 10_000, 'max_assets': 120},
+    '100x': {'universe': 2_000, 'portfolios': 200_000, 'max_assets': 1_200},
+    '1000x': {'universe': 20_000, 'portfolios': 2_000_000, 'max_assets': 12_000},
+}
+DEFAULT_SIZE_ALPHA = 1.5
+DEFAULT_POPULARITY_SKEW = 1.1
+DEFAULT_OVERLAP = 0.3
+DEFAULT_CORE_SIZE = 20
+DEFAULT_AMOUNT_SIGMA = 2.0
+DEFAULT_MIN_ASSETS = 2
+# Portfolios up to this share of the universe are drawn together, redrawing
+# duplicate symbols; larger ones are drawn one at a time without replacement
+BULK_DRAW_FRACTION = 0.02
+MIN_BULK_DRAW = 64
+MAX_REDRAWS = 50
+
+
+def universe_symbols(size):
+    # Same symbols, in the same order, as a mock server with --universe size,
+    # so a generated workload prices offline without unknown symbols
+    return list(build_universe(size))
+
+
+def universe_prices(symbols, seed=0):
+    universe = build_universe(len(symbols), seed)
+    rng = np.random.default_rng(seed)
+    return np.array([universe[symbol]['price'] if symbol in universe else 10 ** rng.uniform(-4, 4)
+                     for symbol in symbols])
+
+
+def portfolio_sizes(rng, count, max_assets, alpha, min_assets=DEFAULT_MIN_ASSETS):
+    # Discrete Pareto: P(size >= k) ~ (k / min_assets) ** -alpha, so most
+    # portfolios hold a handful of coins and a few hold thousands
+    u = 1.0 - rng.random(count)
+    sizes = np.floor(min_assets * u ** (-1.0 / alpha))
+    return np.minimum(sizes, max_assets).astype(np.int64)
+
+
+def symbol_weights(universe_size, skew, overlap, core_size):
+    # Zipf popularity by rank, with `overlap` of the probability mass moved onto
+    # a shared core of the top `core_size` symbols: at overlap=0 portfolios only
+    # share what popularity gives them, near 1 they mostly hold the same core
+    weights = 1.0 / np.arange(1, universe_size + 1) ** skew
+    weights *= (1.0 - overlap) / weights.sum()
+    core_size = min(core_size, universe_size)
+    weights[:core_size] += overlap / core_size
+    return weights / weights.sum()
+
+
+def repeated_holdings(portfolio_ids, symbol_ids, universe_size):
+    # Positions whose (portfolio, symbol) already appeared earlier in the list
+    keys = portfolio_ids * universe_size + symbol_ids
+    order = np.argsort(keys, kind='stable')
+    return order[1:][keys[order[1:]] == keys[order[:-1]]]
+
+
+def draw_bulk(rng, cdf, portfolio_ids, universe_size):
+    # With-replacement draws, then redraw any symbol a portfolio already holds.
+    # Only portfolios that still had a repeat are checked again, so later
+    # rounds touch a few large portfolios rather than every holding.
+    symbol_ids = np.searchsorted(cdf, rng.random(len(portfolio_ids)), side='right')
+    active = np.arange(len(portfolio_ids))
+    for _ in range(MAX_REDRAWS):
+        repeated = active[repeated_holdings(portfolio_ids[active], symbol_ids[active], universe_size)]
+        if not len(repeated):
+            break
+        symbol_ids[repeated] = np.searchsorted(cdf, rng.random(len(repeated)), side='right')
+        active = active[np.isin(portfolio_ids[active], portfolio_ids[repeated])]
+    # Anything still repeated after the last round is dropped
+    dropped = np.zeros(len(portfolio_ids), dtype=bool)
+    dropped[active[repeated_holdings(portfolio_ids[active], symbol_ids[active], universe_size)]] = True
+    return symbol_ids, dropped
+
+
+def generate_book(num_portfolios, universe_size, max_assets, size_alpha=DEFAULT_SIZE_ALPHA,
+                  popularity_skew=DEFAULT_POPULARITY_SKEW, overlap=DEFAULT_OVERLAP, core_size=DEFAULT_CORE_SIZE,
+                  min_assets=DEFAULT_MIN_ASSETS, amount_sigma=DEFAULT_AMOUNT_SIGMA, seed=0):
+    # Everything comes from one seeded generator in a fixed order, so the same
+    # arguments always give the same book
+    rng = np.random.default_rng(seed)
+    max_assets = min(max_assets, universe_size)
+    sizes = portfolio_sizes(rng, num_portfolios, max_assets, size_alpha, min(min_assets, max_assets))
+    weights = symbol_weights(universe_size, popularity_skew, overlap, core_size)
+    cdf = np.cumsum(weights)
+    cdf[-1] = 1.0
+
+    bulk = sizes <= max(MIN_BULK_DRAW, int(universe_size * BULK_DRAW_FRACTION))
+    portfolio_ids = np.repeat(np.arange(num_portfolios, dtype=np.int64), sizes)
+    symbol_ids = np.empty(len(portfolio_ids), dtype=np.int64)
+    in_bulk = np.repeat(bulk, sizes)
+    symbol_ids[in_bulk], dropped = draw_bulk(rng, cdf, portfolio_ids[in_bulk], universe_size)
+
+    # Large portfolios: weighted sampling without replacement (Gumbel top-k)
+    log_weights = np.log(weights)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    for portfolio in np.flatnonzero(~bulk):
+        keys = log_weights - np.log(-np.log(rng.random(universe_size)))
+        size = sizes[portfolio]
+        symbol_ids[starts[portfolio]:starts[portfolio] + size] = np.argpartition(keys, -size)[-size:]
+
+    keep = np.ones(len(portfolio_ids), dtype=bool)
+    keep[np.flatnonzero(in_bulk)[dropped]] = False
+    amounts = rng.lognormal(0.0, amount_sigma, size=int(keep.sum()))
+    symbols = SymbolTable(universe_symbols(universe_size))
+    return PortfolioBook(portfolio_ids[keep].astype(np.int32), symbol_ids[keep].astype(np.int32), amounts,
+                         symbols, num_portfolios)
+
+
+def generate_scale(scale, seed=0, **options):
+    return generate_book(SCALES[scale]['portfolios'], SCALES[scale]['universe'], SCALES[scale]['max_assets'],
+                         seed=seed, **options)
+
+
+def load_workload(source, seed=0):
+    # (book, prices) from a scale name ('100x'), a .pfbook or a portfolio text file
+    if source in SCALES:
+        book = generate_scale(source, seed)
+    elif source.endswith('.pfbook'):
+        book = load_book(source)
+    else:
+        book = read_book(source, keep_names=False)
+    return book, universe_prices(book.symbols.symbols, seed)
+
+
+# --- Output ---
+def write_text(book, path):
+    # The portfolios.txt format: a '# Portfolio with N assets' header per portfolio
+    names = book.symbols.symbols
+    portfolio_ids = np.asarray(book.portfolio_ids)
+    symbol_ids = np.asarray(book.symbol_ids)
+    amounts = np.asarray(book.amounts)
+    bounds = np.searchsorted(portfolio_ids, np.arange(book.num_portfolios + 1))
+    with open(path, 'w') as f:
+        for portfolio in range(book.num_portfolios):
+            start, end = bounds[portfolio], bounds[portfolio + 1]
+            lines = [f"# Portfolio with {end - start} assets"]
+            lines.extend(f"{names[s]} {a:.8g}" for s, a in zip(symbol_ids[start:end].tolist(),
+                                                               amounts[start:end].tolist()))
+            f.write('\n'.join(lines) + '\n\n')
+
+
+def describe(book, seed=0, pairs=10_000):
+    sizes = np.bincount(book.portfolio_ids, minlength=book.num_portfolios)
+    holders = np.bincount(book.symbol_ids, minlength=len(book.symbols))
+    top = max(1, len(book.symbols) // 100)
+    # Mean Jaccard similarity of random portfolio pairs
+    rng = np.random.default_rng(seed)
+    bounds = np.searchsorted(book.portfolio_ids, np.arange(book.num_portfolios + 1))
+    similarity = []
+    for a, b in rng.integers(0, book.num_portfolios, size=(pairs, 2)):
+        first = set(book.symbol_ids[bounds[a]:bounds[a + 1]].tolist())
+        second = set(book.symbol_ids[bounds[b]:bounds[b + 1]].tolist())
+        if a != b and first and second:
+            similarity.append(len(first & second) / len(first | second))
+    return {
+        'portfolios': book.num_portfolios,
+        'holdings': book.num_holdings,
+        'symbols_held': int((holders > 0).sum()),
+        'size_p50': float(np.percentile(sizes, 50)),
+        'size_p99': float(np.percentile(sizes, 99)),
+        'size_max': int(sizes.max()),
+        'top_1pct_share': float(np.sort(holders)[::-1][:top].sum() / holders.sum()),
+        'mean_jaccard': float(np.mean(similarity)) if similarity else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seeded synthetic portfolio workloads at 10x/100x/1000x scale.')
+    parser.add_argument('--scale', choices=SCALES, nargs='+', default=['10x'])
+    parser.add_argument('--portfolios', type=int, help='override the preset portfolio count')
+    parser.add_argument('--universe', type=int, help='override the preset universe size')
+    parser.add_argument('--max-assets', type=int, help='override the preset largest portfolio')
+    parser.add_argument('--min-assets', type=int, default=DEFAULT_MIN_ASSETS)
+    parser.add_argument('--size-alpha', type=float, default=DEFAULT_SIZE_ALPHA,
+                        help='Pareto tail of portfolio sizes (smaller = heavier tail)')
+    parser.add_argument('--skew', type=float, default=DEFAULT_POPULARITY_SKEW, help='Zipf exponent of popularity')
+    parser.add_argument('--overlap', type=float, default=DEFAULT_OVERLAP,
+                        help='share of draws from the common core symbols (0-1)')
+    parser.add_argument('--core-size', type=int, default=DEFAULT_CORE_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-dir', default='workloads')
+    parser.add_argument('--no-text', action='store_true', help='write only the binary book')
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for scale in args.scale:
+        preset = SCALES[scale]
+        universe = args.universe or preset['universe']
+        start = time.perf_counter()
+        book = generate_book(args.portfolios or preset['portfolios'], universe,
+                             args.max_assets or preset['max_assets'], args.size_alpha, args.skew, args.overlap,
+                             args.core_size, args.min_assets, seed=args.seed)
+        generate_time = time.perf_counter() - start
+
+        base = os.path.join(args.output_dir, f'workload_{scale}')
+        start = time.perf_counter()
+        save_book(book, base + '.pfbook')
+        book_time = time.perf_counter() - start
+        print(f"\n{scale}: generated in {generate_time:.2f} s, {base}.pfbook written in {book_time:.2f} s")
+        if not args.no_text:
+            start = time.perf_counter()
+            write_text(book, base + '.txt')
+            print(f"{base}.txt written in {time.perf_counter() - start:.2f} s")
+
+        stats = describe(book, args.seed)
+        print(f"  {stats['portfolios']} portfolios, {stats['holdings']} holdings, "
+              f"{stats['symbols_held']}/{universe} symbols held")
+        print(f"  size p50 {stats['size_p50']:.0f}, p99 {stats['size_p99']:.0f}, max {stats['size_max']}; "
+              f"top 1% of symbols hold {stats['top_1pct_share']:.0%} of positions; "
+              f"mean pairwise Jaccard {stats['mean_jaccard']:.3f}")
+        print(f"  price offline with: python mock_cmc_server.py --universe {universe}")
+
+if __name__ == '__main__':
+    main()